@@ -0,0 +1,47 @@
+"""
+Simula una ráfaga de escritura en el campo "Custom Command" y cuenta cuántas
+veces se escribe actions.json en disco.
+
+Uso: python benchmarks/config_writes.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.config_manager as config_manager
+
+
+def main():
+    writes = []
+    original_write = config_manager.write_atomic
+
+    def counting_write(path, data):
+        writes.append(time.perf_counter())
+        return original_write(path, data)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_manager.ACTIONS_FILE = os.path.join(tmp, "actions.json")
+        config_manager.write_atomic = counting_write
+        manager = config_manager.ConfigManager()
+        manager.flush()
+        writes.clear()
+
+        command = "notify-send 'MX Master' 'Hola desde el botón lateral'"
+        start = time.perf_counter()
+        for i in range(1, len(command) + 1):
+            manager.set_action("Button 2", f"Command: {command[:i]}")
+            time.sleep(0.03)  # ~33 pulsaciones por segundo
+        for value in range(50, 201):
+            manager.set_sensitivity(value)
+        manager.flush()
+        elapsed = time.perf_counter() - start
+
+    print(f"{len(command)} pulsaciones + 151 pasos del slider en {elapsed:.2f} s")
+    print(f"  escrituras a disco: {len(writes)} (antes: {len(command) + 151})")
+
+
+if __name__ == "__main__":
+    main()
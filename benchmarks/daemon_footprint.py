@@ -0,0 +1,92 @@
+"""
+Tiempo de arranque y memoria (RSS) del demonio (--daemon, sin PyQt5) frente
+al proceso combinado de GUI + listener. Cada variante se lanza con un HOME y
+un XDG_RUNTIME_DIR temporales y se mide hasta que el listener ha buscado el
+ratón; la GUI usa la plataforma "offscreen" de Qt para no necesitar pantalla.
+
+Uso: python benchmarks/daemon_footprint.py [repeticiones]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Mensajes del listener al terminar de buscar el ratón
+READY_MARKERS = ("Dispositivo evdev encontrado", "WARNING: Ratón Logitech MX Master no encontrado")
+SETTLE_DELAY = 1.0
+
+
+def rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def run_once(args):
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, XDG_RUNTIME_DIR=home, QT_QPA_PLATFORM="offscreen",
+                   PYTHONUNBUFFERED="1")
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-m", "src.main"] + args, cwd=ROOT, env=env,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        ready = None
+        try:
+            for line in process.stdout:
+                if any(marker in line for marker in READY_MARKERS):
+                    ready = (time.perf_counter() - start) * 1000
+                    break
+            if ready is None:
+                return None
+            time.sleep(SETTLE_DELAY)
+            main_rss = rss_kb(process.pid)
+            helper_rss = sum(rss_kb(child) for child in children(process.pid))
+            return ready, main_rss, helper_rss
+        finally:
+            process.terminate()
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    variants = [("--daemon", ["--daemon"]), ("GUI + listener", [])]
+    for name, args in variants:
+        if not args:
+            try:
+                import PyQt5  # noqa: F401
+            except ImportError:
+                print(f"{name:15s} PyQt5 no está instalado; no se puede medir.")
+                continue
+        results = [run_once(args) for _ in range(repetitions)]
+        results = [r for r in results if r]
+        if not results:
+            print(f"{name:15s} no llegó a iniciar el listener.")
+            continue
+        startup = statistics.median(r[0] for r in results)
+        main_rss = statistics.median(r[1] for r in results) / 1024
+        helper_rss = statistics.median(r[2] for r in results) / 1024
+        print(f"{name:15s} arranque={startup:.0f} ms  RSS={main_rss:.1f} MB "
+              f"(+{helper_rss:.1f} MB procesos auxiliares)  (mediana, n={len(results)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Latencia de las peticiones HID++ contra el emulador de tests/fakes.py:
+la primera lectura de batería (descubre el índice de la característica)
+frente a las siguientes, que usan la tabla ya guardada, y la entrega de una
+notificación de batería.
+
+Uso: python benchmarks/hidpp_roundtrip.py [repeticiones]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.fakes import FakeHidppMouse
+from src.engine import EventEngine
+from src.hidpp import HidppDevice
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    engine = EventEngine()
+    thread = threading.Thread(target=engine.run, daemon=True)
+    thread.start()
+    mouse = FakeHidppMouse()
+    device = HidppDevice(engine.loop, "/dev/hidraw-emulado", opener=mouse.opener)
+    notified = threading.Event()
+
+    def run(coro):
+        return asyncio.run_coroutine_threadsafe(coro, engine.loop).result(2)
+
+    async def open_device():
+        device.open()
+        await device.subscribe_battery(lambda battery: notified.set())
+
+    run(open_device())
+    start = time.perf_counter()
+    first = run(device.battery())
+    first_ms = (time.perf_counter() - start) * 1000
+    first_requests = mouse.requests
+
+    samples = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        run(device.battery())
+        samples.append((time.perf_counter() - start) * 1000)
+    requests_per_read = (mouse.requests - first_requests) / repetitions
+
+    start = time.perf_counter()
+    mouse.notify_battery(42)
+    notified.wait(1)
+    notify_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Primera lectura: {first.percentage}% en {first_ms:.3f} ms ({first_requests} informes)")
+    print(f"Siguientes:      p50={statistics.median(samples):.3f} ms  "
+          f"{requests_per_read:.0f} informe(s) por lectura (n={repetitions})")
+    print(f"Notificación:    {notify_ms:.3f} ms")
+    print(f"DPI: {run(device.get_dpi())} -> ", end="")
+    run(device.set_dpi(1600))
+    print(f"{run(device.get_dpi())}; SmartShift: {run(device.get_smartshift())}")
+
+    engine.loop.call_soon_threadsafe(device.close)
+    engine.stop()
+    thread.join()
+    mouse.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Microbenchmark de la latencia de lanzamiento con y sin el proceso auxiliar
+(src/launcher.py) mientras el proceso principal ocupa mucha memoria, como la
+GUI con Qt cargado. Cada comando lanzado escribe en una FIFO y se mide el
+tiempo hasta que se lee.
+
+Variantes, todas lanzadas desde el proceso grande:
+  - subprocess.Popen: como lo hacía ActionExecutor antes del auxiliar
+    (CPython usa vfork cuando puede).
+  - Popen con fork(): un preexec_fn obliga a un fork() real, que copia las
+    tablas de páginas del proceso grande (el coste de copy-on-write).
+  - posix_spawn local: spawn_process sin auxiliar (ChildSupervisor).
+  - proceso auxiliar: spawn_process con el Launcher pre-creado.
+
+Uso: python benchmarks/launcher_latency.py [repeticiones] [MB ocupados]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.launcher import Launcher, spawn_process
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(spawn, fifo_path, repetitions):
+    argv = ["/bin/sh", "-c", f"echo x > {fifo_path}"]
+    fifo = os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK)
+    # Mantener un escritor abierto evita EOF entre lanzamientos
+    keep_open = os.open(fifo_path, os.O_WRONLY)
+    os.set_blocking(fifo, True)
+    samples = []
+    try:
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            spawn(argv)
+            os.read(fifo, 2)
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        os.close(keep_open)
+        os.close(fifo)
+    return samples
+
+
+def popen(children, **kwargs):
+    def spawn(argv):
+        children.append(subprocess.Popen(argv, **kwargs))
+    return spawn
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ballast_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    # El auxiliar se crea antes de reservar memoria, como en main.py antes de Qt
+    launcher = Launcher()
+    launcher.start()
+    ballast = bytearray(ballast_mb * 1024 * 1024)
+    for i in range(0, len(ballast), 4096):
+        ballast[i] = 1  # Tocar cada página para que cuente en el RSS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fifo_path = os.path.join(tmp, "fifo")
+        os.mkfifo(fifo_path)
+        children = []
+        variants = (
+            ("subprocess.Popen", popen(children)),
+            ("Popen con fork()", popen(children, preexec_fn=lambda: None)),
+            ("posix_spawn local", lambda argv: spawn_process(None, argv)),
+            ("proceso auxiliar", lambda argv: spawn_process(launcher, argv)),
+        )
+        try:
+            for name, spawn in variants:
+                samples = measure(spawn, fifo_path, repetitions)
+                print(f"{name:17s} p50={percentile(samples, 0.5):.3f} ms  "
+                      f"p99={percentile(samples, 0.99):.3f} ms  "
+                      f"media={statistics.mean(samples):.3f} ms  "
+                      f"(n={repetitions}, {ballast_mb} MB ocupados)")
+        finally:
+            for child in children:
+                child.wait()
+            launcher.stop()
+
+
+if __name__ == "__main__":
+    main()
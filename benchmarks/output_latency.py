@@ -0,0 +1,44 @@
+"""
+Compara la latencia por acción de los backends de salida (xtest vs xdotool).
+
+Uso: python benchmarks/output_latency.py [repeticiones]
+
+Necesita un servidor X (puede ser Xvfb). Se pulsa "shift" para no provocar
+efectos visibles en las aplicaciones abiertas.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.output import OUTPUT_BACKENDS
+
+
+def measure(backend, repetitions):
+    samples = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        backend.key("shift")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for name, backend_cls in OUTPUT_BACKENDS.items():
+        try:
+            backend = backend_cls()
+        except Exception as e:
+            print(f"{name:8s} no disponible: {e}")
+            continue
+        samples = sorted(measure(backend, repetitions))
+        backend.close()
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"{name:8s} p50={statistics.median(samples):.3f} ms  "
+              f"p99={p99:.3f} ms  media={statistics.mean(samples):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
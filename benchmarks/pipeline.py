@@ -0,0 +1,196 @@
+"""
+Banco de pruebas del recorrido completo de eventos: alimenta MouseEventListener
+(bucle del EventEngine incluido) con flujos sintéticos de evdev (giros de la
+rueda, trazos de gestos, ráfagas de botones, movimiento) a través de un
+dispositivo, un ejecutor y unas consultas a X simulados.
+
+Para cada escenario mide eventos por segundo y tiempo de CPU por evento (de
+todo el proceso, hilos de la ActionQueue incluidos) y, en una segunda pasada
+con tracemalloc, el pico de memoria de Python durante la pasada y los
+bloques que siguen vivos al terminar (un valor que crece con los frames
+indica que el recorrido retiene memoria por evento).
+
+Uso: python benchmarks/pipeline.py [frames] [grab|xinput] [grabación de --record]
+"""
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evdev import InputEvent, ecodes
+
+from tests.fakes import CountingExecutor, FakeConfig, FakeInputDevice, FakePointer, FakeRegistry, FakeXInput
+from src.backend import MouseEventListener
+from src.dispatch import BUTTON1_SCANCODE, BUTTON_SCANCODES, compile_dispatch
+from src.log import ROOT_LOGGER
+from src.recorder import read_events
+
+ACTIONS = {
+    "Button 1": {
+        "action": "Copy",
+        "gesture_right": "Forward",
+        "gesture_left": "Back",
+        "gesture_down": "Close Window",
+        "gesture_L": "Show Desktop",
+    },
+    "Button 2": "Undo",
+    "Button 3": "Redo",
+    "Button 4": "Paste",
+    "Button 5": {"inverted": False, "sensitivity": 200, "function": "Scroll Horizontal"},
+}
+# Frame cada 8 ms, como un ratón a 125 Hz
+FRAME_US = 8000
+# Trazos de los gestos: desplazamiento por frame y número de frames de cada tramo
+STROKES = (
+    (((8, 0), 12),),
+    (((-8, 0), 12),),
+    (((0, 8), 12),),
+    (((0, 8), 8), ((8, 0), 8)),
+)
+
+
+class Clock:
+    """Marcas de tiempo de kernel consecutivas a partir de la hora actual."""
+
+    def __init__(self):
+        self.us = int(time.time() * 1000000)
+
+    def frame(self, events):
+        sec, usec = divmod(self.us, 1000000)
+        self.us += FRAME_US
+        result = [InputEvent(sec, usec, type, code, value) for type, code, value in events]
+        result.append(InputEvent(sec, usec, ecodes.EV_SYN, ecodes.SYN_REPORT, 0))
+        return result
+
+
+def wheel_spin(frames):
+    clock = Clock()
+    events = []
+    for i in range(frames):
+        events += clock.frame([(ecodes.EV_REL, ecodes.REL_HWHEEL, 1 + i % 3)])
+    return events
+
+
+def hi_res_wheel_spin(frames):
+    clock = Clock()
+    events = []
+    for i in range(frames):
+        detents = 1 + i % 3
+        events += clock.frame([
+            (ecodes.EV_REL, ecodes.REL_HWHEEL, detents),
+            (ecodes.EV_REL, ecodes.REL_HWHEEL_HI_RES, 120 * detents),
+        ])
+    return events
+
+
+def gesture_strokes(frames):
+    clock = Clock()
+    events = []
+    stroke = 0
+    while len(events) < frames * 3:
+        events += clock.frame([(ecodes.EV_KEY, BUTTON1_SCANCODE, 1)])
+        for (dx, dy), count in STROKES[stroke % len(STROKES)]:
+            for _ in range(count):
+                events += clock.frame([(ecodes.EV_REL, ecodes.REL_X, dx), (ecodes.EV_REL, ecodes.REL_Y, dy)])
+        events += clock.frame([(ecodes.EV_KEY, BUTTON1_SCANCODE, 0)])
+        stroke += 1
+    return events
+
+
+def button_storm(frames):
+    clock = Clock()
+    codes = [BUTTON_SCANCODES[name] for name in ("Button 2", "Button 3", "Button 4")]
+    events = []
+    for i in range(frames):
+        events += clock.frame([(ecodes.EV_KEY, codes[(i // 2) % len(codes)], 1 - i % 2)])
+    return events
+
+
+def pointer_motion(frames):
+    clock = Clock()
+    events = []
+    for i in range(frames):
+        events += clock.frame([(ecodes.EV_REL, ecodes.REL_X, 3 - i % 7), (ecodes.EV_REL, ecodes.REL_Y, 2 - i % 5)])
+    return events
+
+
+SCENARIOS = (
+    ("rueda", wheel_spin),
+    ("rueda hi-res", hi_res_wheel_spin),
+    ("gestos", gesture_strokes),
+    ("botones", button_storm),
+    ("movimiento", pointer_motion),
+)
+
+
+def replay(events, cursor_freeze):
+    """Pasa events por un listener nuevo y espera a que se ejecuten todas las acciones."""
+    device = FakeInputDevice(events=events)
+    # Con "block" no se descarta ninguna acción aunque la reproducción vaya más rápida que el ratón
+    settings = {"cursor_freeze": cursor_freeze, "action_queue_policy": "block", "stats_interval_s": 0}
+    config = FakeConfig(compile_dispatch(ACTIONS), settings)
+    executor = CountingExecutor()
+    listener = MouseEventListener(config, executor, registry=FakeRegistry(device), xinput=FakeXInput())
+    FakePointer(listener)
+    listener.start()
+    device.finished.wait()
+    listener.action_queue.join()
+    listener.stop()
+    listener.join()
+    return executor
+
+
+def measure(events, cursor_freeze):
+    start = time.perf_counter()
+    cpu = time.process_time()
+    executor = replay(events, cursor_freeze)
+    cpu = time.process_time() - cpu
+    elapsed = time.perf_counter() - start
+    return elapsed, cpu, executor
+
+
+def measure_memory(events, cursor_freeze):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        replay(events, cursor_freeze)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return peak, retained
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    cursor_freeze = sys.argv[2] if len(sys.argv) > 2 else "grab"
+    scenarios = list(SCENARIOS)
+    if len(sys.argv) > 3:
+        # Una grabación real se reproduce entera, sin tener en cuenta frames
+        recording = sys.argv[3]
+        scenarios.append(("grabación", lambda frames: list(read_events(recording))))
+
+    # Nivel de producción (los mensajes por evento son debug), sin escribir nada
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    print(f"{frames} frames por escenario, congelación del cursor: {cursor_freeze}")
+    for name, generate in scenarios:
+        events = generate(frames)
+        elapsed, cpu, executor = measure(events, cursor_freeze)
+        peak, retained = measure_memory(events, cursor_freeze)
+        outputs = executor.output.calls + executor.executed
+        print(f"  {name:13s} {len(events):7d} eventos  {len(events) / elapsed:9.0f} ev/s  "
+              f"CPU {cpu / len(events) * 1000000:6.2f} µs/ev  pico {peak / 1024:7.1f} KB  "
+              f"{retained:5d} bloques retenidos  {outputs} acciones")
+
+
+if __name__ == "__main__":
+    main()
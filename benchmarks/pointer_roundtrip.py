@@ -0,0 +1,87 @@
+"""
+Microbenchmark del ciclo pulsar/soltar del Button 1 en modo xinput: guardar
+la posición del cursor y restaurarla. Compara xdotool (getmouselocation +
+mousemove, dos procesos) con XQueryPointer/XWarpPointer sobre la conexión
+persistente de src/xconn.py. Arranca un Xvfb propio como pantalla de pruebas.
+
+Uso: python benchmarks/pointer_roundtrip.py [repeticiones]
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DISPLAY = ":87"
+
+
+def start_xvfb():
+    if not shutil.which("Xvfb"):
+        print("Xvfb no está instalado; no se puede ejecutar el benchmark.")
+        sys.exit(1)
+    server = subprocess.Popen(["Xvfb", DISPLAY, "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+                              stderr=subprocess.DEVNULL)
+    socket_path = f"/tmp/.X11-unix/X{DISPLAY[1:]}"
+    deadline = time.monotonic() + 5
+    while not os.path.exists(socket_path):
+        if server.poll() is not None or time.monotonic() > deadline:
+            print("No se pudo arrancar Xvfb.")
+            sys.exit(1)
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = DISPLAY
+    return server
+
+
+def xdotool_roundtrip():
+    result = subprocess.check_output(["xdotool", "getmouselocation"], universal_newlines=True)
+    parts = result.split()
+    x = int(parts[0].split(':')[1])
+    y = int(parts[1].split(':')[1])
+    subprocess.check_call(["xdotool", "mousemove", str(x), str(y)])
+
+
+def measure(roundtrip, repetitions):
+    samples = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        roundtrip()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name:22s} p50={statistics.median(samples):.3f} ms  p99={p99:.3f} ms  (n={len(samples)})")
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = start_xvfb()
+    try:
+        from src.xconn import close_connection, get_connection
+
+        connection = get_connection()
+        frame = [0]
+
+        def xconn_roundtrip():
+            frame[0] += 1
+            x, y = connection.query_pointer(frame[0])
+            connection.warp_pointer(x, y)
+
+        if shutil.which("xdotool"):
+            report("xdotool (2 procesos)", measure(xdotool_roundtrip, repetitions))
+        else:
+            print("xdotool no está instalado; solo se mide la conexión persistente.")
+        report("XQueryPointer/XWarp", measure(xconn_roundtrip, repetitions))
+        close_connection()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
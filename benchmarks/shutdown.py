@@ -0,0 +1,74 @@
+"""
+Compara el tiempo de apagado y el consumo de CPU en reposo del bucle asyncio
+(EventEngine) frente al hilo bloqueado en read_loop() que se usaba antes.
+
+Uso: python benchmarks/shutdown.py [segundos_en_reposo]
+
+Crea un dispositivo virtual con uinput como sustituto del ratón, así que
+necesita permiso de escritura en /dev/uinput.
+"""
+import os
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evdev import InputDevice, UInput, ecodes
+
+from src.engine import EventEngine
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def legacy(device, idle):
+    state = {"running": True}
+
+    def run():
+        for _event in device.read_loop():
+            if not state["running"]:
+                break
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    cpu = cpu_time()
+    time.sleep(idle)
+    cpu = cpu_time() - cpu
+    start = time.perf_counter()
+    state["running"] = False
+    thread.join(5)
+    return cpu, None if thread.is_alive() else time.perf_counter() - start
+
+
+def engine(device, idle):
+    event_engine = EventEngine()
+    event_engine.add_device(device, lambda event: None)
+    thread = threading.Thread(target=event_engine.run)
+    thread.start()
+    cpu = cpu_time()
+    time.sleep(idle)
+    cpu = cpu_time() - cpu
+    start = time.perf_counter()
+    event_engine.stop()
+    thread.join(5)
+    return cpu, None if thread.is_alive() else time.perf_counter() - start
+
+
+def main():
+    idle = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    with UInput({ecodes.EV_KEY: [ecodes.BTN_LEFT], ecodes.EV_REL: [ecodes.REL_X, ecodes.REL_Y]},
+                name="MXMouse benchmark") as virtual:
+        time.sleep(0.5)  # Esperar a que aparezca el nodo /dev/input/eventN
+        for name, variant in (("read_loop", legacy), ("asyncio", engine)):
+            device = InputDevice(virtual.device.path)
+            cpu, shutdown = variant(device, idle)
+            shutdown_text = "no termina (espera al siguiente evento)" if shutdown is None else f"{shutdown * 1000:.2f} ms"
+            print(f"{name:10s} CPU en reposo={cpu * 1000 / idle:.3f} ms/s  apagado={shutdown_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Microbenchmark de la latencia de lanzamiento de comandos personalizados:
+/bin/sh -c "..." frente a argv ya separado (fork_exec y posix_spawn).
+
+Uso: python benchmarks/spawn_latency.py [repeticiones]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dispatch import parse_command
+
+# sleep no es un builtin de /bin/sh, así que el shell también tiene que hacer exec
+COMMAND = "sleep 0"
+
+
+def measure(launch, repetitions):
+    spawn, total = [], []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        process = launch()
+        spawn.append((time.perf_counter() - start) * 1000)
+        process.wait()
+        total.append((time.perf_counter() - start) * 1000)
+    return spawn, total
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    argv = parse_command(COMMAND)
+    variants = [
+        ("shell=True", lambda: subprocess.Popen(COMMAND, shell=True)),
+        ("argv", lambda: subprocess.Popen(argv)),
+        ("argv posix_spawn", lambda: subprocess.Popen(argv, close_fds=False)),
+    ]
+    for name, launch in variants:
+        spawn, total = measure(launch, repetitions)
+        print(f"{name:18s} Popen={statistics.median(spawn):.3f} ms  "
+              f"hasta exit={statistics.median(total):.3f} ms  (mediana, n={repetitions})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Reproduce un giro rápido de la rueda lateral a través de MouseEventListener y
+cuenta cuántas acciones se inyectan con la agregación por frame/ventana frente
+al comportamiento anterior (un proceso xdotool por clic).
+
+Uso: python benchmarks/wheel_burst.py [sensibilidad] [ventana_ms]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evdev import InputEvent, ecodes
+
+from tests.fakes import CountingOutput, FakeConfig, FakeInputDevice, FakeRegistry, FakeXInput
+from src.backend import ActionExecutor, MouseEventListener
+from src.dispatch import compile_dispatch
+
+
+def fast_spin(frames, step_us=8000):
+    """Giro rápido: un frame cada 8 ms (a tiempo real) con 1-3 detents por frame."""
+    for i in range(frames):
+        sec, usec = divmod(i * step_us, 1000000)
+        yield InputEvent(sec, usec, ecodes.EV_REL, ecodes.REL_HWHEEL, 1 + i % 3)
+        yield InputEvent(sec, usec, ecodes.EV_SYN, ecodes.SYN_REPORT, 0)
+        time.sleep(step_us / 1000000)
+
+
+def main():
+    sensitivity = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    window_ms = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    output = CountingOutput()
+    config = FakeConfig(
+        compile_dispatch({"Button 5": {"inverted": False, "sensitivity": sensitivity, "function": "Scroll Horizontal"}}),
+        {"wheel_coalesce_ms": window_ms},
+    )
+    device = FakeInputDevice()
+    listener = MouseEventListener(config, ActionExecutor(output), registry=FakeRegistry(device), xinput=FakeXInput())
+    mouse = listener.devices[device.path]
+
+    legacy_processes = 0
+    for event in fast_spin(500):
+        if event.type == ecodes.EV_REL:
+            legacy_processes += max(abs(int((sensitivity / 100) * event.value)), 1)
+        mouse.handle_event(event)
+    mouse.flush_hwheel()
+    listener.action_queue.join()
+
+    print(f"Sensibilidad {sensitivity}, ventana {window_ms} ms, 500 frames")
+    print(f"  antes:   {legacy_processes} procesos xdotool")
+    print(f"  ahora:   {output.calls} acciones inyectadas ({output.steps} pasos de rueda)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import collections
+import logging
+import threading
+import time
+
+from src.stats import DISPATCH_COMPLETE
+
+log = logging.getLogger(__name__)
+
+# Políticas cuando la cola está llena
+DROP_OLDEST = "drop-oldest"
+COALESCE = "coalesce"
+BLOCK = "block"
+POLICIES = (DROP_OLDEST, COALESCE, BLOCK)
+
+# Trabajos en ejecución a la vez por tipo. La salida (XTest/uinput) y el
+# cursor no admiten llamadas concurrentes y además deben conservar el orden
+DEFAULT_LIMITS = {
+    "output": 1,
+    "cursor": 1,
+    "spawn": 4,
+}
+# Tipos que nunca se descartan: perder un reattach dejaría el ratón flotante
+KEEP_KINDS = frozenset(["cursor"])
+
+
+class ActionQueue:
+    """
+    Cola acotada de trabajos con un grupo de hilos. El hilo de eventos solo
+    encola (submit) y los hilos ejecutan las acciones, de modo que un comando
+    lento o una llamada a xinput no retrasa la lectura de evdev.
+
+    Cada trabajo tiene un tipo con su propio límite de concurrencia; dentro de
+    un mismo tipo se ejecutan en orden de llegada. Si la cola se llena se
+    aplica la política configurada:
+      - drop-oldest: se descarta el trabajo pendiente más antiguo.
+      - coalesce: si el nuevo admite fusión (merge) y solo se diferencia del
+        último pendiente en el número de repeticiones, se suman; si no, se
+        descarta el más antiguo.
+      - block: submit espera a que haya hueco.
+    Si todo lo pendiente es de un tipo que no se descarta, se rechaza el
+    trabajo nuevo y se cuenta como descartado.
+
+    Si se asigna latency (un PipelineStats), cada trabajo registra el tiempo
+    desde que se encoló hasta que termina.
+    """
+
+    def __init__(self, maxsize=64, policy=DROP_OLDEST, workers=4, limits=None, latency=None):
+        if policy not in POLICIES:
+            log.warning("[ActionQueue] Política desconocida '%s', se usará %s.", policy, DROP_OLDEST)
+            policy = DROP_OLDEST
+        self.maxsize = max(int(maxsize), 1)
+        self.policy = policy
+        self.limits = dict(DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+
+        self._pending = collections.deque()
+        self._running = collections.Counter()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.counters = collections.Counter()
+        self.max_depth = 0
+        self.latency = latency
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"ActionWorker-{i}", daemon=True)
+            for i in range(max(int(workers), 1))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, kind, func, *args, merge=False):
+        """
+        Encola func(*args). Con merge, el último argumento es un número de
+        repeticiones que se puede sumar al de un trabajo igual. Devuelve
+        False si el trabajo se ha descartado.
+        """
+        job = (kind, func, args, time.monotonic(), merge)
+        with self._cond:
+            if self._stopped:
+                return False
+            self.counters["submitted"] += 1
+            if len(self._pending) >= self.maxsize:
+                if self.policy == BLOCK:
+                    while len(self._pending) >= self.maxsize and not self._stopped:
+                        self._cond.wait()
+                    if self._stopped:
+                        return False
+                elif self.policy == COALESCE and self._can_merge(self._pending[-1], job):
+                    last = self._pending[-1]
+                    count = last[2][-1] + args[-1]
+                    self._pending[-1] = (kind, func, args[:-1] + (count,), last[3], merge)
+                    self.counters["coalesced"] += 1
+                    return True
+                elif not self._drop_oldest():
+                    self.counters["dropped"] += 1
+                    self.counters[f"dropped.{kind}"] += 1
+                    return False
+            self._pending.append(job)
+            self.max_depth = max(self.max_depth, len(self._pending))
+            self._cond.notify_all()
+        return True
+
+    @staticmethod
+    def _can_merge(pending, job):
+        # Mismo tipo, función y argumentos salvo el número de repeticiones
+        return (pending[4] and job[4] and pending[:2] == job[:2] and job[2]
+                and pending[2][:-1] == job[2][:-1])
+
+    def _drop_oldest(self):
+        """Descarta el trabajo pendiente más antiguo que se pueda perder; False si no hay ninguno."""
+        for index, job in enumerate(self._pending):
+            if job[0] not in KEEP_KINDS:
+                del self._pending[index]
+                self.counters["dropped"] += 1
+                self.counters[f"dropped.{job[0]}"] += 1
+                return True
+        return False
+
+    def _next_job(self):
+        # El primer trabajo pendiente cuyo tipo no haya alcanzado su límite
+        for index, job in enumerate(self._pending):
+            if self._running[job[0]] < self.limits.get(job[0], 1):
+                del self._pending[index]
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopped:
+                    job = self._next_job()
+                    if job:
+                        break
+                    self._cond.wait()
+                if job is None:
+                    return
+                kind, func, args, submitted, _ = job
+                self._running[kind] += 1
+                # Puede haber un submit bloqueado esperando hueco
+                self._cond.notify_all()
+            result = "executed"
+            try:
+                func(*args)
+            except Exception as e:
+                result = "failed"
+                log.error("[ActionQueue] Error al ejecutar una acción '%s': %s", kind, e)
+            finally:
+                if self.latency is not None:
+                    self.latency.record(DISPATCH_COMPLETE, time.monotonic() - submitted)
+                with self._cond:
+                    self._running[kind] -= 1
+                    self.counters[result] += 1
+                    self._cond.notify_all()
+
+    def depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def join(self, timeout=None):
+        """Espera a que se vacíe la cola y terminen los trabajos en curso."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not any(self._running.values()), timeout)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.counters)
+            stats["depth"] = len(self._pending)
+            stats["max_depth"] = self.max_depth
+            stats["running"] = sum(self._running.values())
+        return stats
+
+    def stop(self, timeout=1.0):
+        """Descarta lo pendiente y espera a que terminen los trabajos en curso."""
+        with self._cond:
+            self._stopped = True
+            if self._pending:
+                self.counters["dropped"] += len(self._pending)
+                self._pending.clear()
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
@@ -1,98 +1,147 @@
+import logging
 import subprocess
 import threading
-from evdev import InputDevice, categorize, ecodes, list_devices
+import time
+from evdev import ecodes
+from src.action_queue import ActionQueue
+from src.dispatch import BUTTON1_SCANCODE, BUTTON_SCANCODES, SCANCODE_BUTTONS, Action, resolve_action
+from src.engine import EventEngine
+from src.gestures import Stroke
+from src.hotplug import DeviceRegistry, HotplugMonitor
+from src.launcher import spawn_process
+from src.output import CLONE_SUFFIX, XdotoolBackend
+from src.startup import STARTUP
+from src.stats import KERNEL_READ, READ_DISPATCH, PipelineStats
+from src.xconn import ActiveWindowWatcher, get_connection
+
+log = logging.getLogger(__name__)
 
 
 class ActionExecutor:
+    def __init__(self, output=None, launcher=None, command_timeout=None):
+        self.output = output or XdotoolBackend(launcher)
+        self.launcher = launcher
+        # Tiempo máximo de los comandos personalizados (None: sin límite)
+        self.command_timeout = command_timeout or None
+
     def execute(self, action):
-        if isinstance(action, dict):
-            return
-        elif action.startswith("Command:"):
-            command = action.split("Command:")[1].strip()
-            subprocess.Popen(command, shell=True)
+        if not isinstance(action, Action):
+            action = resolve_action(action)
+            if action is None:
+                return
+        if action.kind == "key":
+            self.output.key(action.arg)
+        elif action.kind == "click":
+            self.output.click(action.arg)
+        elif action.kind == "argv":
+            # argv ya separado al cargar la configuración: sin pasar por /bin/sh
+            try:
+                spawn_process(self.launcher, action.arg, timeout=self.command_timeout)
+            except OSError as e:
+                log.error("Error al ejecutar el comando %s: %s", action.label, e)
         else:
-            predefined_actions = {
-                "Copy":          "xdotool key ctrl+c",
-                "Paste":         "xdotool key ctrl+v",
-                "Volume Up":     "xdotool key XF86AudioRaiseVolume",
-                "Volume Down":   "xdotool key XF86AudioLowerVolume",
-                "Mute":          "xdotool key XF86AudioMute",
-                "Undo":          "xdotool key ctrl+z",
-                "Redo":          "xdotool key ctrl+shift+z",
-                "Scroll Up":     "xdotool click 4",
-                "Scroll Down":   "xdotool click 5",
-                "Scroll Left":   "xdotool click 6",
-                "Scroll Right":  "xdotool click 7",
-                "Left Click":    "xdotool click 1",
-                "Right Click":   "xdotool click 3",
-                "Forward":       "xdotool key XF86Forward",
-                "Back":          "xdotool key XF86Back",
-                "Open Terminal": "gnome-terminal",
-                "Show Desktop":  "xdotool key super+d",
-                "Close Window":  "xdotool key ctrl+w",
-            }
-            cmd = predefined_actions.get(action)
-            if cmd:
-                subprocess.Popen(cmd, shell=True)
-            else:
-                print(f"Acción predefinida desconocida: {action}")
+            spawn_process(self.launcher, action.arg, shell=True, timeout=self.command_timeout)
+
+
+class WheelAccumulator:
+    """
+    Suma los deltas de la rueda hasta el final del frame de evdev (SYN_REPORT)
+    o, si se configura una ventana, hasta que pase ese tiempo. Así una ráfaga
+    de la rueda se convierte en una única acción agregada.
+    """
+    def __init__(self, window=0.0):
+        self.window = window
+        self.pending = 0
+        self.pending_hi_res = 0
+        self.started = None
+
+    def add(self, value, now, hi_res=False):
+        if self.started is None:
+            self.started = now
+        if hi_res:
+            self.pending_hi_res += value
+        else:
+            self.pending += value
 
+    def due(self, now):
+        return self.started is not None and now - self.started >= self.window
 
-class MouseEventListener(threading.Thread):
-    BUTTON_XINPUT_MAP = {
-        "Button 1": 1,
-        "Button 2": 8,
-        "Button 3": 9,
-        "Button 4": 4,
-        "Button 5": 5,
-        "ScrollLeft": 6,
-        "ScrollRight": 7,
-    }
+    def take(self):
+        values = (self.pending, self.pending_hi_res)
+        self.pending = 0
+        self.pending_hi_res = 0
+        self.started = None
+        return values
 
-    def __init__(self, config_manager, action_executor):
-        super().__init__()
-        self.config_manager = config_manager
-        self.action_executor = action_executor
-        self.running = True
 
-        self.device = self.find_mouse_device()
-        self.xinput_id = self.find_xinput_id("MX Master 3S")  # Ajusta el nombre exacto
-        if self.xinput_id is None:
-            print("WARNING: No se pudo encontrar el ID de XInput para MX Master 3S. El bloqueo del cursor no funcionará.")
-        self.master_pointer_id = self.find_master_pointer_id()
+def _truncate_div(value, divisor):
+    # División entera hacia cero: -15 // 120 sería -1 y haría derivar la rueda
+    quotient = abs(value) // divisor
+    return quotient if value >= 0 else -quotient
 
-        self.button1_pressed = False
-        self.button1_gesture_detected = False
-        self.button1_movement = {'x': 0, 'y': 0}
-        self.gesture_threshold = 50
-        self.cursor_position = (0, 0)
 
-        self.original_button_map = self.get_xinput_button_map()
-        if self.xinput_id and self.original_button_map:
-            self.adjust_xinput_mappings()
+class HiResAccumulator:
+    """
+    Acumula el desplazamiento hi-res de un eje (120 unidades = 1 detent) con la
+    sensibilidad ya aplicada. Los pasos parciales se conservan entre eventos,
+    así que un giro lento llega a producir detents y no deriva en ningún sentido.
+    """
+    UNITS_PER_DETENT = 120
+
+    def __init__(self):
+        # En centésimas de unidad hi-res para aplicar la sensibilidad (%) sin redondeos
+        self.residual = 0
+
+    def add(self, value, sensitivity):
+        self.residual += value * sensitivity
 
-    def find_mouse_device(self):
-        for device in [InputDevice(path) for path in list_devices()]:
-            if 'MX Master' in device.name:
-                print(f"Dispositivo evdev encontrado: {device.path} - {device.name}")
-                return device
-        raise Exception("Ratón Logitech MX Master 3S no encontrado en evdev.")
+    def take_units(self):
+        units = _truncate_div(self.residual, 100)
+        self.residual -= units * 100
+        return units
 
-    def find_xinput_id(self, name_hint):
+    def take_detents(self):
+        detents = _truncate_div(self.residual, 100 * self.UNITS_PER_DETENT)
+        self.residual -= detents * 100 * self.UNITS_PER_DETENT
+        return detents
+
+    def reset(self):
+        self.residual = 0
+
+
+class XInput:
+    """Consultas y cambios de dispositivos mediante la herramienta xinput."""
+
+    def find_id(self, name, path=None):
         try:
             result = subprocess.check_output(["xinput", "list"], universal_newlines=True)
-            for line in result.splitlines():
-                if name_hint in line:
-                    parts = line.split()
-                    for p in parts:
-                        if p.startswith("id="):
-                            return int(p.split("=")[1])
-            return None
         except Exception as e:
-            print(f"No se pudo ejecutar xinput list: {e}")
+            log.error("No se pudo ejecutar xinput list: %s", e)
             return None
+        candidates = []
+        for line in result.splitlines():
+            if name in line and "pointer" in line:
+                for p in line.split():
+                    if p.startswith("id="):
+                        candidates.append(int(p.split("=")[1]))
+        # Con varios ratones iguales se distingue por el nodo evdev
+        if len(candidates) > 1 and path:
+            for xinput_id in candidates:
+                if self.device_node(xinput_id) == path:
+                    return xinput_id
+        return candidates[0] if candidates else None
+
+    def device_node(self, xinput_id):
+        try:
+            result = subprocess.check_output(["xinput", "list-props", str(xinput_id)], universal_newlines=True)
+            for line in result.splitlines():
+                if "Device Node" in line:
+                    return line.split(":", 1)[1].strip().strip('"')
+        except Exception as e:
+            log.error("No se pudo ejecutar xinput list-props: %s", e)
+        return None
 
-    def find_master_pointer_id(self):
+    def master_pointer_id(self):
         try:
             result = subprocess.check_output(["xinput", "list", "--short"], universal_newlines=True)
             for line in result.splitlines():
@@ -103,155 +152,309 @@ class MouseEventListener(threading.Thread):
                             return int(p.split("=")[1])
             return 2
         except Exception as e:
-            print(f"No se pudo obtener master pointer id: {e}")
+            log.error("No se pudo obtener master pointer id: %s", e)
             return 2
 
-    def get_cursor_position(self):
+    def get_button_map(self, xinput_id):
         try:
-            result = subprocess.check_output(["xdotool", "getmouselocation"], universal_newlines=True)
-            parts = result.split()
-            x = int(parts[0].split(':')[1])
-            y = int(parts[1].split(':')[1])
-            return x, y
+            result = subprocess.check_output(["xinput", "get-button-map", str(xinput_id)], universal_newlines=True)
+            return list(map(int, result.strip().split()))
         except Exception as e:
-            print(f"Error al obtener posición del cursor: {e}")
-            return None, None
+            log.error("Error al obtener mapeo de botones de xinput: %s", e)
+            return []
 
-    def set_cursor_position(self, x, y):
+    def set_button_map(self, xinput_id, new_map):
         try:
-            subprocess.check_call(["xdotool", "mousemove", str(x), str(y)])
-            print(f"Cursor movido a ({x}, {y})")
+            subprocess.check_call(["xinput", "set-button-map", str(xinput_id)] + list(map(str, new_map)))
+            log.info("[Cursor] Mapeo de botones actualizado.")
         except Exception as e:
-            print(f"Error al establecer posición del cursor: {e}")
+            log.error("Error al establecer mapeo de botones de xinput: %s", e)
 
-    def get_xinput_button_map(self):
+    def float_device(self, xinput_id):
         try:
-            result = subprocess.check_output(["xinput", "get-button-map", str(self.xinput_id)], universal_newlines=True)
-            return list(map(int, result.strip().split()))
-        except Exception as e:
-            print(f"Error al obtener mapeo de botones de xinput: {e}")
-            return []
+            subprocess.check_call(["xinput", "float", str(xinput_id)])
+            log.debug("[Cursor] Dispositivo %s desconectado (float).", xinput_id)
+        except subprocess.CalledProcessError as e:
+            log.error("Error al hacer float en xinput: %s", e)
 
-    def set_xinput_button_map(self, new_map):
+    def reattach(self, xinput_id, master_pointer_id):
         try:
-            subprocess.check_call(["xinput", "set-button-map", str(self.xinput_id)] + list(map(str, new_map)))
-            print("[Cursor] Mapeo de botones actualizado.")
-        except Exception as e:
-            print(f"Error al establecer mapeo de botones de xinput: {e}")
+            subprocess.check_call(["xinput", "reattach", str(xinput_id), str(master_pointer_id)])
+            log.debug("[Cursor] Dispositivo %s reenganchado a maestro %s.", xinput_id, master_pointer_id)
+        except subprocess.CalledProcessError as e:
+            log.error("Error al hacer reattach en xinput: %s", e)
+
+
+class MouseDevice:
+    """
+    Estado de un ratón concreto: su nodo evdev, su dispositivo de xinput, el
+    gesto en curso y los acumuladores de la rueda. Cada ratón conectado tiene
+    el suyo, así que varios MX Master pueden usarse a la vez.
+    """
+    # Reintentos mientras el servidor X todavía no ha dado de alta el dispositivo
+    XINPUT_RETRY_DELAYS = (0.05, 0.1, 0.2, 0.4, 0.8)
+
+    def __init__(self, listener, device):
+        self.listener = listener
+        self.device = device
+        self.path = device.path
+        self.name = device.name
+
+        self.xinput_id = None
+        self.original_button_map = []
+        self.xinput_disabled = ()
+
+        # Número de frame de evdev; permite reutilizar consultas a X dentro de un frame
+        self.frame = 0
+        self.button1_pressed = False
+        self.stroke = Stroke()
+        self.cursor_position = (0, 0)
 
-    def adjust_xinput_mappings(self):
-        new_map = self.original_button_map.copy()
+        # Modo "grab": copia uinput por la que se reenvía lo que no se consume
+        self.clone = None
+        self.grabbed = False
+        self.ungrab_pending = False
+        self.grab_frame_pending = False
+        self.grab_filter = frozenset()
+        self.passthrough = []
+        if listener.cursor_freeze == "grab":
+            try:
+                self.clone = listener.registry.clone(device)
+            except Exception as e:
+                log.warning("[Cursor] No se pudo crear la copia uinput de %s, se usará xinput: %s", self.name, e)
+
+        self.wheel_accumulator = WheelAccumulator(listener.wheel_window)
+        self.wheel_timer = None
+        self.hwheel_hi_res = HiResAccumulator()
+        self.hwheel_hi_res_seen = False
+
+    # Se ejecuta en la cola "cursor": xinput lanza procesos y el hilo de eventos no debe esperarlos
+    def setup_xinput(self, attempt=0):
+        if self.listener.devices.get(self.path) is not self:
+            return  # El dispositivo se desconectó mientras se esperaba
+        xinput = self.listener.xinput
+        self.xinput_id = xinput.find_id(self.name, self.path)
+        if self.xinput_id is None:
+            if attempt < len(self.XINPUT_RETRY_DELAYS):
+                self.listener.run_xinput_later(self.XINPUT_RETRY_DELAYS[attempt], self.setup_xinput, attempt + 1)
+            else:
+                log.warning("No se pudo encontrar el ID de XInput para %s. El bloqueo del cursor no funcionará.", self.name)
+            return
+        self.original_button_map = xinput.get_button_map(self.xinput_id)
+        if self.original_button_map:
+            self.adjust_xinput_mappings()
 
-        # Desactivar botones 2 y 3 si tienen acciones personalizadas
-        for button_name in ["Button 2", "Button 3"]:
-            action = self.config_manager.get_action(button_name)
-            if action and action not in ["Back", "Forward"]:
-                xinput_button = self.BUTTON_XINPUT_MAP.get(button_name)
-                if xinput_button and xinput_button <= len(new_map):
-                    new_map[xinput_button - 1] = 0  # Desactivar botón
-                    print(f"[XInput] {button_name} desactivado para acción personalizada.")
+    def adjust_xinput_mappings(self, dispatch=None):
+        new_map = self.original_button_map.copy()
+        self.xinput_disabled = self.listener.xinput_disabled_buttons(dispatch or self.listener.dispatch)
 
-        # Desactivar scroll horizontal si tiene acción personalizada
-        wheel_function = self.config_manager.get_wheel_function()
-        if wheel_function != "Scroll Horizontal":
-            for scroll_dir in ["ScrollLeft", "ScrollRight"]:
-                xinput_button = self.BUTTON_XINPUT_MAP.get(scroll_dir)
-                if xinput_button and xinput_button <= len(new_map):
-                    new_map[xinput_button - 1] = 0  # Desactivar botón de scroll
-                    print(f"[XInput] {scroll_dir} desactivado para acción personalizada.")
+        for button_name in self.xinput_disabled:
+            xinput_button = self.listener.BUTTON_XINPUT_MAP.get(button_name)
+            if xinput_button and xinput_button <= len(new_map):
+                new_map[xinput_button - 1] = 0  # Desactivar botón
+                log.info("[XInput] %s desactivado para acción personalizada.", button_name)
 
-        self.set_xinput_button_map(new_map)
+        self.listener.xinput.set_button_map(self.xinput_id, new_map)
 
-    def run(self):
-        for event in self.device.read_loop():
-            if not self.running:
-                break
-
-            if event.type == ecodes.EV_KEY:
-                key_event = categorize(event)
-                button = self.map_code_to_button(key_event.scancode)
-                if button == "Button 1":
-                    if key_event.keystate == key_event.key_down:
-                        self.handle_button1_press()
-                    elif key_event.keystate == key_event.key_up:
-                        self.handle_button1_release()
-                elif button and button != "Button 5":
-                    if key_event.keystate == key_event.key_down:
-                        action = self.config_manager.get_action(button)
-                        if action:
-                            self.action_executor.execute(action)
-            elif event.type == ecodes.EV_REL:
-                if event.code == ecodes.REL_HWHEEL:
-                    self.handle_hwheel(event.value)
-                elif event.code == ecodes.REL_HWHEEL_HI_RES:
-                    self.handle_hwheel_hi_res(event.value)
-                elif event.code in [ecodes.REL_X, ecodes.REL_Y]:
-                    self.handle_mouse_move(event)
+    # Se ejecuta en la cola "cursor", en el orden de los cambios de configuración y de foco
+    def on_config_changed(self, dispatch):
+        # Solo se vuelve a tocar xinput si cambian los campos que afectan al mapeo
+        if self.xinput_id and self.original_button_map:
+            if self.listener.xinput_disabled_buttons(dispatch) != self.xinput_disabled:
+                self.adjust_xinput_mappings(dispatch)
+
+    def handle_event(self, event):
+        if self.grabbed:
+            self.forward_event(event)
+        if event.type == ecodes.EV_KEY:
+            if event.code == BUTTON1_SCANCODE:
+                if event.value == 1:
+                    self.handle_button1_press()
+                elif event.value == 0:
+                    self.handle_button1_release()
+            elif event.value == 1:
+                action = self.listener.dispatch.buttons.get(event.code)
+                if action:
+                    self.listener.run_action(action)
+        elif event.type == ecodes.EV_REL:
+            if event.code == ecodes.REL_HWHEEL:
+                self.accumulate_hwheel(event.value)
+            elif event.code == ecodes.REL_HWHEEL_HI_RES:
+                self.accumulate_hwheel(event.value, hi_res=True)
+            elif event.code in [ecodes.REL_X, ecodes.REL_Y]:
+                self.handle_mouse_move(event)
+        elif event.type == ecodes.EV_SYN and event.code == ecodes.SYN_REPORT:
+            self.frame += 1
+            # Una muestra por frame: todos los eventos del frame llevan la marca del SYN
+            self.listener.latency.record(KERNEL_READ, self.listener.engine.read_time - event.timestamp())
+            if not self.listener.first_event_handled:
+                self.listener.report_first_event()
+            if self.button1_pressed:
+                self.stroke.end_frame()
+            if self.wheel_accumulator.due(time.monotonic()):
+                self.flush_hwheel()
+
+    def forward_event(self, event):
+        """
+        Con el ratón capturado, reenvía por la copia uinput todo lo que no
+        consume la aplicación: el movimiento y el Button 1 forman el gesto y
+        los botones con acción personalizada ya los atiende handle_event.
+        """
+        if event.type == ecodes.EV_SYN:
+            if event.code != ecodes.SYN_REPORT:
+                return
+            if self.grab_frame_pending:
+                # El resto del frame de la pulsación ya lo recibió X antes de capturar
+                self.grab_frame_pending = False
+                self.passthrough = []
+                return
+            if self.passthrough:
+                self.passthrough.append(event)
+                self.clone.emit(self.passthrough)
+                self.passthrough = []
+            if self.ungrab_pending:
+                self.release_grab()
+            return
+        if event.type == ecodes.EV_REL and event.code in (ecodes.REL_X, ecodes.REL_Y):
+            return
+        if event.type == ecodes.EV_KEY and event.code == BUTTON1_SCANCODE:
+            return
+        if (event.type, event.code) in self.grab_filter:
+            return
+        self.passthrough.append(event)
 
-    def map_code_to_button(self, scancode):
-        scancode_mapping = {
-            277: "Button 1",
-            276: "Button 2",
-            275: "Button 3",
-            274: "Button 4",
-            12:  "Button 5",
-        }
-        return scancode_mapping.get(scancode, None)
+    def grab(self):
+        """Captura el ratón en exclusiva; devuelve False si no es posible."""
+        if self.clone is None:
+            return False
+        try:
+            self.device.grab()
+        except OSError as e:
+            log.warning("[Cursor] No se pudo capturar %s, se usará xinput: %s", self.path, e)
+            return False
+        disabled = self.listener.xinput_disabled_buttons(self.listener.dispatch)
+        grab_filter = set((ecodes.EV_KEY, BUTTON_SCANCODES[name]) for name in disabled if name in BUTTON_SCANCODES)
+        if "ScrollLeft" in disabled:
+            grab_filter.update([(ecodes.EV_REL, ecodes.REL_HWHEEL), (ecodes.EV_REL, ecodes.REL_HWHEEL_HI_RES)])
+        self.grab_filter = frozenset(grab_filter)
+        self.grabbed = True
+        self.ungrab_pending = False
+        self.grab_frame_pending = True
+        self.passthrough = []
+        return True
+
+    def release_grab(self):
+        self.ungrab_pending = False
+        if not self.grabbed:
+            return
+        self.grabbed = False
+        self.passthrough = []
+        try:
+            self.device.ungrab()
+        except OSError:
+            pass  # El dispositivo ya no existe
+
+    def accumulate_hwheel(self, value, hi_res=False):
+        accumulator = self.wheel_accumulator
+        # Con ventana configurada, un temporizador vacía lo acumulado aunque no lleguen más eventos
+        if accumulator.window and accumulator.started is None:
+            self.wheel_timer = self.listener.engine.call_later(accumulator.window, self.flush_hwheel)
+        accumulator.add(value, time.monotonic(), hi_res)
+
+    def flush_hwheel(self):
+        if self.wheel_timer is not None:
+            self.wheel_timer.cancel()
+            self.wheel_timer = None
+        value, hi_res_value = self.wheel_accumulator.take()
+        # El kernel envía REL_HWHEEL y REL_HWHEEL_HI_RES por el mismo movimiento:
+        # si el dispositivo tiene alta resolución se ignora el evento clásico
+        if hi_res_value:
+            self.hwheel_hi_res_seen = True
+            self.handle_hwheel_hi_res(hi_res_value)
+        elif value and not self.hwheel_hi_res_seen:
+            self.handle_hwheel(value)
 
     def handle_button1_press(self):
         if not self.button1_pressed:
             self.button1_pressed = True
-            self.button1_gesture_detected = False
-            self.button1_movement = {'x': 0, 'y': 0}
-            self.cursor_position = self.get_cursor_position() or (0, 0)
-            print("[Button 1] Pulsado. Cursor guardado en:", self.cursor_position)
-            self.float_device()
+            self.stroke.reset()
+            # Con el ratón capturado el movimiento no llega a X: no hay que guardar nada
+            if self.grab():
+                log.debug("[Button 1] Pulsado. Ratón capturado.")
+            else:
+                self.listener.run_cursor(self.save_cursor_and_float, self.frame)
 
     def handle_button1_release(self):
         if self.button1_pressed:
             self.button1_pressed = False
-            if not self.button1_gesture_detected:
-                action = self.config_manager.get_action("Button 1")
+            self.stroke.end_frame()
+            # Un trazo corto es una pulsación simple; si no, se reconoce el gesto completo
+            if self.stroke.extent() <= self.listener.gesture_threshold:
+                action = self.listener.dispatch.button1
                 if action:
-                    self.action_executor.execute(action)
-                    print("[Button 1] Acción de pulsación simple ejecutada")
+                    self.listener.run_action(action)
+                    log.debug("[Button 1] Acción de pulsación simple encolada")
+            else:
+                self.handle_gesture()
+            if self.grabbed:
+                # Se libera al final del frame, tras reenviar lo pendiente
+                self.ungrab_pending = True
             else:
-                print("[Button 1] Gesto detectado, no se ejecuta pulsación simple.")
-            self.reattach_device()
-            self.set_cursor_position(*self.cursor_position)
+                self.listener.run_cursor(self.restore_cursor)
+
+    # Las dos se ejecutan en orden en la cola "cursor", fuera del hilo de eventos
+    def save_cursor_and_float(self, frame=None):
+        self.cursor_position = self.listener.get_cursor_position(frame, self.path) or (0, 0)
+        log.debug("[Button 1] Pulsado. Cursor guardado en: %s", self.cursor_position)
+        self.float_device()
+
+    def restore_cursor(self):
+        self.reattach_device()
+        self.listener.set_cursor_position(*self.cursor_position)
 
     def handle_mouse_move(self, event):
-        if self.button1_pressed and not self.button1_gesture_detected:
+        if self.button1_pressed:
             if event.code == ecodes.REL_X:
-                self.button1_movement['x'] += event.value
+                self.stroke.move(event.value, 0)
             elif event.code == ecodes.REL_Y:
-                self.button1_movement['y'] += event.value
-
-            abs_x = abs(self.button1_movement['x'])
-            abs_y = abs(self.button1_movement['y'])
-
-            if abs_x > self.gesture_threshold or abs_y > self.gesture_threshold:
-                if abs_x > abs_y:
-                    direction = "right" if self.button1_movement['x'] > 0 else "left"
-                else:
-                    direction = "down" if self.button1_movement['y'] > 0 else "up"
+                self.stroke.move(0, event.value)
 
-                gesture_action = self.config_manager.get_gesture_action(direction)
-                if gesture_action:
-                    self.action_executor.execute(gesture_action)
-                    print(f"[Button 1] Gesto detectado: {direction} -> {gesture_action}")
-                else:
-                    print(f"[Button 1] Gesto detectado: {direction}, pero sin acción asignada.")
-                self.button1_gesture_detected = True
+    def handle_gesture(self):
+        dispatch = self.listener.dispatch
+        name, score = dispatch.recognizer.classify(self.stroke)
+        if name is None:
+            log.debug("[Button 1] Gesto no reconocido (similitud %.2f).", score)
+            return
+        gesture_action = dispatch.gestures.get(name)
+        if gesture_action:
+            self.listener.run_action(gesture_action)
+            log.debug("[Button 1] Gesto detectado: %s -> %s", name, gesture_action.label)
+        else:
+            log.debug("[Button 1] Gesto detectado: %s, pero sin acción asignada.", name)
 
     def handle_hwheel(self, value):
-        wheel_function = self.config_manager.get_wheel_function()
-        inverted = self.config_manager.get_inversion()
-        sensitivity = self.config_manager.get_sensitivity()
+        wheel = self.listener.dispatch.wheel
+        direction = -value if wheel.inverted else value
+        clicks = max(abs(int((wheel.sensitivity / 100) * direction)), 1)
+        self.dispatch_hwheel(wheel.function, direction, clicks, wheel.sensitivity)
+
+    def handle_hwheel_hi_res(self, value):
+        wheel = self.listener.dispatch.wheel
+        self.hwheel_hi_res.add(-value if wheel.inverted else value, wheel.sensitivity)
+
+        # Con un backend que soporte REL_HWHEEL_HI_RES el scroll se reenvía sin cuantizar
+        output = self.listener.action_executor.output
+        if wheel.function == "Scroll Horizontal" and output.hi_res_scroll:
+            units = self.hwheel_hi_res.take_units()
+            if units:
+                self.listener.run_output(output.hscroll_hi_res, units)
+            return
 
-        direction = -value if inverted else value
-        clicks = max(abs(int((sensitivity / 100) * direction)), 1)
+        detents = self.hwheel_hi_res.take_detents()
+        if detents:
+            self.dispatch_hwheel(wheel.function, detents, abs(detents), wheel.sensitivity)
 
+    def dispatch_hwheel(self, wheel_function, direction, clicks, sensitivity):
         if wheel_function == "Scroll Horizontal":
             self.scroll_horizontal(direction, clicks, sensitivity)
         elif wheel_function == "Volume Control":
@@ -261,51 +464,265 @@ class MouseEventListener(threading.Thread):
         else:
             self.scroll_horizontal(direction, clicks, sensitivity)
 
-    def handle_hwheel_hi_res(self, value):
-        normalized = value // 120
-        self.handle_hwheel(normalized)
-
     def scroll_horizontal(self, direction, clicks, sensitivity):
         if direction > 0:
-            for _ in range(clicks):
-                subprocess.Popen(["xdotool", "click", "7"])
-            print(f"[Scroll Horizontal] DERECHA => clicks={clicks} sens={sensitivity}")
+            self.listener.run_output(self.listener.action_executor.output.click, 7, clicks)
+            log.debug("[Scroll Horizontal] DERECHA => clicks=%s sens=%s", clicks, sensitivity)
         elif direction < 0:
-            for _ in range(clicks):
-                subprocess.Popen(["xdotool", "click", "6"])
-            print(f"[Scroll Horizontal] IZQUIERDA => clicks={clicks} sens={sensitivity}")
+            self.listener.run_output(self.listener.action_executor.output.click, 6, clicks)
+            log.debug("[Scroll Horizontal] IZQUIERDA => clicks=%s sens=%s", clicks, sensitivity)
 
     def volume_control(self, direction, clicks, sensitivity):
         key = "XF86AudioRaiseVolume" if direction > 0 else "XF86AudioLowerVolume"
-        for _ in range(clicks):
-            subprocess.Popen(["xdotool", "key", key])
-        action = "Subir" if direction > 0 else "Bajar"
-        print(f"[Volume Control] {action} => clicks={clicks} sens={sensitivity}")
+        self.listener.run_output(self.listener.action_executor.output.key, key, clicks)
+        log.debug("[Volume Control] %s => clicks=%s sens=%s", "Subir" if direction > 0 else "Bajar", clicks, sensitivity)
 
     def zoom(self, direction, clicks, sensitivity):
         key = "ctrl+KP_Add" if direction > 0 else "ctrl+KP_Subtract"
-        for _ in range(clicks):
-            subprocess.Popen(["xdotool", "key", key])
-        action = "Acercar" if direction > 0 else "Alejar"
-        print(f"[Zoom] {action} => clicks={clicks} sens={sensitivity}")
+        self.listener.run_output(self.listener.action_executor.output.key, key, clicks)
+        log.debug("[Zoom] %s => clicks=%s sens=%s", "Acercar" if direction > 0 else "Alejar", clicks, sensitivity)
 
     def float_device(self):
         if self.xinput_id:
-            try:
-                subprocess.check_call(["xinput", "float", str(self.xinput_id)])
-                print(f"[Cursor] Dispositivo {self.xinput_id} desconectado (float).")
-            except subprocess.CalledProcessError as e:
-                print(f"Error al hacer float en xinput: {e}")
+            self.listener.xinput.float_device(self.xinput_id)
 
     def reattach_device(self):
         if self.xinput_id:
-            try:
-                subprocess.check_call(["xinput", "reattach", str(self.xinput_id), str(self.master_pointer_id)])
-                print(f"[Cursor] Dispositivo {self.xinput_id} reenganchado a maestro {self.master_pointer_id}.")
-            except subprocess.CalledProcessError as e:
-                print(f"Error al hacer reattach en xinput: {e}")
+            self.listener.xinput.reattach(self.xinput_id, self.listener.master_pointer_id)
+
+    def close(self):
+        if self.wheel_timer is not None:
+            self.wheel_timer.cancel()
+            self.wheel_timer = None
+        self.release_grab()
+        if self.clone is not None:
+            self.clone.close()
+            self.clone = None
+        self.listener.engine.remove_device(self.device)
+        try:
+            self.device.close()
+        except Exception:
+            pass
+
+
+class MouseEventListener(threading.Thread):
+    BUTTON_XINPUT_MAP = {
+        "Button 1": 1,
+        "Button 2": 8,
+        "Button 3": 9,
+        "Button 4": 4,
+        "Button 5": 5,
+        "ScrollLeft": 6,
+        "ScrollRight": 7,
+    }
+
+    def __init__(self, config_manager, action_executor, engine=None, registry=None, xinput=None, action_queue=None,
+                 recorder=None):
+        super().__init__()
+        self.config_manager = config_manager
+        self.action_executor = action_executor
+        # EventRecorder de --record: graba lo que llega de evdev antes de procesarlo
+        self.recorder = recorder
+        # El hilo de eventos solo encola: las acciones las ejecuta un grupo de hilos
+        self.action_queue = action_queue or ActionQueue(
+            config_manager.get_setting("action_queue_size") or 64,
+            config_manager.get_setting("action_queue_policy") or "drop-oldest",
+            config_manager.get_setting("action_workers") or 4,
+            config_manager.get_setting("action_concurrency"),
+        )
+        # Latencias por etapa (kernel -> lectura -> encolado -> fin de la acción)
+        self.latency = PipelineStats()
+        self.action_queue.latency = self.latency
+        self.stats_interval = config_manager.get_setting("stats_interval_s") or 0
+        self.engine = engine or EventEngine()
+        self.registry = registry or DeviceRegistry()
+        self.xinput = xinput or XInput()
+        self.running = True
+
+        # Instantánea inmutable de la configuración; la GUI la sustituye al cambiar algo
+        self.dispatch = config_manager.dispatch
+        # Perfiles por aplicación: la ventana activa decide qué DispatchTable se usa
+        self.window_classes = ()
+        self.focus_watcher = None
+
+        self.gesture_threshold = 50
+        self.first_event_handled = False
+        self.cursor_freeze = config_manager.get_setting("cursor_freeze") or "grab"
+        if self.cursor_freeze not in ("grab", "xinput"):
+            log.warning("[Cursor] Modo de congelación desconocido '%s', se usará grab.", self.cursor_freeze)
+            self.cursor_freeze = "grab"
+        coalesce_ms = self.config_manager.get_setting("wheel_coalesce_ms") or 0
+        self.wheel_window = coalesce_ms / 1000
+
+        self.master_pointer_id = self.xinput.master_pointer_id()
+
+        # Ratones conectados (ruta evdev -> MouseDevice) y nodos que no son un MX Master
+        self.devices = {}
+        self.ignored_paths = set()
+        for path in self.registry.list_paths():
+            self.add_device(path)
+        if not self.devices:
+            log.warning("WARNING: Ratón Logitech MX Master no encontrado en evdev. Se esperará a que se conecte.")
+
+        self.hotplug = HotplugMonitor(self.engine, self.registry, self.add_device, self.remove_device)
+        config_manager.add_listener(self.on_config_changed)
+
+    def report_first_event(self):
+        self.first_event_handled = True
+        STARTUP.mark("first_event")
+        log.info("[Startup] %s", STARTUP.summary())
+
+    def is_mouse_device(self, device):
+        # Las copias uinput del modo grab también se llaman "MX Master": adoptarlas las multiplicaría
+        if device.name.endswith(CLONE_SUFFIX):
+            return False
+        return 'MX Master' in device.name and ecodes.EV_REL in device.capabilities()
+
+    def add_device(self, path):
+        if path in self.devices or path in self.ignored_paths:
+            return
+        try:
+            device = self.registry.open(path)
+        except OSError:
+            # Puede que udev aún no haya aplicado los permisos; llegará otro aviso (IN_ATTRIB)
+            return
+        if not self.is_mouse_device(device):
+            self.ignored_paths.add(path)
+            device.close()
+            return
+        log.info("Dispositivo evdev encontrado: %s - %s", device.path, device.name)
+        mouse = MouseDevice(self, device)
+        self.devices[path] = mouse
+        handler = mouse.handle_event
+        if self.recorder:
+            handler = self.recorder.wrap(handler, device.name)
+        self.engine.add_device(device, handler, self.on_read_error)
+        self.run_xinput(mouse.setup_xinput)
+
+    def remove_device(self, path):
+        self.ignored_paths.discard(path)
+        mouse = self.devices.pop(path, None)
+        if mouse:
+            log.info("[Hotplug] Dispositivo desconectado: %s - %s", path, mouse.name)
+            mouse.close()
+
+    def on_read_error(self, device, error):
+        # ENODEV: el ratón se ha dormido o desconectado; volverá por hotplug
+        self.remove_device(device.path)
+
+    def xinput_disabled_buttons(self, dispatch):
+        disabled = []
+        # En modo grab X recibe la pulsación de Button 1 antes de la captura pero
+        # nunca la liberación: el botón se quedaría pulsado tras cada gesto
+        if self.cursor_freeze == "grab":
+            disabled.append("Button 1")
+        # Desactivar botones 2 y 3 si tienen acciones personalizadas
+        for button_name in ["Button 2", "Button 3"]:
+            action = dispatch.buttons.get(BUTTON_SCANCODES[button_name])
+            if action and action.label not in ["Back", "Forward"]:
+                disabled.append(button_name)
+        # Desactivar scroll horizontal si tiene acción personalizada
+        if dispatch.wheel.function != "Scroll Horizontal":
+            disabled += ["ScrollLeft", "ScrollRight"]
+        return tuple(disabled)
+
+    def on_config_changed(self, dispatch):
+        # La tabla del perfil activo se elige en el hilo de eventos, que es el que sigue el foco
+        self.engine.call_soon(self.apply_config)
+
+    def apply_config(self):
+        self.dispatch = self.config_manager.dispatch_for_window(self.window_classes)
+        self.apply_xinput_changes(self.dispatch)
+        self.watch_focus()
+
+    def apply_xinput_changes(self, dispatch):
+        # set-button-map lanza un proceso: el hilo de eventos solo lo encola
+        for mouse in list(self.devices.values()):
+            self.run_xinput(mouse.on_config_changed, dispatch)
+
+    def watch_focus(self):
+        # Solo se escucha a X si hay perfiles; se empieza al añadir el primero
+        if self.focus_watcher is None and self.config_manager.profiles:
+            self.focus_watcher = ActiveWindowWatcher(self.engine, self.on_focus_changed)
+            self.focus_watcher.start()
+
+    def on_focus_changed(self, window_classes):
+        self.window_classes = window_classes
+        dispatch = self.config_manager.dispatch_for_window(window_classes)
+        if dispatch is self.dispatch:
+            return
+        # Cambiar de perfil es sustituir la tabla; xinput solo se toca si cambian los botones desactivados
+        self.dispatch = dispatch
+        log.debug("[Profiles] Ventana activa %s", window_classes)
+        self.apply_xinput_changes(dispatch)
+
+    def run_action(self, action):
+        kind = "output" if action.kind in ("key", "click") else "spawn"
+        self.submit(kind, self.action_executor.execute, action)
+
+    def run_output(self, func, *args):
+        # click/key/hscroll_hi_res: el último argumento son repeticiones que la cola puede sumar
+        self.submit("output", func, *args, merge=True)
+
+    def run_cursor(self, func, *args):
+        self.submit("cursor", func, *args)
+
+    def run_xinput(self, func, *args):
+        # Mismo orden que float/reattach; no es la respuesta a un evento, así que no cuenta en las latencias
+        self.action_queue.submit("cursor", func, *args)
+
+    def run_xinput_later(self, delay, func, *args):
+        """Encola func en la cola de xinput pasado delay; se puede llamar desde cualquier hilo."""
+        try:
+            self.engine.call_soon(self.engine.call_later, delay, self.run_xinput, func, *args)
+        except RuntimeError:
+            pass  # El bucle ya se ha cerrado
+
+    def submit(self, kind, func, *args, merge=False):
+        # read_time es la del último evento leído: en la rueda agrupada incluye la ventana de espera
+        self.latency.record(READ_DISPATCH, time.time() - self.engine.read_time)
+        self.action_queue.submit(kind, func, *args, merge=merge)
+
+    def report_stats(self):
+        self.latency.report()
+        self.engine.call_later(self.stats_interval, self.report_stats)
+
+    def get_cursor_position(self, frame=None, device=None):
+        try:
+            return get_connection().query_pointer(frame, device)
+        except Exception as e:
+            log.error("Error al obtener posición del cursor: %s", e)
+            return None
+
+    def set_cursor_position(self, x, y):
+        try:
+            get_connection().warp_pointer(x, y)
+            log.debug("Cursor movido a (%s, %s)", x, y)
+        except Exception as e:
+            log.error("Error al establecer posición del cursor: %s", e)
+
+    def map_code_to_button(self, scancode):
+        return SCANCODE_BUTTONS.get(scancode, None)
+
+    def run(self):
+        self.hotplug.start()
+        self.engine.call_soon(self.watch_focus)
+        if self.stats_interval > 0:
+            self.engine.call_soon(self.engine.call_later, self.stats_interval, self.report_stats)
+        self.engine.run()
 
     def stop(self):
         self.running = False
-        self.reattach_device()
-        print("[MouseEventListener] Detenido.")
+        self.hotplug.stop()
+        if self.focus_watcher:
+            self.focus_watcher.stop()
+        self.engine.stop()
+        self.action_queue.stop()
+        stats = self.action_queue.stats()
+        log.info("[ActionQueue] Ejecutadas: %s, descartadas: %s, profundidad máxima: %s",
+                 stats.get("executed", 0), stats.get("dropped", 0), stats["max_depth"])
+        self.latency.report()
+        for mouse in list(self.devices.values()):
+            mouse.release_grab()
+            mouse.reattach_device()
+        log.info("[MouseEventListener] Detenido.")
@@ -1,37 +1,192 @@
-import subprocess
-import re
+import glob
+import logging
+import os
+import threading
 
-class BatteryManager:
-    def __init__(self):
-        self.device_path = None
-        # Verificar si upower está disponible
-        try:
-            subprocess.check_output(["which", "upower"], universal_newlines=True)
-            self.device_path = self.find_mouse_device_path()
-            if not self.device_path:
-                print("Dispositivo de ratón no encontrado con upower.")
-        except Exception as e:
-            print("Upower no está disponible o error al verificar:", e)
-    
-    def find_mouse_device_path(self):
-        try:
-            devices_output = subprocess.check_output(["upower", "-e"], universal_newlines=True)
-            devices = devices_output.splitlines()
-            for dev in devices:
-                if "mouse" in dev.lower() or "hid" in dev.lower():
-                    return dev.strip()  # Ej: /org/freedesktop/UPower/devices/mouse_hid_...
-        except Exception as e:
-            print("Error buscando dispositivo en upower:", e)
+log = logging.getLogger(__name__)
+
+UPOWER_SERVICE = "org.freedesktop.UPower"
+UPOWER_PATH = "/org/freedesktop/UPower"
+UPOWER_DEVICE_INTERFACE = "org.freedesktop.UPower.Device"
+PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+
+POWER_SUPPLY_DIR = "/sys/class/power_supply"
+# Intervalo de lectura de sysfs cuando no hay UPower (leer un archivo no crea procesos)
+SYSFS_INTERVAL = 30.0
+# Algunos drivers (hidpp) solo publican un nivel aproximado
+CAPACITY_LEVELS = {
+    "Full": 100,
+    "High": 80,
+    "Normal": 50,
+    "Low": 20,
+    "Critical": 5,
+}
+
+
+def is_mouse_path(path):
+    path = path.lower()
+    return "mouse" in path or "hid" in path
+
+
+class SysfsBattery:
+    """Lee la batería del ratón directamente de /sys/class/power_supply."""
+
+    def __init__(self, root=POWER_SUPPLY_DIR):
+        self.root = root
+
+    def find(self):
+        """Directorio de la batería de un periférico (scope Device), o None."""
+        candidates = []
+        for supply in sorted(glob.glob(os.path.join(self.root, "*"))):
+            if read_attribute(supply, "scope") != "Device":
+                continue  # Baterías del propio portátil o SAIs
+            model = read_attribute(supply, "model_name") or ""
+            candidates.append((0 if "MX Master" in model else 1, supply))
+        return min(candidates)[1] if candidates else None
+
+    def read(self):
+        supply = self.find()
+        if supply is None:
+            return None
+        capacity = read_attribute(supply, "capacity")
+        if capacity is not None and capacity.isdigit():
+            return int(capacity)
+        return CAPACITY_LEVELS.get(read_attribute(supply, "capacity_level"))
+
+
+def read_attribute(supply, name):
+    try:
+        with open(os.path.join(supply, name)) as f:
+            return f.read().strip()
+    except OSError:
         return None
 
+
+class BatteryManager:
+    """
+    Informa del porcentaje de batería del ratón llamando a on_change solo
+    cuando cambia. Se suscribe a PropertiesChanged de UPower por D-Bus (con
+    QtDBus, en el hilo de Qt) y, si no está disponible, lee sysfs
+    periódicamente desde un hilo propio sin importar Qt. Cuando el ratón
+    responde por HID++ (publish_hidpp) esa lectura tiene prioridad hasta que
+    deja de responder (hidpp_lost).
+    """
+
+    def __init__(self, on_change, use_dbus=True, sysfs=None):
+        self.on_change = on_change
+        self.use_dbus = use_dbus
+        self.sysfs = sysfs or SysfsBattery()
+        self.percentage = None
+        self.hidpp_active = False
+        self.upower = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.use_dbus:
+            try:
+                self.upower = create_upower_monitor(self.publish)
+                log.info("[Battery] Suscrito a los cambios de UPower por D-Bus.")
+                return
+            except Exception as e:
+                log.warning("[Battery] UPower no disponible por D-Bus, se leerá sysfs: %s", e)
+        self._thread = threading.Thread(target=self._poll_sysfs, name="BatterySysfs", daemon=True)
+        self._thread.start()
+
+    def _poll_sysfs(self):
+        while True:
+            percentage = self.sysfs.read()
+            if percentage is not None:
+                self.publish(percentage)
+            if self._stop_event.wait(SYSFS_INTERVAL):
+                return
+
+    def publish(self, percentage):
+        if self.hidpp_active:
+            return  # UPower y sysfs pueden corresponder a otro dispositivo
+        self._update(percentage)
+
+    def publish_hidpp(self, percentage):
+        self.hidpp_active = True
+        self._update(percentage)
+
+    def hidpp_lost(self):
+        # Sin conexión HID++ vuelven a contar UPower y sysfs
+        self.hidpp_active = False
+
+    def _update(self, percentage):
+        percentage = int(round(percentage))
+        if percentage == self.percentage:
+            return
+        self.percentage = percentage
+        self.on_change(percentage)
+
     def get_battery_percentage(self):
-        if not self.device_path:
-            return 0  # O podrías retornar None, según tu lógica
-        try:
-            info = subprocess.check_output(["upower", "-i", self.device_path], universal_newlines=True)
-            match = re.search(r'percentage:\s+(\d+)%', info)
-            if match:
-                return int(match.group(1))
-        except Exception as e:
-            print("Error al leer porcentaje de batería con upower:", e)
-        return 0
\ No newline at end of file
+        return self.percentage or 0
+
+    def stop(self):
+        self._stop_event.set()
+        self.upower = None
+
+
+def create_upower_monitor(publish):
+    """Crea el suscriptor de UPower; QtDBus solo se importa aquí."""
+    from PyQt5.QtCore import QObject, pyqtSlot
+    from PyQt5.QtDBus import QDBusConnection, QDBusInterface, QDBusMessage
+
+    def object_path(value):
+        return value.path() if hasattr(value, "path") else str(value)
+
+    def unwrap(value):
+        return value.variant() if hasattr(value, "variant") else value
+
+    class UPowerMonitor(QObject):
+        def __init__(self):
+            super().__init__()
+            self.bus = QDBusConnection.systemBus()
+            if not self.bus.isConnected():
+                raise RuntimeError("no hay conexión con el bus del sistema")
+            self.device_path = None
+            # El ratón aparece y desaparece de UPower al dormirse
+            self.bus.connect(UPOWER_SERVICE, UPOWER_PATH, UPOWER_SERVICE, "DeviceAdded", self.on_devices_changed)
+            self.bus.connect(UPOWER_SERVICE, UPOWER_PATH, UPOWER_SERVICE, "DeviceRemoved", self.on_devices_changed)
+            self.find_device()
+
+        def call(self, path, interface, method, *args):
+            reply = QDBusInterface(UPOWER_SERVICE, path, interface, self.bus).call(method, *args)
+            if reply.type() == QDBusMessage.ErrorMessage:
+                raise RuntimeError(reply.errorMessage())
+            return reply.arguments()
+
+        def find_device(self):
+            paths = [object_path(p) for p in self.call(UPOWER_PATH, UPOWER_SERVICE, "EnumerateDevices")[0]]
+            device_path = next((p for p in paths if is_mouse_path(p)), None)
+            if device_path == self.device_path:
+                return
+            if self.device_path:
+                self.bus.disconnect(UPOWER_SERVICE, self.device_path, PROPERTIES_INTERFACE,
+                                    "PropertiesChanged", self.on_properties_changed)
+            self.device_path = device_path
+            if device_path is None:
+                log.info("Dispositivo de ratón no encontrado con upower.")
+                return
+            self.bus.connect(UPOWER_SERVICE, device_path, PROPERTIES_INTERFACE,
+                             "PropertiesChanged", self.on_properties_changed)
+            percentage = self.call(device_path, PROPERTIES_INTERFACE, "Get",
+                                   UPOWER_DEVICE_INTERFACE, "Percentage")[0]
+            publish(unwrap(percentage))
+
+        @pyqtSlot(QDBusMessage)
+        def on_devices_changed(self, message):
+            try:
+                self.find_device()
+            except Exception as e:
+                log.error("[Battery] Error al buscar el ratón en UPower: %s", e)
+
+        @pyqtSlot(QDBusMessage)
+        def on_properties_changed(self, message):
+            interface, changed = message.arguments()[:2]
+            if interface == UPOWER_DEVICE_INTERFACE and "Percentage" in changed:
+                publish(unwrap(changed["Percentage"]))
+
+    return UPowerMonitor()
@@ -1,5 +1,13 @@
 import json
+import logging
 import os
+import stat
+import tempfile
+import threading
+
+from src.dispatch import compile_dispatch, compile_profiles, is_number, validate_actions
+
+log = logging.getLogger(__name__)
 
 def get_config_path():
     """
@@ -12,14 +20,116 @@ def get_config_path():
         try:
             os.makedirs(config_dir)
         except Exception as e:
-            print(f"Error al crear el directorio de configuración: {e}")
+            log.error("Error al crear el directorio de configuración: %s", e)
     return os.path.join(config_dir, "actions.json")
 
 ACTIONS_FILE = get_config_path()
 
+# Los cambios que llegan dentro de este intervalo se agrupan en una sola escritura
+SAVE_DELAY = 0.5
+
+# Ajustes generales que no dependen de ningún botón (clave "Settings")
+DEFAULT_SETTINGS = {
+    "output_backend": "auto",
+    "wheel_coalesce_ms": 0,
+    "action_queue_size": 64,
+    # "drop-oldest", "coalesce" o "block"
+    "action_queue_policy": "drop-oldest",
+    "action_workers": 4,
+    # Límite de acciones simultáneas por tipo ("output", "cursor", "spawn")
+    "action_concurrency": {},
+    # Procesos hijos vivos como máximo y segundos antes de matar un comando (0: nunca)
+    "max_children": 64,
+    "command_timeout": 0,
+    # Cómo se congela el cursor durante un gesto: "grab" (EVIOCGRAB) o "xinput"
+    "cursor_freeze": "grab",
+    # Se aplican por HID++ al conectar el ratón (0: no se cambian)
+    "dpi": 0,
+    "smartshift_threshold": 0,
+    # Nivel de los mensajes: "debug" incluye un mensaje por acción del ratón
+    "log_level": "info",
+    # Cada cuántos segundos se imprimen los histogramas de latencia (0: solo al salir)
+    "stats_interval_s": 300,
+}
+
+def validate_settings(settings):
+    """Comprueba que los ajustes conocidos tengan el tipo de su valor por defecto; devuelve los errores."""
+    if not isinstance(settings, dict):
+        return ["Settings: debe ser un objeto"]
+    errors = []
+    for name, value in settings.items():
+        default = DEFAULT_SETTINGS.get(name)
+        if default is None:
+            continue  # Ajustes desconocidos: no se usan
+        if isinstance(default, str):
+            valid = isinstance(value, str)
+        elif isinstance(default, dict):
+            valid = isinstance(value, dict) and all(is_number(v) for v in value.values())
+        else:
+            valid = is_number(value) and value >= 0
+        if not valid:
+            errors.append(f"Settings.{name}: valor no válido {value!r}")
+    return errors
+
+
+def validate_config(actions):
+    """Errores de tipo de actions.json completo (botones, perfiles y ajustes)."""
+    return validate_actions(actions) + validate_settings(actions.get("Settings", {}))
+
+
+def write_atomic(path, data):
+    """
+    Escribe el archivo en un temporal único del mismo directorio, hace fsync
+    y lo renombra sobre el original, de modo que una caída nunca deja el
+    archivo truncado. Si path es un enlace simbólico se reemplaza su
+    destino y el enlace se conserva. Devuelve False si no se pudo escribir.
+    """
+    real_path = os.path.realpath(path)
+    directory = os.path.dirname(real_path)
+    tmp_path = None
+    try:
+        # Un nombre propio por escritura: dos procesos guardando a la vez no comparten el temporal
+        with tempfile.NamedTemporaryFile('w', dir=directory, prefix=f".{os.path.basename(real_path)}.",
+                                         suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+            if os.path.exists(real_path):
+                os.fchmod(f.fileno(), stat.S_IMODE(os.stat(real_path).st_mode))
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, real_path)
+    except Exception as e:
+        log.error("Error al guardar la configuración: %s", e)
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        return False
+    # El archivo ya está reemplazado: un fallo aquí solo afecta a la durabilidad
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError as e:
+        log.warning("No se pudo sincronizar el directorio de la configuración: %s", e)
+    return True
+
 class ConfigManager:
     def __init__(self):
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._pending_data = None
+        # Lo que flush() está escribiendo: el watcher puede leerlo antes de que termine el fsync
+        self._inflight_data = None
+        self._saved_data = None
         self.actions = self.load_actions()
+        self.profiles = compile_profiles(self.actions)
+        self.dispatch = compile_dispatch(self.actions)
+        self._listeners = []
+        self._reload_listeners = []
 
     def load_actions(self):
         if not os.path.exists(ACTIONS_FILE):
@@ -41,65 +151,183 @@ class ConfigManager:
                     "sensitivity": 100,
                     "function": "Scroll Horizontal"
                 },
-                "Button 6": ""
+                "Button 6": "",
+                "Settings": dict(DEFAULT_SETTINGS)
             }
-            with open(ACTIONS_FILE, 'w') as f:
-                json.dump(default_actions, f, indent=4)
+            data = json.dumps(default_actions, indent=4)
+            if write_atomic(ACTIONS_FILE, data):
+                self._saved_data = data
             return default_actions
         else:
             try:
                 with open(ACTIONS_FILE, 'r') as f:
                     actions = json.load(f)
             except Exception as e:
-                print(f"Error al leer el archivo de configuración: {e}")
+                log.error("Error al leer el archivo de configuración: %s", e)
                 actions = {}
 
-            # Asegurarse de que Button 5 tenga la estructura correcta
-            if isinstance(actions.get("Button 5"), str):
-                actions["Button 5"] = {
-                    "inverted": False,
-                    "sensitivity": 100,
-                    "function": "Scroll Horizontal"
-                }
-                self.save_actions(actions)
-
-            # Asegurarse de que Button 1 tenga la estructura correcta
-            btn1 = actions.get("Button 1")
-            if isinstance(btn1, str):
-                actions["Button 1"] = {
-                    "action": btn1,
-                    "gestures_enabled": False,
-                    "gesture_up": "",
-                    "gesture_down": "",
-                    "gesture_left": "",
-                    "gesture_right": ""
-                }
-            elif isinstance(btn1, dict):
-                if "action" not in btn1:
-                    btn1["action"] = ""
-                if "gestures_enabled" not in btn1:
-                    btn1["gestures_enabled"] = False
-                if "gesture_up" not in btn1:
-                    btn1["gesture_up"] = ""
-                if "gesture_down" not in btn1:
-                    btn1["gesture_down"] = ""
-                if "gesture_left" not in btn1:
-                    btn1["gesture_left"] = ""
-                if "gesture_right" not in btn1:
-                    btn1["gesture_right"] = ""
-                actions["Button 1"] = btn1
-
+            if not isinstance(actions, dict):
+                log.error("El archivo de configuración debe contener un objeto, se ignora.")
+                actions = {}
+            errors = validate_config(actions)
+            if errors:
+                # Al arrancar no hay configuración anterior: los valores no válidos toman el de por defecto
+                log.error("[Config] actions.json tiene valores no válidos, se usarán los de por defecto:\n  %s",
+                          "\n  ".join(errors))
+            self.normalize_actions(actions)
             self.save_actions(actions)
             return actions
 
+    def normalize_actions(self, actions):
+        """Completa en el propio diccionario la estructura de Button 1 y Button 5."""
+        # Asegurarse de que Button 5 tenga la estructura correcta
+        if isinstance(actions.get("Button 5"), str):
+            actions["Button 5"] = {
+                "inverted": False,
+                "sensitivity": 100,
+                "function": "Scroll Horizontal"
+            }
+
+        # Asegurarse de que Button 1 tenga la estructura correcta
+        btn1 = actions.get("Button 1")
+        if isinstance(btn1, str):
+            actions["Button 1"] = {
+                "action": btn1,
+                "gestures_enabled": False,
+                "gesture_up": "",
+                "gesture_down": "",
+                "gesture_left": "",
+                "gesture_right": ""
+            }
+        elif isinstance(btn1, dict):
+            if "action" not in btn1:
+                btn1["action"] = ""
+            if "gestures_enabled" not in btn1:
+                btn1["gestures_enabled"] = False
+            if "gesture_up" not in btn1:
+                btn1["gesture_up"] = ""
+            if "gesture_down" not in btn1:
+                btn1["gesture_down"] = ""
+            if "gesture_left" not in btn1:
+                btn1["gesture_left"] = ""
+            if "gesture_right" not in btn1:
+                btn1["gesture_right"] = ""
+            actions["Button 1"] = btn1
+        return actions
+
+    def reload(self):
+        """
+        Vuelve a leer actions.json tras un cambio externo, lo valida y publica
+        la nueva configuración. Devuelve False si no había cambios o no era válido.
+        """
+        try:
+            with open(ACTIONS_FILE, 'r') as f:
+                data = f.read()
+        except Exception as e:
+            log.error("Error al leer el archivo de configuración: %s", e)
+            return False
+        # Nuestras propias escrituras no cuentan como cambio
+        if self.is_own_data(data):
+            return False
+        try:
+            actions = json.loads(data)
+        except ValueError as e:
+            log.warning("[Config] actions.json no es JSON válido, se ignora el cambio: %s", e)
+            return False
+        if not isinstance(actions, dict):
+            log.warning("[Config] actions.json debe contener un objeto, se ignora el cambio.")
+            return False
+        errors = validate_config(actions)
+        if errors:
+            log.error("[Config] actions.json no es válido, se mantiene la configuración anterior:\n  %s",
+                      "\n  ".join(errors))
+            return False
+
+        # El cambio externo prevalece sobre un guardado pendiente de la GUI
+        with self._save_lock:
+            # Con el cerrojo ya ha terminado cualquier flush(): se vuelve a comprobar
+            # para no descartar un guardado más reciente por nuestro propio contenido
+            if self.is_own_data(data):
+                return False
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            self._pending_data = None
+            self._saved_data = data
+        self.actions = self.normalize_actions(actions)
+        self.profiles = compile_profiles(self.actions)
+        self.dispatch = compile_dispatch(self.actions)
+        log.info("[Config] Configuración recargada desde disco.")
+        for callback in self._listeners:
+            callback(self.dispatch)
+        for callback in self._reload_listeners:
+            callback()
+        return True
+
     def save_actions(self, actions=None):
+        """
+        Programa el guardado de la configuración. Las llamadas dentro de
+        SAVE_DELAY se agrupan en una única escritura; flush() la fuerza.
+        """
         if actions is None:
             actions = self.actions
-        try:
-            with open(ACTIONS_FILE, 'w') as f:
-                json.dump(actions, f, indent=4)
-        except Exception as e:
-            print(f"Error al guardar la configuración: {e}")
+        # Se serializa ya, en el hilo que modifica la configuración
+        data = json.dumps(actions, indent=4)
+        with self._save_lock:
+            self._pending_data = data
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        """Escribe a disco los cambios pendientes, si los hay."""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            data = self._pending_data
+            self._pending_data = None
+            if data is None:
+                return
+            self._inflight_data = data
+            try:
+                if write_atomic(ACTIONS_FILE, data):
+                    self._saved_data = data
+                else:
+                    # Queda pendiente para el siguiente guardado o flush()
+                    self._pending_data = data
+            finally:
+                self._inflight_data = None
+
+    def is_own_data(self, data):
+        """True si data es lo último que escribió la aplicación o lo que está escribiendo."""
+        return data == self._saved_data or data == self._inflight_data
+
+    def dispatch_for_window(self, wm_classes):
+        """DispatchTable del perfil de la ventana con esas clases (WM_CLASS), o la general."""
+        profiles = self.profiles
+        for wm_class in wm_classes:
+            table = profiles.get(wm_class.lower())
+            if table is not None:
+                return table
+        return self.dispatch
+
+    def add_listener(self, callback):
+        """Registra una función que recibe la nueva DispatchTable tras cada cambio."""
+        self._listeners.append(callback)
+
+    def add_reload_listener(self, callback):
+        """Registra una función que se llama cuando la configuración se recarga desde disco."""
+        self._reload_listeners.append(callback)
+
+    def _commit(self):
+        # Guarda y publica una nueva instantánea; la sustitución del atributo es atómica
+        self.save_actions()
+        self.profiles = compile_profiles(self.actions)
+        self.dispatch = compile_dispatch(self.actions)
+        for callback in self._listeners:
+            callback(self.dispatch)
 
     # Métodos para Botones (excepto Button 5)
     def get_action(self, button_name):
@@ -127,12 +355,12 @@ class ConfigManager:
                 }
             b1["action"] = action
             self.actions["Button 1"] = b1
-            self.save_actions()
+            self._commit()
         elif button_name == "Button 5":
             pass
         else:
             self.actions[button_name] = action
-            self.save_actions()
+            self._commit()
 
     # Métodos para Button 1 (Gestos)
     def get_gestures_enabled(self):
@@ -155,7 +383,7 @@ class ConfigManager:
         else:
             b1["gestures_enabled"] = enabled
         self.actions["Button 1"] = b1
-        self.save_actions()
+        self._commit()
 
     def get_gesture_action(self, direction: str) -> str:
         b1 = self.actions.get("Button 1", {})
@@ -176,7 +404,7 @@ class ConfigManager:
             }
         b1[f"gesture_{direction}"] = action_value
         self.actions["Button 1"] = b1
-        self.save_actions()
+        self._commit()
 
     # Métodos para Button 5
     def get_inversion(self):
@@ -203,7 +431,7 @@ class ConfigManager:
         else:
             btn5["inverted"] = inverted
         self.actions["Button 5"] = btn5
-        self.save_actions()
+        self._commit()
 
     def get_sensitivity(self):
         btn5 = self.actions.get("Button 5", {})
@@ -229,7 +457,7 @@ class ConfigManager:
         else:
             btn5["sensitivity"] = sensitivity
         self.actions["Button 5"] = btn5
-        self.save_actions()
+        self._commit()
 
     def get_wheel_function(self):
         config_5 = self.actions.get("Button 5", {})
@@ -239,4 +467,14 @@ class ConfigManager:
         config_5 = self.actions.get("Button 5", {})
         config_5["function"] = func
         self.actions["Button 5"] = config_5
-        self.save_actions()
+        self._commit()
+
+    # Ajustes generales
+    def get_setting(self, name):
+        settings = self.actions.get("Settings", {})
+        if isinstance(settings, dict) and name in settings:
+            value = settings[name]
+            # Un valor de otro tipo (archivo editado a mano) se sustituye por el de por defecto
+            if not validate_settings({name: value}):
+                return value
+        return DEFAULT_SETTINGS.get(name)
@@ -0,0 +1,79 @@
+import logging
+import os
+import select
+import threading
+import time
+
+from src.inotify import IN_CLOSE_WRITE, IN_MOVED_TO, Inotify
+
+log = logging.getLogger(__name__)
+
+# Los editores suelen escribir varias veces seguidas: se espera a que se calmen
+SETTLE_DELAY = 0.1
+# Intervalo del sondeo por mtime cuando inotify no está disponible
+POLL_INTERVAL = 2.0
+
+
+class ConfigWatcher(threading.Thread):
+    """
+    Vigila el directorio de configuración y recarga actions.json en segundo
+    plano cuando cambia desde fuera de la aplicación. Usa inotify y, si no está
+    disponible, compara periódicamente mtime y tamaño.
+
+    Si actions.json es un enlace simbólico (dotfiles) se vigila también el
+    directorio del archivo real, que es donde se escriben los cambios.
+    """
+
+    def __init__(self, config_manager, path):
+        super().__init__(daemon=True)
+        self.config_manager = config_manager
+        self.path = path
+        self.running = True
+        # Descriptor de vigilancia -> nombres de archivo que interesan en ese directorio
+        self.names = {}
+        try:
+            self.inotify = Inotify()
+            for watched in (os.path.abspath(path), os.path.realpath(path)):
+                wd = self.inotify.add_watch(os.path.dirname(watched), IN_CLOSE_WRITE | IN_MOVED_TO)
+                self.names.setdefault(wd, set()).add(os.path.basename(watched))
+        except OSError as e:
+            log.warning("[Config] inotify no disponible, se usará sondeo: %s", e)
+            self.inotify = None
+
+    def run(self):
+        if self.inotify:
+            self.watch_inotify()
+        else:
+            self.watch_poll()
+
+    def watch_inotify(self):
+        while self.running:
+            readable, _, _ = select.select([self.inotify], [], [], 1.0)
+            if not readable:
+                continue
+            events = self.inotify.read_events()
+            if not any(event_name in self.names.get(wd, ()) for wd, _mask, event_name in events):
+                continue
+            time.sleep(SETTLE_DELAY)
+            self.inotify.read_events()
+            self.config_manager.reload()
+        self.inotify.close()
+
+    def watch_poll(self):
+        last = self.stat()
+        while self.running:
+            time.sleep(POLL_INTERVAL)
+            current = self.stat()
+            if current != last:
+                last = current
+                self.config_manager.reload()
+
+    def stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,113 @@
+import logging
+import os
+import signal
+import threading
+
+from src import ipc, log as logs
+from src.config_manager import ACTIONS_FILE
+from src.startup import STARTUP, wait_until_ready
+
+log = logging.getLogger(__name__)
+
+
+def control_handlers(config_manager, launcher, listener, action_executor, battery_manager):
+    """Comandos del socket de control; los atienden tanto --daemon como el modo con GUI."""
+    from src.launcher import supervisor_stats
+
+    def status(request):
+        return {
+            "pid": os.getpid(),
+            "devices": [{"path": mouse.path, "name": mouse.name} for mouse in listener.devices.values()],
+            "output": action_executor.output.name,
+            "cursor_freeze": listener.cursor_freeze,
+            "battery": battery_manager.percentage,
+            "startup_ms": STARTUP.marks,
+        }
+
+    def stats(request):
+        return {
+            "actions": listener.action_queue.stats(),
+            "children": supervisor_stats(launcher),
+            "latency_us": listener.latency.summary(),
+        }
+
+    return {
+        "status": status,
+        "reload": lambda request: config_manager.reload(),
+        "battery": lambda request: battery_manager.percentage,
+        "stats": stats,
+        "log": lambda request: logs.recent_lines(),
+    }
+
+
+def run_daemon(config_manager, launcher, recorder=None):
+    """
+    Modo --daemon: solo el listener de evdev y sus dependencias, sin PyQt5.
+    La GUI, si se abre, actúa como cliente por el socket de ipc.py.
+    recorder es el EventRecorder de --record, si se pidió grabar.
+    Devuelve el código de salida.
+    """
+    if ipc.request("status") is not None:
+        log.error("[Daemon] Ya hay una instancia de MXMouse escuchando en %s", ipc.SOCKET_PATH)
+        return 1
+
+    wait_until_ready()
+
+    from src.backend import ActionExecutor, MouseEventListener
+    from src.battery import BatteryManager
+    from src.config_watcher import ConfigWatcher
+    from src.hidpp import HidppMonitor
+    from src.launcher import supervisor_stats
+    from src.output import create_output_backend
+
+    output = create_output_backend(config_manager.get_setting("output_backend"), launcher)
+    action_executor = ActionExecutor(output, launcher, config_manager.get_setting("command_timeout"))
+    listener = MouseEventListener(config_manager, action_executor, recorder=recorder)
+    STARTUP.mark("listener")
+
+    config_watcher = ConfigWatcher(config_manager, ACTIONS_FILE)
+    # Sin Qt no hay QtDBus: la batería se lee por HID++ o, en su defecto, sysfs
+    battery_manager = BatteryManager(lambda percentage: log.info("[Battery] %s%%", percentage), use_dbus=False)
+    hidpp_monitor = HidppMonitor(
+        listener.engine,
+        battery_manager.publish_hidpp,
+        config_manager.get_setting("dpi"),
+        config_manager.get_setting("smartshift_threshold"),
+        on_lost=battery_manager.hidpp_lost,
+    )
+
+    ipc_server = ipc.IpcServer(listener.engine, control_handlers(
+        config_manager, launcher, listener, action_executor, battery_manager))
+
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    listener.start()
+    config_watcher.start()
+    battery_manager.start()
+    hidpp_monitor.start()
+    ipc_server.start()
+    log.info("[Daemon] En marcha.")
+
+    # Con timeout, para que las señales se atiendan aunque el wait no se interrumpa
+    while not stop_event.wait(1.0):
+        pass
+
+    log.info("[Daemon] Deteniendo...")
+    ipc_server.stop()
+    config_watcher.stop()
+    battery_manager.stop()
+    config_manager.flush()
+    hidpp_monitor.stop()
+    listener.stop()
+    listener.join()
+    if recorder:
+        recorder.close()
+    action_executor.output.close()
+    log.info("[Supervisor] Procesos hijos: %s", supervisor_stats(launcher))
+    return 0
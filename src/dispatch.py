@@ -0,0 +1,267 @@
+import logging
+import shlex
+import shutil
+from collections import namedtuple
+from types import MappingProxyType
+
+from src.gestures import GestureRecognizer
+
+log = logging.getLogger(__name__)
+
+PREDEFINED_ACTIONS = {
+    "Copy":          ("key",     "ctrl+c"),
+    "Paste":         ("key",     "ctrl+v"),
+    "Volume Up":     ("key",     "XF86AudioRaiseVolume"),
+    "Volume Down":   ("key",     "XF86AudioLowerVolume"),
+    "Mute":          ("key",     "XF86AudioMute"),
+    "Undo":          ("key",     "ctrl+z"),
+    "Redo":          ("key",     "ctrl+shift+z"),
+    "Scroll Up":     ("click",   4),
+    "Scroll Down":   ("click",   5),
+    "Scroll Left":   ("click",   6),
+    "Scroll Right":  ("click",   7),
+    "Left Click":    ("click",   1),
+    "Right Click":   ("click",   3),
+    "Forward":       ("key",     "XF86Forward"),
+    "Back":          ("key",     "XF86Back"),
+    "Open Terminal": ("command", "gnome-terminal"),
+    "Show Desktop":  ("key",     "super+d"),
+    "Close Window":  ("key",     "ctrl+w"),
+}
+
+# Scancode evdev -> nombre del botón en la configuración
+SCANCODE_BUTTONS = {
+    277: "Button 1",
+    276: "Button 2",
+    275: "Button 3",
+    274: "Button 4",
+    12:  "Button 5",
+}
+BUTTON_SCANCODES = {name: code for code, name in SCANCODE_BUTTONS.items()}
+BUTTON1_SCANCODE = BUTTON_SCANCODES["Button 1"]
+
+# Plantillas de gestos definidas por el usuario dentro de "Button 1"
+GESTURE_TEMPLATES_KEY = "gesture_templates"
+
+# Perfiles por aplicación: {"Profiles": {nombre: {"wm_class": [...], "Button 2": ...}}}
+PROFILES_KEY = "Profiles"
+PROFILE_MATCH_KEY = "wm_class"
+
+# Si un comando contiene alguno de estos caracteres necesita /bin/sh
+SHELL_METACHARACTERS = frozenset("|&;<>()$`*?[]{}~#\n")
+
+# Acción ya resuelta: kind es "key", "click", "argv" (comando sin shell) o
+# "command" (comando para /bin/sh); label es el texto original
+Action = namedtuple("Action", ["kind", "arg", "label"])
+
+WheelParams = namedtuple("WheelParams", ["function", "inverted", "sensitivity"])
+# Funciones de la rueda horizontal (Button 5) y valores por defecto
+WHEEL_FUNCTIONS = ("Scroll Horizontal", "Volume Control", "Zoom")
+DEFAULT_WHEEL = WheelParams("Scroll Horizontal", False, 100)
+
+# Instantánea inmutable de la configuración que consulta el hilo de eventos
+DispatchTable = namedtuple("DispatchTable", ["buttons", "button1", "gestures", "recognizer", "wheel"])
+
+
+def parse_command(command):
+    """
+    Separa un comando en argv con shlex si no necesita ninguna característica
+    del shell. Devuelve None si debe ejecutarse con /bin/sh.
+    """
+    if any(c in SHELL_METACHARACTERS for c in command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    # "VAR=valor programa" es una asignación de entorno del shell
+    if not argv or "=" in argv[0]:
+        return None
+    # Con una ruta absoluta Popen puede lanzar el proceso con posix_spawn
+    executable = shutil.which(argv[0])
+    if executable:
+        argv[0] = executable
+    return tuple(argv)
+
+
+def command_action(command, label):
+    argv = parse_command(command)
+    if argv:
+        return Action("argv", argv, label)
+    return Action("command", command, label)
+
+
+def resolve_action(action):
+    """Convierte el texto de una acción de la configuración en un Action (o None)."""
+    if not action or not isinstance(action, str):
+        return None
+    if action.startswith("Command:"):
+        command = action.split("Command:")[1].strip()
+        return command_action(command, action) if command else None
+    predefined = PREDEFINED_ACTIONS.get(action)
+    if not predefined:
+        log.warning("Acción predefinida desconocida: %s", action)
+        return None
+    kind, arg = predefined
+    if kind == "command":
+        return command_action(arg, action)
+    return Action(kind, arg, action)
+
+
+def is_number(value):
+    # bool es una subclase de int, pero true no es una sensibilidad
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_actions(actions):
+    """
+    Comprueba los tipos de los botones de actions.json y de sus perfiles.
+    Devuelve la lista de errores, vacía si la configuración es válida.
+    """
+    errors = []
+    _validate_buttons(actions, "", errors)
+    profiles = actions.get(PROFILES_KEY)
+    if profiles is None:
+        return errors
+    if not isinstance(profiles, dict):
+        errors.append(f"{PROFILES_KEY}: debe ser un objeto")
+        return errors
+    for name, profile in profiles.items():
+        prefix = f"{PROFILES_KEY}.{name}."
+        if not isinstance(profile, dict):
+            errors.append(f"{PROFILES_KEY}.{name}: debe ser un objeto")
+            continue
+        classes = profile.get(PROFILE_MATCH_KEY)
+        if classes is not None and not isinstance(classes, str) and not (
+                isinstance(classes, list) and all(isinstance(c, str) for c in classes)):
+            errors.append(f"{prefix}{PROFILE_MATCH_KEY}: debe ser un texto o una lista de textos")
+        _validate_buttons(profile, prefix, errors)
+    return errors
+
+
+def _validate_buttons(actions, prefix, errors):
+    for key, value in actions.items():
+        if key == "Button 1":
+            if isinstance(value, str):
+                continue
+            if not isinstance(value, dict):
+                errors.append(f"{prefix}{key}: debe ser un texto o un objeto")
+                continue
+            for field, field_value in value.items():
+                if field == "gestures_enabled":
+                    valid = isinstance(field_value, bool)
+                elif field == GESTURE_TEMPLATES_KEY:
+                    valid = isinstance(field_value, dict)
+                elif field == "action" or field.startswith("gesture_"):
+                    valid = isinstance(field_value, str)
+                else:
+                    continue
+                if not valid:
+                    errors.append(f"{prefix}{key}.{field}: valor no válido {field_value!r}")
+        elif key == "Button 5":
+            # Un texto equivale a la rueda por defecto (normalize_actions)
+            if isinstance(value, str):
+                continue
+            if not isinstance(value, dict):
+                errors.append(f"{prefix}{key}: debe ser un objeto")
+                continue
+            if "function" in value and value["function"] not in WHEEL_FUNCTIONS:
+                errors.append(f"{prefix}{key}.function: función desconocida {value['function']!r}")
+            if "inverted" in value and not isinstance(value["inverted"], bool):
+                errors.append(f"{prefix}{key}.inverted: debe ser true o false")
+            if "sensitivity" in value and not (is_number(value["sensitivity"]) and value["sensitivity"] > 0):
+                errors.append(f"{prefix}{key}.sensitivity: debe ser un número positivo")
+        elif key.startswith("Button ") and not isinstance(value, str):
+            errors.append(f"{prefix}{key}: debe ser un texto")
+
+
+def compile_dispatch(actions):
+    """
+    Compila el diccionario de acciones (actions.json) en una DispatchTable.
+    No modifica la configuración ni escribe en disco.
+    """
+    buttons = {}
+    for code, name in SCANCODE_BUTTONS.items():
+        if name in ("Button 1", "Button 5"):
+            continue
+        action = resolve_action(actions.get(name, ""))
+        if action:
+            buttons[code] = action
+
+    button1 = actions.get("Button 1", {})
+    if not isinstance(button1, dict):
+        button1 = {"action": button1}
+    # Cualquier clave "gesture_<nombre>" asigna una acción a la plantilla <nombre>
+    gestures = {}
+    for key, value in button1.items():
+        if not key.startswith("gesture_") or key == GESTURE_TEMPLATES_KEY:
+            continue
+        action = resolve_action(value)
+        if action:
+            gestures[key[len("gesture_"):]] = action
+    templates = button1.get(GESTURE_TEMPLATES_KEY)
+    recognizer = GestureRecognizer(templates if isinstance(templates, dict) else None)
+
+    button5 = actions.get("Button 5", {})
+    if not isinstance(button5, dict):
+        button5 = {}
+    function = button5.get("function", DEFAULT_WHEEL.function)
+    inverted = button5.get("inverted", DEFAULT_WHEEL.inverted)
+    sensitivity = button5.get("sensitivity", DEFAULT_WHEEL.sensitivity)
+    # Un valor de otro tipo no debe llegar al hilo de eventos: se usa el de por defecto
+    wheel = WheelParams(
+        function if function in WHEEL_FUNCTIONS else DEFAULT_WHEEL.function,
+        inverted if isinstance(inverted, bool) else DEFAULT_WHEEL.inverted,
+        sensitivity if is_number(sensitivity) and sensitivity > 0 else DEFAULT_WHEEL.sensitivity,
+    )
+
+    return DispatchTable(
+        MappingProxyType(buttons),
+        resolve_action(button1.get("action", "")),
+        MappingProxyType(gestures),
+        recognizer,
+        wheel,
+    )
+
+
+def profile_actions(actions, profile):
+    """
+    Configuración efectiva de un perfil: la general con las claves del perfil
+    encima. Button 1 y Button 5 se combinan campo a campo.
+    """
+    merged = dict(actions)
+    for key, value in profile.items():
+        if key == PROFILE_MATCH_KEY:
+            continue
+        base = actions.get(key)
+        if isinstance(value, dict) and isinstance(base, dict):
+            merged[key] = {**base, **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def compile_profiles(actions):
+    """
+    Compila cada perfil por aplicación en su propia DispatchTable. Devuelve
+    {clase de ventana (WM_CLASS) en minúsculas: DispatchTable}, de modo que
+    un cambio de foco solo cuesta una búsqueda en el diccionario.
+    """
+    profiles = actions.get(PROFILES_KEY)
+    if not isinstance(profiles, dict):
+        return MappingProxyType({})
+    tables = {}
+    for name, profile in profiles.items():
+        if not isinstance(profile, dict):
+            continue
+        classes = profile.get(PROFILE_MATCH_KEY)
+        if isinstance(classes, str):
+            classes = [classes]
+        if not classes:
+            log.warning("[Profiles] El perfil '%s' no indica ninguna %s, se ignora.", name, PROFILE_MATCH_KEY)
+            continue
+        table = compile_dispatch(profile_actions(actions, profile))
+        for wm_class in classes:
+            # Si dos perfiles reclaman la misma clase gana el primero
+            tables.setdefault(str(wm_class).lower(), table)
+    return MappingProxyType(tables)
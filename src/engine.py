@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class EventEngine:
+    """
+    Bucle asyncio que atiende en un solo hilo varios dispositivos evdev,
+    descriptores y temporizadores. stop() se puede llamar desde cualquier hilo
+    y despierta al bucle, así que el apagado no depende de que llegue otro
+    evento del ratón.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._stop_event = asyncio.Event()
+        self._tasks = set()
+        self._device_tasks = {}
+        self.thread = None
+        # Hora (reloj de pared, como las marcas de evdev) en que se leyó el evento en curso
+        self.read_time = 0.0
+
+    def in_loop_thread(self):
+        return threading.current_thread() is self.thread
+
+    def call_soon(self, callback, *args):
+        """Ejecuta callback en el hilo del bucle (seguro desde cualquier hilo)."""
+        if self.in_loop_thread():
+            return self.loop.call_soon(callback, *args)
+        return self.loop.call_soon_threadsafe(callback, *args)
+
+    def call_later(self, delay, callback, *args):
+        """Programa un temporizador; debe llamarse desde el hilo del bucle."""
+        return self.loop.call_later(delay, callback, *args)
+
+    def add_reader(self, fd, callback, *args):
+        self.call_soon(self.loop.add_reader, fd, callback, *args)
+
+    def remove_reader(self, fd):
+        self.call_soon(self.loop.remove_reader, fd)
+
+    def add_device(self, device, handler, on_error=None):
+        """Lee los eventos de un InputDevice y los entrega uno a uno a handler."""
+        self.call_soon(self._start_reader, device, handler, on_error)
+
+    def _start_reader(self, device, handler, on_error):
+        self._device_tasks[device.path] = self._spawn(self._read_device(device, handler, on_error))
+
+    def remove_device(self, device):
+        """Deja de leer un dispositivo; debe llamarse desde el hilo del bucle."""
+        task = self._device_tasks.pop(device.path, None)
+        if task:
+            task.cancel()
+
+    def create_task(self, coro):
+        """Lanza una corrutina en el bucle; debe llamarse desde el hilo del bucle."""
+        return self._spawn(coro)
+
+    def _spawn(self, coro):
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _read_device(self, device, handler, on_error):
+        try:
+            async for event in device.async_read_loop():
+                self.read_time = time.time()
+                try:
+                    handler(event)
+                except Exception:
+                    # Un fallo al procesar un evento no debe dejar al ratón sin lector
+                    log.exception("[Engine] Error procesando un evento de %s", device.path)
+        except asyncio.CancelledError:
+            raise
+        except OSError as e:
+            if on_error:
+                on_error(device, e)
+            else:
+                log.error("[Engine] Error leyendo %s: %s", device.path, e)
+
+    def run(self):
+        """Ejecuta el bucle en el hilo actual hasta que se llame a stop()."""
+        self.thread = threading.current_thread()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.loop.close()
+
+    async def _main(self):
+        await self._stop_event.wait()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self):
+        if self.loop.is_closed():
+            return
+        try:
+            self.call_soon(self._stop_event.set)
+        except RuntimeError:
+            # El bucle se cerró entre la comprobación y la llamada
+            pass
@@ -0,0 +1,154 @@
+import logging
+import math
+import operator
+from array import array
+
+log = logging.getLogger(__name__)
+
+# Puntos a los que se remuestrea cada trazo antes de compararlo
+RESAMPLE_POINTS = 32
+# Puntos guardados como máximo durante un trazo; al llenarse se diezma a la mitad
+MAX_STROKE_POINTS = 256
+# Similitud (coseno) mínima para aceptar la plantilla más parecida
+MIN_SCORE = 0.8
+
+# Plantillas predefinidas como polilíneas en coordenadas de pantalla (y hacia abajo)
+BUILTIN_TEMPLATES = {
+    "up":         [(0, 0), (0, -1)],
+    "down":       [(0, 0), (0, 1)],
+    "left":       [(0, 0), (-1, 0)],
+    "right":      [(0, 0), (1, 0)],
+    "up_left":    [(0, 0), (-1, -1)],
+    "up_right":   [(0, 0), (1, -1)],
+    "down_left":  [(0, 0), (-1, 1)],
+    "down_right": [(0, 0), (1, 1)],
+    "L":          [(0, 0), (0, 1), (1, 1)],
+    "V":          [(0, 0), (1, 1), (2, 0)],
+}
+
+
+class Stroke:
+    """
+    Trazo del Button 1: posiciones acumuladas al final de cada frame de evdev,
+    en dos arrays de enteros para no crear un objeto por punto.
+    """
+
+    def __init__(self):
+        self.xs = array('i')
+        self.ys = array('i')
+        self.reset()
+
+    def reset(self):
+        del self.xs[:]
+        del self.ys[:]
+        self.x = 0
+        self.y = 0
+        self.min_x = self.max_x = self.min_y = self.max_y = 0
+        self.moved = False
+        self.xs.append(0)
+        self.ys.append(0)
+
+    def move(self, dx, dy):
+        self.x += dx
+        self.y += dy
+        self.moved = True
+
+    def end_frame(self):
+        if not self.moved:
+            return
+        self.moved = False
+        if len(self.xs) >= MAX_STROKE_POINTS:
+            # Se conserva la forma con la mitad de resolución
+            self.xs = self.xs[::2]
+            self.ys = self.ys[::2]
+        self.xs.append(self.x)
+        self.ys.append(self.y)
+        self.min_x = min(self.min_x, self.x)
+        self.max_x = max(self.max_x, self.x)
+        self.min_y = min(self.min_y, self.y)
+        self.max_y = max(self.max_y, self.y)
+
+    def extent(self):
+        """Lado mayor del rectángulo que contiene el trazo."""
+        return max(self.max_x - self.min_x, self.max_y - self.min_y)
+
+
+def resample(xs, ys, n=RESAMPLE_POINTS):
+    """Reparte n puntos equidistantes a lo largo del trazo ($1 recognizer)."""
+    lengths = [math.hypot(xs[i] - xs[i - 1], ys[i] - ys[i - 1]) for i in range(1, len(xs))]
+    total = sum(lengths)
+    if total == 0:
+        return [float(xs[0])] * n, [float(ys[0])] * n
+    step = total / (n - 1)
+    out_x, out_y = [float(xs[0])], [float(ys[0])]
+    walked = 0.0
+    target = step
+    for i, length in enumerate(lengths):
+        while length > 0 and walked + length >= target and len(out_x) < n - 1:
+            t = (target - walked) / length
+            out_x.append(xs[i] + t * (xs[i + 1] - xs[i]))
+            out_y.append(ys[i] + t * (ys[i + 1] - ys[i]))
+            target += step
+        walked += length
+    # Errores de redondeo: completar con el último punto
+    while len(out_x) < n:
+        out_x.append(float(xs[-1]))
+        out_y.append(float(ys[-1]))
+    return out_x, out_y
+
+
+def vectorize(xs, ys):
+    """
+    Remuestrea, centra en el centroide y normaliza a longitud 1 el trazo. No se
+    rota: la dirección forma parte del gesto. La similitud entre dos vectores
+    así normalizados es su producto escalar (Protractor).
+    """
+    rx, ry = resample(xs, ys)
+    cx = sum(rx) / len(rx)
+    cy = sum(ry) / len(ry)
+    vector = []
+    for x, y in zip(rx, ry):
+        vector.append(x - cx)
+        vector.append(y - cy)
+    norm = math.sqrt(sum(map(operator.mul, vector, vector)))
+    if norm == 0:
+        return None
+    return array('d', [v / norm for v in vector])
+
+
+def polyline_vector(points):
+    xs, ys = zip(*points)
+    return vectorize(xs, ys)
+
+
+class GestureRecognizer:
+    """Clasifica un Stroke comparándolo con plantillas precalculadas."""
+
+    def __init__(self, templates=None):
+        self.templates = []
+        all_templates = dict(BUILTIN_TEMPLATES)
+        all_templates.update(templates or {})
+        for name, points in all_templates.items():
+            try:
+                vector = polyline_vector([(float(x), float(y)) for x, y in points])
+            except (TypeError, ValueError):
+                vector = None
+            if vector is None or len(points) < 2:
+                log.warning("[Gestures] Plantilla de gesto no válida: %s", name)
+                continue
+            self.templates.append((name, vector))
+
+    def classify(self, stroke):
+        """Devuelve (nombre, similitud) de la mejor plantilla, o (None, similitud)."""
+        vector = vectorize(stroke.xs, stroke.ys)
+        if vector is None:
+            return None, 0.0
+        best_name, best_score = None, -1.0
+        for name, template in self.templates:
+            # map+operator.mul recorre los dos arrays en C, sin bucle en Python
+            score = sum(map(operator.mul, vector, template))
+            if score > best_score:
+                best_name, best_score = name, score
+        if best_score < MIN_SCORE:
+            return None, best_score
+        return best_name, best_score
@@ -1,3 +1,4 @@
+import logging
 import os
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QLabel, QComboBox, QLineEdit, 
@@ -11,10 +12,13 @@ from src.buttons import CircularButton
 from src.buttons_info import buttons_info
 from src.utils import resource_path
 
+log = logging.getLogger(__name__)
+
 MAX_ACTION_LABEL_LENGTH = 15
 
 class Communicate(QObject):
     update_battery = pyqtSignal(int)
+    config_reloaded = pyqtSignal()
 
 class MainWindow(QMainWindow):
     action_changed = pyqtSignal(str, str)  # button_name, action
@@ -24,6 +28,9 @@ class MainWindow(QMainWindow):
         self.config_manager = config_manager
         self.comm = Communicate()
         self.comm.update_battery.connect(self.update_battery_status)
+        # La recarga llega desde el hilo del watcher; la señal la pasa al hilo de la GUI
+        self.comm.config_reloaded.connect(self.refresh_from_config)
+        self.config_manager.add_reload_listener(self.comm.config_reloaded.emit)
 
         self.setWindowTitle("Logitech MX Master Configurator")
         self.setGeometry(100, 100, 1200, 800)
@@ -34,7 +41,7 @@ class MainWindow(QMainWindow):
         if os.path.exists(app_icon_path):
             self.setWindowIcon(QIcon(app_icon_path))
         else:
-            print("App icon not found. Using default icon.")
+            log.warning("App icon not found. Using default icon.")
 
         self.selected_button = None
         self.battery_percentage = 75
@@ -362,14 +369,14 @@ class MainWindow(QMainWindow):
         )
 
     def close_application(self):
-        self.config_manager.save_actions()
+        self.config_manager.flush()
         QApplication.quit()
 
     def on_wheel_function_change(self, index):
         if self.selected_button == "Button 5":
             selected_func = self.wheel_function_combo.currentText()
             self.config_manager.set_wheel_function(selected_func)
-            print(f"[Button 5] Funcionalidad seleccionada: {selected_func}")
+            log.info("[Button 5] Funcionalidad seleccionada: %s", selected_func)
 
     def on_action_change(self, index):
         if not self.selected_button:
@@ -709,6 +716,12 @@ class MainWindow(QMainWindow):
                 action_text = self.format_action_text(action_text)
             self.buttons[btn_index].action_label.setText(action_text)
 
+    def refresh_from_config(self):
+        for btn in self.buttons:
+            self.update_button_label(btn.name)
+        if self.selected_button:
+            self.select_button(self.selected_button)
+
     def select_button(self, button_name):
         for btn in self.buttons:
             if btn.name == button_name:
@@ -0,0 +1,339 @@
+import asyncio
+import glob
+import logging
+import os
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+# Tipos de informe HID++
+REPORT_SHORT = 0x10
+REPORT_LONG = 0x11
+REPORT_VERY_LONG = 0x12
+LONG_REPORT_SIZE = 20
+
+# Índice de dispositivo para un ratón conectado directamente (Bluetooth/USB)
+DIRECT_DEVICE_INDEX = 0xFF
+# Primer dispositivo emparejado con un receptor Bolt/Unifying
+RECEIVER_DEVICE_INDEX = 1
+
+# Características HID++ 2.0 usadas
+FEATURE_ROOT = 0x0000
+FEATURE_BATTERY_STATUS = 0x1000
+FEATURE_UNIFIED_BATTERY = 0x1004
+FEATURE_ADJUSTABLE_DPI = 0x2201
+FEATURE_SMART_SHIFT = 0x2110
+FEATURE_SMART_SHIFT_ENHANCED = 0x2111
+
+ERROR_UNSUPPORTED = 9
+ERROR_NAMES = {
+    1: "Unknown",
+    2: "InvalidArgument",
+    3: "OutOfRange",
+    4: "HWError",
+    5: "LogitechInternal",
+    6: "InvalidFeatureIndex",
+    7: "InvalidFunctionId",
+    8: "Busy",
+    9: "Unsupported",
+}
+
+REQUEST_TIMEOUT = 1.0
+# Espera entre intentos de conexión (el ratón dormido no responde)
+RECONNECT_INTERVAL = 30.0
+
+UNIFIED_CHARGING_STATUS = {0: "discharging", 1: "charging", 2: "charging", 3: "full", 4: "error"}
+LEGACY_CHARGING_STATUS = {0: "discharging", 1: "charging", 2: "charging", 3: "full", 4: "charging"}
+
+BatteryStatus = namedtuple("BatteryStatus", ["percentage", "status"])
+SmartShift = namedtuple("SmartShift", ["ratchet", "threshold"])
+
+
+class HidppError(Exception):
+    def __init__(self, code, message=None):
+        super().__init__(message or f"Error HID++ {ERROR_NAMES.get(code, code)}")
+        self.code = code
+
+
+def find_hidraw(root="/sys/class/hidraw"):
+    """
+    Busca el nodo hidraw de la interfaz HID++ del ratón. Devuelve
+    (ruta en /dev, índice de dispositivo) o None.
+    """
+    receiver = None
+    for node in sorted(glob.glob(os.path.join(root, "hidraw*"))):
+        uevent = {}
+        try:
+            with open(os.path.join(node, "device", "uevent")) as f:
+                for line in f:
+                    key, _, value = line.strip().partition("=")
+                    uevent[key] = value
+            with open(os.path.join(node, "device", "report_descriptor"), "rb") as f:
+                descriptor = f.read()
+        except OSError:
+            continue
+        vendor = uevent.get("HID_ID", "").split(":")[1:2]
+        if vendor != ["0000046D"] or b"\x85\x11" not in descriptor:
+            continue  # No es de Logitech o no tiene el informe largo de HID++
+        path = os.path.join("/dev", os.path.basename(node))
+        name = uevent.get("HID_NAME", "")
+        if "MX Master" in name:
+            return path, DIRECT_DEVICE_INDEX
+        if "Receiver" in name and receiver is None:
+            receiver = (path, RECEIVER_DEVICE_INDEX)
+    return receiver
+
+
+class HidppDevice:
+    """
+    Cliente HID++ 2.0 asíncrono sobre un nodo hidraw. Vive en el bucle del
+    EventEngine: las respuestas y notificaciones se leen con add_reader. La
+    tabla característica -> índice se guarda tras la primera consulta, así
+    cada petición posterior es un único intercambio de informes.
+    """
+
+    def __init__(self, loop, path, device_index=DIRECT_DEVICE_INDEX, opener=None):
+        self.loop = loop
+        self.path = path
+        self.device_index = device_index
+        self.opener = opener or (lambda path: os.open(path, os.O_RDWR | os.O_NONBLOCK))
+        self.fd = None
+        self.features = {FEATURE_ROOT: 0}
+        self.feature_ids = {0: FEATURE_ROOT}
+        self.unsupported = set()
+        self._pending = {}
+        self._sw_id = 0
+        # feature_id -> callback(function, params) para las notificaciones
+        self.notification_handlers = {}
+        self.on_disconnect = None
+
+    def open(self):
+        """Debe llamarse desde el hilo del bucle."""
+        self.fd = self.opener(self.path)
+        self.loop.add_reader(self.fd, self._on_readable)
+
+    def close(self):
+        if self.fd is None:
+            return
+        self.loop.remove_reader(self.fd)
+        os.close(self.fd)
+        self.fd = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"{self.path} cerrado"))
+        self._pending.clear()
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 64)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            log.error("[HID++] Error leyendo %s: %s", self.path, e)
+            data = b""
+        if not data:
+            self.close()
+            if self.on_disconnect:
+                self.on_disconnect()
+            return
+        self.handle_report(data)
+
+    def handle_report(self, data):
+        if len(data) < 7 or data[0] not in (REPORT_SHORT, REPORT_LONG, REPORT_VERY_LONG):
+            return
+        if data[1] != self.device_index:
+            return
+        feature_index = data[2]
+        # Errores: 2.0 usa el índice 0xFF y 1.0 el sub_id 0x8F; ambos repiten la petición
+        if feature_index == 0xFF or (data[0] == REPORT_SHORT and feature_index == 0x8F):
+            future = self._pending.pop((data[3], data[4] >> 4, data[4] & 0x0F), None)
+            if future and not future.done():
+                future.set_exception(HidppError(data[5]))
+            return
+        function, sw_id = data[3] >> 4, data[3] & 0x0F
+        future = self._pending.pop((feature_index, function, sw_id), None)
+        if future:
+            if not future.done():
+                future.set_result(bytes(data[4:]))
+            return
+        if sw_id == 0:
+            handler = self.notification_handlers.get(self.feature_ids.get(feature_index))
+            if handler:
+                handler(function, bytes(data[4:]))
+
+    async def request(self, feature_index, function, params=b""):
+        if self.fd is None:
+            raise ConnectionError(f"{self.path} no está abierto")
+        # sw_id distinto de 0 identifica nuestras respuestas frente a las notificaciones
+        self._sw_id = self._sw_id % 15 + 1
+        key = (feature_index, function, self._sw_id)
+        header = bytes([REPORT_LONG, self.device_index, feature_index, (function << 4) | self._sw_id])
+        report = (header + bytes(params)).ljust(LONG_REPORT_SIZE, b"\x00")
+        future = self.loop.create_future()
+        self._pending[key] = future
+        try:
+            os.write(self.fd, report)
+            return await asyncio.wait_for(future, REQUEST_TIMEOUT)
+        finally:
+            self._pending.pop(key, None)
+
+    async def feature_index(self, feature_id):
+        index = self.features.get(feature_id)
+        if index is None:
+            if feature_id not in self.unsupported:
+                reply = await self.request(0, 0, bytes([feature_id >> 8, feature_id & 0xFF]))
+                index = reply[0]
+            if not index:
+                self.unsupported.add(feature_id)
+                raise HidppError(ERROR_UNSUPPORTED, f"Característica HID++ 0x{feature_id:04X} no soportada")
+            self.features[feature_id] = index
+            self.feature_ids[index] = feature_id
+        return index
+
+    async def call(self, feature_id, function, *params):
+        return await self.request(await self.feature_index(feature_id), function, bytes(params))
+
+    async def supports(self, feature_id):
+        try:
+            await self.feature_index(feature_id)
+            return True
+        except HidppError:
+            return False
+
+    # Batería: 0x1004 (Unified Battery) y, en modelos antiguos, 0x1000
+
+    async def battery(self):
+        if await self.supports(FEATURE_UNIFIED_BATTERY):
+            return parse_unified_battery(await self.call(FEATURE_UNIFIED_BATTERY, 1))
+        return parse_legacy_battery(await self.call(FEATURE_BATTERY_STATUS, 0))
+
+    async def subscribe_battery(self, callback):
+        """Llama a callback(BatteryStatus) con cada notificación de batería del ratón."""
+        if await self.supports(FEATURE_UNIFIED_BATTERY):
+            self.notification_handlers[FEATURE_UNIFIED_BATTERY] = \
+                lambda function, params: callback(parse_unified_battery(params))
+        elif await self.supports(FEATURE_BATTERY_STATUS):
+            self.notification_handlers[FEATURE_BATTERY_STATUS] = \
+                lambda function, params: callback(parse_legacy_battery(params))
+
+    # DPI: 0x2201 (Adjustable DPI)
+
+    async def get_dpi(self, sensor=0):
+        reply = await self.call(FEATURE_ADJUSTABLE_DPI, 2, sensor)
+        return (reply[1] << 8) | reply[2]
+
+    async def set_dpi(self, dpi, sensor=0):
+        await self.call(FEATURE_ADJUSTABLE_DPI, 3, sensor, dpi >> 8, dpi & 0xFF)
+
+    # SmartShift: 0x2111 (enhanced, MX Master 3/3S) o 0x2110
+
+    async def get_smartshift(self):
+        if await self.supports(FEATURE_SMART_SHIFT_ENHANCED):
+            reply = await self.call(FEATURE_SMART_SHIFT_ENHANCED, 1)
+        else:
+            reply = await self.call(FEATURE_SMART_SHIFT, 0)
+        return SmartShift(reply[0] == 2, reply[1])
+
+    async def set_smartshift(self, ratchet=None, threshold=None):
+        """threshold 1-254 activa SmartShift, 255 fija el trinquete. None no cambia."""
+        mode = 0 if ratchet is None else (2 if ratchet else 1)
+        threshold = threshold or 0
+        if await self.supports(FEATURE_SMART_SHIFT_ENHANCED):
+            await self.call(FEATURE_SMART_SHIFT_ENHANCED, 2, mode, threshold, 0)
+        else:
+            await self.call(FEATURE_SMART_SHIFT, 1, mode, threshold, 0)
+
+
+def parse_unified_battery(params):
+    return BatteryStatus(params[0], UNIFIED_CHARGING_STATUS.get(params[2], "unknown"))
+
+
+def parse_legacy_battery(params):
+    return BatteryStatus(params[0], LEGACY_CHARGING_STATUS.get(params[2], "unknown"))
+
+
+class HidppMonitor:
+    """
+    Mantiene la conexión HID++ con el ratón desde el bucle del EventEngine:
+    publica la batería (lectura inicial y notificaciones), aplica DPI y
+    SmartShift de la configuración y reintenta si el ratón no responde.
+    Si se pierde la conexión después de publicar la batería llama a on_lost.
+    """
+
+    def __init__(self, engine, on_battery, dpi=None, smartshift_threshold=None, finder=find_hidraw, opener=None,
+                 on_lost=None):
+        self.engine = engine
+        self.on_battery = on_battery
+        self.on_lost = on_lost
+        self.battery_published = False
+        self.dpi = dpi
+        self.smartshift_threshold = smartshift_threshold
+        self.finder = finder
+        self.opener = opener
+        self.device = None
+        self.retry_handle = None
+
+    def start(self):
+        self.engine.call_soon(self._connect)
+
+    def _connect(self):
+        self.retry_handle = None
+        self.engine.create_task(self._setup())
+
+    async def _setup(self):
+        found = self.finder()
+        if not found:
+            self._retry()
+            return
+        path, device_index = found
+        device = HidppDevice(self.engine.loop, path, device_index, self.opener)
+        try:
+            device.open()
+            await device.subscribe_battery(self._publish)
+            self._publish(await device.battery())
+            if self.dpi:
+                await device.set_dpi(self.dpi)
+            if self.smartshift_threshold:
+                await device.set_smartshift(ratchet=True, threshold=self.smartshift_threshold)
+            log.info("[HID++] Conectado a %s; DPI %s", path, await device.get_dpi())
+        except (OSError, HidppError, asyncio.TimeoutError) as e:
+            log.warning("[HID++] No se pudo usar %s: %s", path, e)
+            device.close()
+            self._retry()
+            return
+        device.on_disconnect = self._retry
+        self.device = device
+
+    def _publish(self, battery):
+        self.battery_published = True
+        self.on_battery(battery.percentage)
+
+    def _retry(self):
+        self.device = None
+        if self.battery_published:
+            self.battery_published = False
+            if self.on_lost:
+                self.on_lost()
+        if self.retry_handle is None and not self.engine.loop.is_closed():
+            self.retry_handle = self.engine.call_later(RECONNECT_INTERVAL, self._connect)
+
+    def run(self, coro_func, *args, timeout=2.0):
+        """Ejecuta una corrutina del dispositivo desde otro hilo y devuelve su resultado."""
+        if self.device is None:
+            raise ConnectionError("Ratón HID++ no conectado")
+        future = asyncio.run_coroutine_threadsafe(coro_func(self.device, *args), self.engine.loop)
+        return future.result(timeout)
+
+    def stop(self):
+        try:
+            self.engine.call_soon(self._close)
+        except RuntimeError:
+            pass  # El bucle ya estaba cerrado
+
+    def _close(self):
+        if self.retry_handle is not None:
+            self.retry_handle.cancel()
+            self.retry_handle = None
+        if self.device:
+            self.device.close()
+            self.device = None
@@ -0,0 +1,98 @@
+import logging
+import os
+
+from evdev import InputDevice, list_devices
+
+from src.inotify import IN_ATTRIB, IN_CREATE, IN_DELETE, Inotify
+
+log = logging.getLogger(__name__)
+
+INPUT_DIR = "/dev/input"
+# Intervalo del sondeo de /dev/input cuando inotify no está disponible
+POLL_INTERVAL = 1.0
+
+
+class DeviceRegistry:
+    """Acceso a los nodos evdev del sistema; se puede sustituir por uno simulado."""
+
+    def list_paths(self):
+        return list_devices()
+
+    def open(self, path):
+        return InputDevice(path)
+
+    def clone(self, device):
+        """Dispositivo uinput que reenvía los eventos de device mientras está capturado."""
+        from src.output import UInputClone
+
+        return UInputClone(device)
+
+
+class HotplugMonitor:
+    """
+    Avisa de los nodos evdev que aparecen y desaparecen en /dev/input, para
+    recuperar el ratón tras los ciclos de suspensión de Bluetooth/Bolt. Usa
+    inotify desde el bucle del EventEngine y, si no está disponible, sondea
+    el registro de dispositivos periódicamente.
+    """
+
+    def __init__(self, engine, registry, on_added, on_removed):
+        self.engine = engine
+        self.registry = registry
+        self.on_added = on_added
+        self.on_removed = on_removed
+        self.inotify = None
+        self.known_paths = set()
+        self.poll_handle = None
+
+    def start(self):
+        self.engine.call_soon(self._start)
+
+    def _start(self):
+        try:
+            self.inotify = Inotify()
+            self.inotify.add_watch(INPUT_DIR, IN_CREATE | IN_ATTRIB | IN_DELETE)
+            self.engine.loop.add_reader(self.inotify.fileno(), self._on_inotify)
+        except OSError as e:
+            log.warning("[Hotplug] inotify no disponible, se sondeará %s: %s", INPUT_DIR, e)
+            if self.inotify:
+                self.inotify.close()
+                self.inotify = None
+            self.known_paths = set(self.registry.list_paths())
+            self.poll_handle = self.engine.call_later(POLL_INTERVAL, self._poll)
+
+    def _on_inotify(self):
+        for _wd, mask, name in self.inotify.read_events():
+            if not name.startswith("event"):
+                continue
+            path = os.path.join(INPUT_DIR, name)
+            if mask & IN_DELETE:
+                self.on_removed(path)
+            else:
+                # IN_CREATE llega antes de que udev ajuste los permisos: IN_ATTRIB reintenta
+                self.on_added(path)
+
+    def _poll(self):
+        paths = set(self.registry.list_paths())
+        for path in self.known_paths - paths:
+            self.on_removed(path)
+        # on_added ignora los nodos ya conocidos; así se reintentan los que fallaron al abrirse
+        for path in paths:
+            self.on_added(path)
+        self.known_paths = paths
+        self.poll_handle = self.engine.call_later(POLL_INTERVAL, self._poll)
+
+    def stop(self):
+        try:
+            self.engine.call_soon(self._close)
+        except RuntimeError:
+            pass  # El bucle ya estaba cerrado
+
+    def _close(self):
+        if self.poll_handle is not None:
+            self.poll_handle.cancel()
+            self.poll_handle = None
+        if self.inotify:
+            self.engine.loop.remove_reader(self.inotify.fileno())
+            self.inotify.close()
+            self.inotify = None
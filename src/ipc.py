@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import socket
+
+from src.config_manager import ACTIONS_FILE
+
+log = logging.getLogger(__name__)
+
+# Socket del demonio: en XDG_RUNTIME_DIR si existe, si no junto a la configuración
+SOCKET_PATH = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or os.path.dirname(ACTIONS_FILE), "mxmouse.sock")
+
+
+class IpcServer:
+    """
+    Servidor de control del demonio sobre un socket Unix, en el bucle del
+    EventEngine. Protocolo de líneas JSON: cada petición {"cmd": nombre, ...}
+    recibe {"ok": true, "result": ...} o {"ok": false, "error": texto}.
+    handlers asocia cada nombre de comando con una función que recibe la
+    petición y se ejecuta en el hilo del bucle.
+    """
+
+    def __init__(self, engine, handlers, path=SOCKET_PATH):
+        self.engine = engine
+        self.handlers = handlers
+        self.path = path
+        self.server = None
+
+    def start(self):
+        self.engine.call_soon(self._start)
+
+    def _start(self):
+        self.engine.create_task(self._serve())
+
+    async def _serve(self):
+        import asyncio
+
+        # Un socket huérfano de una ejecución anterior impediría el bind
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o077)
+        try:
+            self.server = await asyncio.start_unix_server(self._handle_client, self.path)
+        finally:
+            os.umask(old_umask)
+        log.info("[IPC] Escuchando en %s", self.path)
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(json.dumps(self.dispatch(line)).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def dispatch(self, line):
+        try:
+            request = json.loads(line)
+            handler = self.handlers.get(request.get("cmd"))
+            if handler is None:
+                return {"ok": False, "error": f"Comando desconocido: {request.get('cmd')}"}
+            return {"ok": True, "result": handler(request)}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    def stop(self):
+        try:
+            self.engine.call_soon(self._close)
+        except RuntimeError:
+            pass  # El bucle ya estaba cerrado
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+
+def request(cmd, path=SOCKET_PATH, timeout=1.0, **params):
+    """
+    Envía un comando al demonio y devuelve su resultado. Devuelve None si no
+    hay ningún demonio escuchando; lanza RuntimeError si el comando falla.
+    """
+    params["cmd"] = cmd
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(json.dumps(params).encode() + b"\n")
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+    except OSError:
+        return None
+    if not data:
+        return None
+    reply = json.loads(data)
+    if not reply.get("ok"):
+        raise RuntimeError(reply.get("error"))
+    return reply["result"]
@@ -0,0 +1,136 @@
+import collections
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+
+from src.supervisor import ChildSupervisor
+
+log = logging.getLogger(__name__)
+
+
+class Launcher:
+    """
+    Proceso auxiliar mínimo que lanza los comandos por encargo del proceso
+    principal. Se crea con fork() al arrancar, antes de importar Qt, de modo
+    que cada lanzamiento parte de un espacio de direcciones pequeño y no del
+    proceso de la GUI con cientos de MB.
+    """
+
+    def __init__(self, max_children=64):
+        self.max_children = max_children
+        self.sock = None
+        self.pid = None
+        self._reply = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        # Evitar que el hijo herede y repita la salida pendiente en los buffers
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            parent_sock.close()
+            try:
+                serve(child_sock, ChildSupervisor(self.max_children))
+            finally:
+                os._exit(0)
+        child_sock.close()
+        self.sock = parent_sock
+        self.pid = pid
+        log.info("[Launcher] Proceso auxiliar iniciado (pid %s).", pid)
+
+    def spawn(self, args, shell=False, timeout=None):
+        """Pide al auxiliar que lance args. Devuelve False si no está disponible."""
+        request = {"shell": args} if shell else {"argv": list(args)}
+        if timeout:
+            request["timeout"] = timeout
+        return self._send(request)
+
+    def stats(self):
+        """Contadores del supervisor de procesos del auxiliar (o None)."""
+        if not self._send({"stats": True}, expect_reply=True):
+            return None
+        return self._reply
+
+    def _send(self, request, expect_reply=False):
+        if self.sock is None:
+            return False
+        try:
+            with self._lock:
+                self.sock.send(json.dumps(request).encode())
+                if expect_reply:
+                    self.sock.settimeout(1.0)
+                    try:
+                        self._reply = json.loads(self.sock.recv(64 * 1024))
+                    finally:
+                        self.sock.settimeout(None)
+            return True
+        except (OSError, ValueError) as e:
+            log.error("[Launcher] El proceso auxiliar no responde: %s", e)
+            self.sock.close()
+            self.sock = None
+            return False
+
+    def stop(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.pid:
+            try:
+                os.waitpid(self.pid, 0)
+            except ChildProcessError:
+                pass
+            self.pid = None
+
+
+def serve(sock, supervisor):
+    # Ctrl+C y SIGTERM los gestiona el proceso principal, que cierra el socket
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    while True:
+        data = sock.recv(64 * 1024)
+        if not data:
+            return
+        try:
+            request = json.loads(data)
+            if request.get("stats"):
+                sock.send(json.dumps(supervisor.stats()).encode())
+                continue
+            argv = request.get("argv") or ["/bin/sh", "-c", request["shell"]]
+            supervisor.launch(argv, request.get("timeout"))
+        except Exception as e:
+            log.error("[Launcher] Error al lanzar %r: %s", data, e)
+
+
+_local_supervisor = None
+_local_lock = threading.Lock()
+
+
+def spawn_process(launcher, args, shell=False, timeout=None):
+    """
+    Lanza args con el auxiliar si hay uno; si no, en este proceso bajo un
+    ChildSupervisor para que los hijos se recojan y no queden zombis.
+    """
+    global _local_supervisor
+    if launcher and launcher.spawn(args, shell, timeout):
+        return
+    with _local_lock:
+        if _local_supervisor is None:
+            _local_supervisor = ChildSupervisor(launcher.max_children if launcher else 64)
+    argv = ["/bin/sh", "-c", args] if shell else list(args)
+    _local_supervisor.launch(argv, timeout)
+
+
+def supervisor_stats(launcher):
+    """Contadores de procesos hijos del auxiliar y del supervisor local, sumados."""
+    stats = collections.Counter()
+    if launcher:
+        stats.update(launcher.stats() or {})
+    if _local_supervisor is not None:
+        stats.update(_local_supervisor.stats())
+    return dict(stats)
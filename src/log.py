@@ -0,0 +1,146 @@
+import atexit
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import signal
+import sys
+import threading
+
+# Logger raíz de la aplicación: los módulos usan logging.getLogger(__name__)
+ROOT_LOGGER = "src"
+DEFAULT_LEVEL = "info"
+# Registros recientes que se guardan en memoria para volcarlos al fallar
+RING_CAPACITY = 2000
+DUMP_FORMAT = "%(asctime)s %(levelname)-7s %(threadName)s %(name)s: %(message)s"
+
+_ring = None
+_listener = None
+_dump_path = None
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Guarda los últimos registros sin formatearlos; el mensaje solo se
+    construye al volcarlos.
+    """
+
+    def __init__(self, capacity=RING_CAPACITY):
+        super().__init__()
+        self.records = collections.deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter(DUMP_FORMAT))
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def lines(self):
+        return [self.format(record) for record in list(self.records)]
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Pasa el registro tal cual al hilo de escritura: a diferencia de
+    QueueHandler no formatea el mensaje en el hilo que lo emite, y escribir
+    en stdout (un pipe de journald lento) nunca bloquea al bucle de eventos.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=DEFAULT_LEVEL, dump_path=None):
+    """
+    Configura el logger de la aplicación: mensajes a stdout desde un hilo
+    propio, anillo de registros en memoria, volcado del anillo con SIGUSR1
+    y al producirse una excepción no capturada.
+    """
+    global _ring, _listener, _dump_path
+    if _listener is not None:
+        return
+    _dump_path = dump_path
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.propagate = False
+    set_level(level)
+
+    _ring = RingBufferHandler()
+    logger.addHandler(_ring)
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    records = queue.SimpleQueue()
+    logger.addHandler(LazyQueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, console)
+    _listener.start()
+    atexit.register(shutdown)
+
+    sys.excepthook = _excepthook
+    threading.excepthook = _thread_excepthook
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump())
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def set_level(level):
+    """level: nombre ("debug", "info", "warning"...) o número de logging."""
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if not isinstance(level, int):
+        level = logging.getLevelName(DEFAULT_LEVEL.upper())
+    logging.getLogger(ROOT_LOGGER).setLevel(level)
+
+
+def recent_lines():
+    """Registros del anillo ya formateados, del más antiguo al más reciente."""
+    return _ring.lines() if _ring else []
+
+
+def dump(path=None):
+    """Escribe el anillo en path (por defecto el de setup_logging); devuelve la ruta o None."""
+    path = path or _dump_path
+    if not path:
+        return None
+    try:
+        with open(path, "w") as f:
+            f.write("\n".join(recent_lines()) + "\n")
+    except OSError as e:
+        logging.getLogger(__name__).error("[Log] No se pudo volcar el registro en %s: %s", path, e)
+        return None
+    logging.getLogger(__name__).info("[Log] Registro reciente volcado en %s", path)
+    return path
+
+
+def shutdown():
+    """Vacía la cola de mensajes pendientes; se llama antes de salir."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _excepthook(exc_type, exc, tb):
+    logging.getLogger(ROOT_LOGGER).critical("Excepción no capturada", exc_info=(exc_type, exc, tb))
+    # La traza ya sale por el registro: no se llama al excepthook original para no duplicarla
+    dump()
+    shutdown()
+
+
+def _thread_excepthook(args):
+    if args.exc_type is SystemExit:
+        return
+    logging.getLogger(ROOT_LOGGER).critical(
+        "Excepción no capturada en el hilo %s", args.thread.name if args.thread else "?",
+        exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
+    dump()
+
+
+def _after_fork():
+    # El hilo de escritura no existe en el hijo (proceso auxiliar del Launcher): se escribe directamente
+    global _listener
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        if isinstance(handler, LazyQueueHandler):
+            logger.removeHandler(handler)
+    if _listener is not None:
+        logger.addHandler(_listener.handlers[0])
+        _listener = None
@@ -1,56 +1,237 @@
 import sys
 import os
-import time
-import threading
-from PyQt5.QtWidgets import QApplication
-from src.gui import MainWindow
-from src.config_manager import ConfigManager
-from src.backend import MouseEventListener, ActionExecutor
-from src.battery import BatteryManager
+import json
+import logging
+import signal
+from src.startup import STARTUP, wait_until_ready
+from src import ipc, log as logs
+from src.config_manager import ACTIONS_FILE, ConfigManager
+from src.launcher import Launcher, supervisor_stats
+
+log = logging.getLogger(__name__)
+
+# Cada cuánto pregunta la GUI cliente la batería al demonio
+CLIENT_BATTERY_INTERVAL_MS = 10000
+# Volcado del registro reciente (SIGUSR1 o excepción no capturada)
+LOG_DUMP_FILE = os.path.join(os.path.dirname(ACTIONS_FILE), "mxmouse.log")
+
+def run_gui_client(config_manager):
+    """
+    GUI sin listener propio: hay un demonio (--daemon) atendiendo el ratón.
+    La configuración se edita en actions.json, que el demonio recarga al
+    cambiar, y el estado se consulta por el socket de ipc.py.
+    """
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+    from src.gui import MainWindow
+    from src.config_watcher import ConfigWatcher
+
+    app = QApplication(sys.argv)
+    window = MainWindow(config_manager)
+    if "--hidden" in sys.argv:
+        window.hide()
+    else:
+        window.show()
+
+    config_watcher = ConfigWatcher(config_manager, ACTIONS_FILE)
+    config_watcher.start()
+
+    last_battery = [None]
+
+    def poll_battery():
+        try:
+            percentage = ipc.request("battery")
+        except RuntimeError as e:
+            log.error("[IPC] Error al consultar la batería: %s", e)
+            return
+        if percentage is not None and percentage != last_battery[0]:
+            last_battery[0] = percentage
+            window.comm.update_battery.emit(percentage)
+
+    battery_timer = QTimer()
+    battery_timer.timeout.connect(poll_battery)
+    battery_timer.start(CLIENT_BATTERY_INTERVAL_MS)
+    poll_battery()
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: app.quit())
+    signal_timer = QTimer()
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(500)
+
+    exit_code = app.exec_()
+    config_watcher.stop()
+    config_manager.flush()
+    # No esperar a que el demonio detecte el último guardado
+    ipc.request("reload")
+    return exit_code
+
+def print_daemon_stats():
+    """--stats: contadores e histogramas de latencia (µs) de la instancia en marcha (demonio o GUI)."""
+    try:
+        stats = ipc.request("stats")
+    except RuntimeError as e:
+        print(f"[IPC] Error al consultar las estadísticas: {e}")
+        return 1
+    if stats is None:
+        print(f"[IPC] No hay ninguna instancia de MXMouse escuchando en {ipc.SOCKET_PATH}")
+        return 1
+    print(json.dumps(stats, indent=2))
+    return 0
+
+def option_value(name):
+    """Valor de una opción "--nombre VALOR" de la línea de órdenes, o None."""
+    if name not in sys.argv:
+        return None
+    index = sys.argv.index(name) + 1
+    return sys.argv[index] if index < len(sys.argv) else None
+
+def create_recorder():
+    """EventRecorder para --record ARCHIVO, o None si no se ha pedido grabar."""
+    path = option_value("--record")
+    if not path:
+        return None
+    from src.recorder import EventRecorder
+    try:
+        recorder = EventRecorder(path)
+    except (OSError, ValueError) as e:
+        log.error("[Recorder] No se puede grabar en %s: %s", path, e)
+        sys.exit(1)
+    log.info("[Recorder] Grabando los eventos del ratón en %s", path)
+    return recorder
 
 def main():
-    # Inicializar la configuración y el ejecutor de acciones
+    if "--stats" in sys.argv:
+        sys.exit(print_daemon_stats())
+
+    # Mensajes desde un hilo propio y registro reciente en memoria (SIGUSR1 lo vuelca a LOG_DUMP_FILE)
+    logs.setup_logging(option_value("--log-level") or logs.DEFAULT_LEVEL, LOG_DUMP_FILE)
     config_manager = ConfigManager()
-    action_executor = ActionExecutor()
+    logs.set_level(option_value("--log-level") or config_manager.get_setting("log_level"))
+    STARTUP.mark("config")
+
+    replay_path = option_value("--replay")
+    if replay_path:
+        # Reproduce una grabación con la configuración actual, sin GUI
+        from src.recorder import run_replay
+        launcher = Launcher(config_manager.get_setting("max_children"))
+        launcher.start()
+        exit_code = run_replay(config_manager, launcher, replay_path, fast="--fast" in sys.argv)
+        launcher.stop()
+        sys.exit(exit_code)
+
+    if "--daemon" not in sys.argv and ipc.request("status") is not None:
+        log.info("[IPC] MXMouse ya está en marcha en %s; la GUI funcionará como cliente.", ipc.SOCKET_PATH)
+        sys.exit(run_gui_client(config_manager))
+
+    # El proceso auxiliar se crea antes de importar Qt para que sea pequeño
+    launcher = Launcher(config_manager.get_setting("max_children"))
+    launcher.start()
+    STARTUP.mark("launcher")
+
+    if "--daemon" in sys.argv:
+        # Sin PyQt5: solo evdev, el listener y el socket de control
+        from src.daemon import run_daemon
+        exit_code = run_daemon(config_manager, launcher, create_recorder())
+        launcher.stop()
+        sys.exit(exit_code)
+
+    # En el arranque automático (--hidden) la sesión puede no estar lista todavía: se
+    # comprueba que X acepte conexiones y que el ratón exista en vez de esperar a ciegas
+    if "--hidden" in sys.argv:
+        wait_until_ready()
+
+    # El listener arranca antes de cargar Qt para que los botones funcionen cuanto antes
+    from src.backend import MouseEventListener, ActionExecutor
+    from src.output import create_output_backend
+
+    output = create_output_backend(config_manager.get_setting("output_backend"), launcher)
+    action_executor = ActionExecutor(output, launcher, config_manager.get_setting("command_timeout"))
+
+    recorder = create_recorder()
+    event_listener = None
+    try:
+        event_listener = MouseEventListener(config_manager, action_executor, recorder=recorder)
+        event_listener.start()
+    except Exception as e:
+        log.error("Error al iniciar el listener de eventos: %s", e)
+    STARTUP.mark("listener")
+
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+    from src.gui import MainWindow
+    from src.config_watcher import ConfigWatcher
+    from src.battery import BatteryManager
+    from src.hidpp import HidppMonitor
 
     app = QApplication(sys.argv)
     window = MainWindow(config_manager)
-    
+
     # Si se pasa el parámetro "--hidden", no mostramos la ventana (o la ocultamos)
-    auto_hidden = "--hidden" in sys.argv
-    if auto_hidden:
+    if "--hidden" in sys.argv:
         window.hide()  # Inicia minimizada en la bandeja
-        time.sleep(5)
     else:
         window.show()
+    STARTUP.mark("gui")
 
-    # Inicializar el listener de eventos
-    try:
-        event_listener = MouseEventListener(config_manager, action_executor)
-        event_listener.start()
-    except Exception as e:
-        print(f"Error al iniciar el listener de eventos: {e}")
+    # Recargar actions.json cuando se modifique desde fuera de la aplicación
+    config_watcher = ConfigWatcher(config_manager, ACTIONS_FILE)
+    config_watcher.start()
+
+    # La etiqueta de batería solo se actualiza cuando cambia el porcentaje
+    battery_manager = BatteryManager(window.comm.update_battery.emit)
+    battery_manager.start()
+
+    # Batería, DPI y SmartShift directamente con el ratón por HID++, en el bucle del listener
+    hidpp_monitor = None
+    if event_listener:
+        hidpp_monitor = HidppMonitor(
+            event_listener.engine,
+            battery_manager.publish_hidpp,
+            config_manager.get_setting("dpi"),
+            config_manager.get_setting("smartshift_threshold"),
+            on_lost=battery_manager.hidpp_lost,
+        )
+        hidpp_monitor.start()
 
-    # Inicializar el gestor de batería en un hilo separado
-    battery_manager = BatteryManager()
+    # El mismo socket de control que el demonio: --stats funciona también en este modo
+    # y una segunda instancia abre solo la ventana, como cliente
+    ipc_server = None
+    if event_listener:
+        from src.daemon import control_handlers
+        ipc_server = ipc.IpcServer(event_listener.engine, control_handlers(
+            config_manager, launcher, event_listener, action_executor, battery_manager))
+        ipc_server.start()
 
-    def battery_updater():
-        while True:
-            try:
-                percentage = battery_manager.get_battery_percentage()
-                window.comm.update_battery.emit(percentage)
-            except Exception as e:
-                print("Error al capturar batería:", e)
-            time.sleep(60)
+    # Guardar la configuración pendiente también al recibir SIGTERM
+    def handle_sigterm(signum, frame):
+        config_manager.flush()
+        app.quit()
 
-    battery_thread = threading.Thread(target=battery_updater, daemon=True)
-    battery_thread.start()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    # Mientras Qt espera eventos no se ejecuta código Python; este temporizador
+    # devuelve el control periódicamente para que se atiendan las señales
+    signal_timer = QTimer()
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(500)
 
     exit_code = app.exec_()
+    config_watcher.stop()
+    battery_manager.stop()
+    config_manager.flush()
 
     # Detener el listener de eventos al cerrar la aplicación
-    event_listener.stop()
-    event_listener.join()
+    if event_listener:
+        if ipc_server:
+            ipc_server.stop()
+        if hidpp_monitor:
+            hidpp_monitor.stop()
+        event_listener.stop()
+        event_listener.join()
+    if recorder:
+        recorder.close()
+    action_executor.output.close()
+    log.info("[Supervisor] Procesos hijos: %s", supervisor_stats(launcher))
+    launcher.stop()
 
     sys.exit(exit_code)
 
@@ -0,0 +1,279 @@
+import logging
+import os
+import struct
+import threading
+import time
+
+from src.launcher import spawn_process
+
+log = logging.getLogger(__name__)
+
+# Modificadores en la sintaxis de xdotool -> keysym de X
+# Un xdotool que no termina en este tiempo (p. ej. X colgado) se mata
+XDOTOOL_TIMEOUT = 5.0
+
+XDOTOOL_MODIFIERS = {
+    "ctrl":  "Control_L",
+    "shift": "Shift_L",
+    "alt":   "Alt_L",
+    "super": "Super_L",
+}
+
+
+class XdotoolBackend:
+    """Inyecta teclas y clics lanzando un proceso xdotool por acción."""
+    name = "xdotool"
+    hi_res_scroll = False
+
+    def __init__(self, launcher=None):
+        self.launcher = launcher
+
+    def key(self, combo, repeat=1):
+        args = ["xdotool", "key"]
+        if repeat > 1:
+            args += ["--repeat", str(repeat), "--delay", "0"]
+        spawn_process(self.launcher, args + [combo], timeout=XDOTOOL_TIMEOUT)
+
+    def click(self, button, repeat=1):
+        args = ["xdotool", "click"]
+        if repeat > 1:
+            args += ["--repeat", str(repeat), "--delay", "0"]
+        spawn_process(self.launcher, args + [str(button)], timeout=XDOTOOL_TIMEOUT)
+
+    def close(self):
+        pass
+
+
+class XTestBackend:
+    """
+    Inyecta teclas y clics mediante la extensión XTest sobre la conexión X
+    persistente compartida (src/xconn.py), sin crear procesos.
+    """
+    name = "xtest"
+    hi_res_scroll = False
+
+    def __init__(self):
+        from Xlib import X, XK
+        from Xlib.ext import xtest
+
+        from src.xconn import get_connection
+
+        self._X = X
+        self._XK = XK
+        self._xtest = xtest
+        XK.load_keysym_group("xf86")
+
+        connection = get_connection()
+        self.display = connection.display
+        if not self.display.has_extension("XTEST"):
+            raise RuntimeError("El servidor X no soporta la extensión XTEST.")
+
+        # Xlib no es thread-safe: todas las peticiones pasan por el lock de la conexión
+        self._lock = connection.lock
+        self._keycodes = {}
+
+    def _keycode(self, name):
+        keycode = self._keycodes.get(name)
+        if keycode is None:
+            keysym_name = XDOTOOL_MODIFIERS.get(name.lower(), name)
+            if keysym_name.startswith("XF86") and not keysym_name.startswith("XF86_"):
+                keysym_name = "XF86_" + keysym_name[len("XF86"):]
+            keysym = self._XK.string_to_keysym(keysym_name)
+            keycode = self.display.keysym_to_keycode(keysym) if keysym else 0
+            if not keycode:
+                raise ValueError(f"Tecla desconocida para XTest: {name}")
+            self._keycodes[name] = keycode
+        return keycode
+
+    def key(self, combo, repeat=1):
+        keycodes = [self._keycode(part) for part in combo.split("+")]
+        with self._lock:
+            for _ in range(repeat):
+                for keycode in keycodes:
+                    self._xtest.fake_input(self.display, self._X.KeyPress, keycode)
+                for keycode in reversed(keycodes):
+                    self._xtest.fake_input(self.display, self._X.KeyRelease, keycode)
+            self.display.flush()
+
+    def click(self, button, repeat=1):
+        with self._lock:
+            for _ in range(repeat):
+                self._xtest.fake_input(self.display, self._X.ButtonPress, button)
+                self._xtest.fake_input(self.display, self._X.ButtonRelease, button)
+            self.display.flush()
+
+    def close(self):
+        from src.xconn import close_connection
+
+        close_connection()
+
+
+# Nombres de teclas de xdotool -> códigos evdev (las letras y dígitos se
+# resuelven como KEY_<nombre>)
+UINPUT_KEYS = {
+    "ctrl":                 "KEY_LEFTCTRL",
+    "shift":                "KEY_LEFTSHIFT",
+    "alt":                  "KEY_LEFTALT",
+    "super":                "KEY_LEFTMETA",
+    "XF86AudioRaiseVolume": "KEY_VOLUMEUP",
+    "XF86AudioLowerVolume": "KEY_VOLUMEDOWN",
+    "XF86AudioMute":        "KEY_MUTE",
+    "XF86Forward":          "KEY_FORWARD",
+    "XF86Back":             "KEY_BACK",
+    "KP_Add":               "KEY_KPPLUS",
+    "KP_Subtract":          "KEY_KPMINUS",
+}
+
+# Botones de X -> botón evdev o (eje, valor, eje hi-res) para la rueda
+UINPUT_BUTTONS = {
+    1: "BTN_LEFT",
+    2: "BTN_MIDDLE",
+    3: "BTN_RIGHT",
+    8: "BTN_SIDE",
+    9: "BTN_EXTRA",
+}
+UINPUT_WHEEL = {
+    4: ("REL_WHEEL",   1, "REL_WHEEL_HI_RES"),
+    5: ("REL_WHEEL",  -1, "REL_WHEEL_HI_RES"),
+    6: ("REL_HWHEEL", -1, "REL_HWHEEL_HI_RES"),
+    7: ("REL_HWHEEL",  1, "REL_HWHEEL_HI_RES"),
+}
+
+# struct input_event: timeval (sec, usec), type, code, value
+INPUT_EVENT = struct.Struct("llHHi")
+# Sufijo del nombre de las copias uinput; el listener no debe adoptarlas como otro ratón
+CLONE_SUFFIX = " (MXMouse)"
+
+
+class UInputBackend:
+    """
+    Crea un único dispositivo virtual teclado/ratón con uinput y escribe los
+    eventos KEY_*/REL_* directamente al kernel. Funciona en Wayland y sin X.
+    Cada acción se envía con una sola llamada write().
+    """
+    name = "uinput"
+    hi_res_scroll = True
+
+    def __init__(self):
+        from evdev import UInput, ecodes
+
+        self._ecodes = ecodes
+        keys = set(ecodes.ecodes[name] for name in UINPUT_KEYS.values())
+        keys.update(ecodes.ecodes[name] for name in UINPUT_BUTTONS.values())
+        keys.update(code for name, code in ecodes.ecodes.items()
+                    if name.startswith("KEY_") and len(name) == 5)
+        rels = [ecodes.REL_X, ecodes.REL_Y, ecodes.REL_WHEEL, ecodes.REL_HWHEEL,
+                ecodes.REL_WHEEL_HI_RES, ecodes.REL_HWHEEL_HI_RES]
+        self.device = UInput({ecodes.EV_KEY: sorted(keys), ecodes.EV_REL: rels},
+                             name="MXMouse virtual input")
+        self._lock = threading.Lock()
+        self._keycodes = {}
+        self._hwheel_residual = 0
+
+    def _keycode(self, name):
+        keycode = self._keycodes.get(name)
+        if keycode is None:
+            evdev_name = UINPUT_KEYS.get(name) or UINPUT_KEYS.get(name.lower()) or f"KEY_{name.upper()}"
+            keycode = self._ecodes.ecodes.get(evdev_name)
+            if keycode is None:
+                raise ValueError(f"Tecla desconocida para uinput: {name}")
+            self._keycodes[name] = keycode
+        return keycode
+
+    def _write(self, events):
+        now = time.time()
+        sec, usec = int(now), int((now % 1) * 1000000)
+        syn = INPUT_EVENT.pack(sec, usec, self._ecodes.EV_SYN, self._ecodes.SYN_REPORT, 0)
+        data = b"".join(INPUT_EVENT.pack(sec, usec, etype, code, value) + (syn if sync else b"")
+                        for etype, code, value, sync in events)
+        with self._lock:
+            os.write(self.device.fd, data)
+
+    def key(self, combo, repeat=1):
+        EV_KEY = self._ecodes.EV_KEY
+        keycodes = [self._keycode(part) for part in combo.split("+")]
+        events = [(EV_KEY, keycode, 1, True) for keycode in keycodes]
+        events += [(EV_KEY, keycode, 0, True) for keycode in reversed(keycodes)]
+        self._write(events * repeat)
+
+    def click(self, button, repeat=1):
+        ecodes = self._ecodes
+        if button in UINPUT_WHEEL:
+            # Los pasos de rueda se agregan en un único evento REL de valor N
+            axis, value, hi_res_axis = UINPUT_WHEEL[button]
+            self._write([
+                (ecodes.EV_REL, ecodes.ecodes[axis], value * repeat, False),
+                (ecodes.EV_REL, ecodes.ecodes[hi_res_axis], value * repeat * 120, True),
+            ])
+            return
+        name = UINPUT_BUTTONS.get(button)
+        if name is None:
+            raise ValueError(f"Botón desconocido para uinput: {button}")
+        code = ecodes.ecodes[name]
+        self._write([(ecodes.EV_KEY, code, 1, True), (ecodes.EV_KEY, code, 0, True)] * repeat)
+
+    def hscroll_hi_res(self, units):
+        # Se acompaña de REL_HWHEEL cada 120 unidades para los clientes sin hi-res
+        ecodes = self._ecodes
+        self._hwheel_residual += units
+        detents = abs(self._hwheel_residual) // 120
+        if self._hwheel_residual < 0:
+            detents = -detents
+        self._hwheel_residual -= detents * 120
+        events = [(ecodes.EV_REL, ecodes.REL_HWHEEL_HI_RES, units, not detents)]
+        if detents:
+            events.append((ecodes.EV_REL, ecodes.REL_HWHEEL, detents, True))
+        self._write(events)
+
+    def close(self):
+        with self._lock:
+            self.device.close()
+
+
+class UInputClone:
+    """
+    Copia virtual de un ratón real con sus mismas capacidades. Mientras el
+    ratón está capturado en exclusiva (EVIOCGRAB) reenvía al sistema los
+    eventos que no consume la aplicación, un frame por write().
+    """
+
+    def __init__(self, device):
+        from evdev import UInput
+
+        self.device = UInput.from_device(device, name=device.name + CLONE_SUFFIX)
+
+    def emit(self, events):
+        """events: InputEvent ya leídos, terminados con su SYN_REPORT."""
+        data = b"".join(INPUT_EVENT.pack(e.sec, e.usec, e.type, e.code, e.value) for e in events)
+        os.write(self.device.fd, data)
+
+    def close(self):
+        self.device.close()
+
+
+OUTPUT_BACKENDS = {
+    "uinput":  UInputBackend,
+    "xtest":   XTestBackend,
+    "xdotool": XdotoolBackend,
+}
+
+
+def create_output_backend(name="auto", launcher=None):
+    """
+    Crea el backend de salida indicado. Con "auto" se intenta uinput (necesita
+    permiso de escritura en /dev/uinput), después XTest y, si ninguno está
+    disponible, xdotool.
+    """
+    candidates = ["uinput", "xtest", "xdotool"] if name == "auto" else [name, "xdotool"]
+    for candidate in candidates:
+        backend_cls = OUTPUT_BACKENDS.get(candidate)
+        if backend_cls is None:
+            log.warning("Backend de salida desconocido: %s", candidate)
+            continue
+        try:
+            backend = backend_cls(launcher) if backend_cls is XdotoolBackend else backend_cls()
+            log.info("[Output] Usando backend de salida: %s", backend.name)
+            return backend
+        except Exception as e:
+            log.warning("No se pudo iniciar el backend de salida %s: %s", candidate, e)
+    return XdotoolBackend(launcher)
@@ -0,0 +1,232 @@
+import collections
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from evdev import InputEvent, ecodes
+
+log = logging.getLogger(__name__)
+
+# Formato de las grabaciones: cabecera con firma, versión, tamaño de registro
+# y nombre del ratón, seguida de registros (sec, usec, type, code, value) de
+# tamaño fijo en little-endian, de modo que el archivo se puede recorrer con mmap
+MAGIC = b"MXEV"
+VERSION = 1
+HEADER = struct.Struct("<4sHH64s")
+RECORD = struct.Struct("<qiHHi")
+# Cada cuánto vuelca el hilo escritor lo acumulado
+FLUSH_INTERVAL = 0.5
+# Pausa máxima entre dos eventos al reproducir con los tiempos originales
+MAX_REPLAY_GAP = 1.0
+# Espera máxima a que el listener adopte el ratón de la grabación y a que terminen sus acciones
+ADOPT_TIMEOUT = 5.0
+DRAIN_TIMEOUT = 30.0
+
+
+class EventRecorder:
+    """
+    Graba los eventos evdev tal como llegan al listener. El hilo de eventos
+    solo añade el InputEvent a una deque; el hilo escritor los empaqueta y
+    los escribe cada FLUSH_INTERVAL, así que grabar no bloquea la lectura.
+    Cada grabación empieza de cero: si el archivo ya era una grabación se
+    sobrescribe, y si es otro tipo de archivo no se toca.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path):
+            read_header(path)  # Lanza ValueError si no es una grabación
+        self.file = open(path, "wb")
+        self.pending = collections.deque()
+        self.count = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._writer, name="EventRecorder", daemon=True)
+        self._thread.start()
+
+    def wrap(self, handler, name):
+        """Devuelve un manejador que graba cada evento antes de pasárselo a handler."""
+        with self._lock:
+            # La cabecera lleva el nombre del primer ratón grabado
+            if self.file.tell() == 0:
+                self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, name.encode()[:64]))
+        append = self.pending.append
+
+        def record_and_handle(event):
+            append(event)
+            handler(event)
+
+        return record_and_handle
+
+    def _writer(self):
+        while not self._stop_event.wait(FLUSH_INTERVAL):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        pending = self.pending
+        data = bytearray()
+        while pending:
+            event = pending.popleft()
+            data += RECORD.pack(event.sec, event.usec, event.type, event.code, event.value)
+        if data:
+            with self._lock:
+                self.file.write(data)
+                self.file.flush()
+            self.count += len(data) // RECORD.size
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join()
+        self.file.close()
+        log.info("[Recorder] %s eventos grabados en %s", self.count, self.path)
+
+
+def read_header(path):
+    """Devuelve el nombre del ratón grabado; lanza ValueError si el archivo no es una grabación."""
+    with open(path, "rb") as f:
+        data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} no es una grabación de eventos")
+    magic, version, record_size, name = HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"{path} no es una grabación de eventos compatible")
+    return name.rstrip(b"\0").decode(errors="replace")
+
+
+def read_events(path):
+    """Recorre los eventos de una grabación con mmap, sin cargarla en memoria."""
+    read_header(path)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # Un registro a medias (grabación interrumpida) se ignora
+            end = HEADER.size + (len(data) - HEADER.size) // RECORD.size * RECORD.size
+            view = memoryview(data)[HEADER.size:end]
+            try:
+                for sec, usec, type, code, value in RECORD.iter_unpack(view):
+                    yield InputEvent(sec, usec, type, code, value)
+            finally:
+                view.release()
+
+
+class ReplayDevice:
+    """
+    Ratón simulado que entrega los eventos de una grabación al EventEngine.
+    Con fast=False respeta los intervalos originales, salvo las pausas de
+    más de MAX_REPLAY_GAP (el ratón quieto) que se acortan a ese valor; con
+    fast=True los entrega seguidos. Las marcas de tiempo se trasladan a la
+    hora actual para que las latencias del listener sigan teniendo sentido.
+    """
+
+    def __init__(self, path, fast=False):
+        self.path = path
+        self.name = read_header(path) or "MX Master (grabación)"
+        self.fast = fast
+        self.started = threading.Event()
+        self.finished = threading.Event()
+        self.count = 0
+
+    def capabilities(self):
+        return {ecodes.EV_KEY: [], ecodes.EV_REL: [ecodes.REL_X, ecodes.REL_Y, ecodes.REL_HWHEEL]}
+
+    async def async_read_loop(self):
+        import asyncio
+
+        self.started.set()
+        start = time.time()
+        previous = None
+        elapsed = 0.0
+        try:
+            for event in read_events(self.path):
+                recorded = event.sec + event.usec / 1000000
+                if previous is not None:
+                    # Un salto hacia atrás del reloj cuenta como 0
+                    elapsed += min(max(recorded - previous, 0.0), MAX_REPLAY_GAP)
+                previous = recorded
+                if self.fast:
+                    now = time.time()
+                else:
+                    now = start + elapsed
+                    delay = now - time.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                sec = int(now)
+                yield InputEvent(sec, int((now - sec) * 1000000), event.type, event.code, event.value)
+                self.count += 1
+        finally:
+            self.finished.set()
+
+    def grab(self):
+        pass
+
+    def ungrab(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayRegistry:
+    """Registro con el dispositivo de la grabación como único ratón."""
+
+    def __init__(self, device):
+        self.device = device
+
+    def list_paths(self):
+        return [self.device.path]
+
+    def open(self, path):
+        if path != self.device.path:
+            raise FileNotFoundError(path)
+        return self.device
+
+    def clone(self, device):
+        # Sin ratón real no hay nada que reenviar: el cursor se congela con xinput
+        raise OSError("una grabación no tiene copia uinput")
+
+
+def run_replay(config_manager, launcher, path, fast=False):
+    """
+    Modo --replay: pasa una grabación por el listener con la configuración y
+    el backend de salida reales. Devuelve el código de salida.
+    """
+    from src.backend import ActionExecutor, MouseEventListener
+    from src.output import create_output_backend
+
+    try:
+        device = ReplayDevice(path, fast)
+    except (OSError, ValueError) as e:
+        log.error("[Replay] No se puede reproducir %s: %s", path, e)
+        return 1
+
+    output = create_output_backend(config_manager.get_setting("output_backend"), launcher)
+    action_executor = ActionExecutor(output, launcher, config_manager.get_setting("command_timeout"))
+    listener = MouseEventListener(config_manager, action_executor, registry=ReplayRegistry(device))
+    mode = "lo más rápido posible" if fast else "con los tiempos originales"
+    log.info("[Replay] Reproduciendo %s (%s) %s...", path, device.name, mode)
+    start = time.perf_counter()
+    listener.start()
+    try:
+        if not device.started.wait(ADOPT_TIMEOUT):
+            # is_mouse_device solo adopta ratones con "MX Master" en el nombre
+            log.error("[Replay] El listener no ha adoptado el ratón de la grabación (%s).", device.name)
+            return 1
+        while not device.finished.wait(0.5):
+            if not listener.is_alive():
+                log.error("[Replay] El listener se detuvo antes de terminar la grabación.")
+                return 1
+        if not listener.action_queue.join(DRAIN_TIMEOUT):
+            log.error("[Replay] Las acciones no terminaron en %s s.", DRAIN_TIMEOUT)
+            return 1
+        elapsed = time.perf_counter() - start
+    finally:
+        listener.stop()
+        listener.join()
+        output.close()
+    log.info("[Replay] %s eventos en %.2f s", device.count, elapsed)
+    return 0
@@ -0,0 +1,102 @@
+import logging
+import os
+import socket
+import time
+
+log = logging.getLogger(__name__)
+
+# Espera máxima a que el servidor X acepte conexiones (arranque automático de la sesión)
+DISPLAY_TIMEOUT = 15.0
+# Espera máxima al ratón una vez lista la pantalla; si no aparece llegará por hotplug
+MOUSE_TIMEOUT = 2.0
+POLL_INTERVALS = (0.02, 0.05, 0.1, 0.2)
+INPUT_DEVICES = "/proc/bus/input/devices"
+
+
+def seconds_since_exec():
+    """Tiempo desde que el kernel creó el proceso (incluye arrancar el intérprete)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # El nombre del ejecutable va entre paréntesis y puede contener espacios
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupTimer:
+    """
+    Hitos del arranque en milisegundos desde el exec del proceso, hasta el
+    primer evento del ratón atendido por el listener.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter() - seconds_since_exec()
+        self.marks = {}
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = (time.perf_counter() - self.origin) * 1000
+
+    def summary(self):
+        return ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.marks.items())
+
+
+STARTUP = StartupTimer()
+
+
+def display_ready(display=None):
+    """True si se puede conectar con el servidor X de DISPLAY (o si no hay DISPLAY)."""
+    display = display if display is not None else os.environ.get("DISPLAY")
+    if not display:
+        return True  # Sin X (Wayland puro con uinput): no hay nada que esperar
+    host, _, number = display.rpartition(":")
+    number = number.split(".")[0]
+    if host and host != "unix":
+        family, address = socket.AF_INET, (host, 6000 + int(number or 0))
+    else:
+        family, address = socket.AF_UNIX, f"/tmp/.X11-unix/X{number}"
+    try:
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.5)
+            sock.connect(address)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def mouse_present(name="MX Master", devices_file=INPUT_DEVICES):
+    """True si el kernel ya ha registrado un nodo evdev para el ratón (sin abrirlo)."""
+    try:
+        with open(devices_file) as f:
+            blocks = f.read().split("\n\n")
+    except OSError:
+        return True  # No se puede comprobar: que lo resuelva el hotplug
+    return any(name in block and "event" in block for block in blocks)
+
+
+def wait_for(check, timeout):
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while not check():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(POLL_INTERVALS[min(attempt, len(POLL_INTERVALS) - 1)])
+        attempt += 1
+    return True
+
+
+def wait_until_ready():
+    """
+    Sustituye a la espera fija del arranque automático: vuelve en cuanto el
+    servidor X acepta conexiones y el ratón tiene nodo evdev, o al agotar
+    los tiempos máximos.
+    """
+    if not wait_for(display_ready, DISPLAY_TIMEOUT):
+        log.warning("[Startup] El servidor X no responde tras %.0f s; se continúa igualmente.", DISPLAY_TIMEOUT)
+    STARTUP.mark("display")
+    if not wait_for(mouse_present, MOUSE_TIMEOUT):
+        log.info("[Startup] El ratón aún no está conectado; se detectará al aparecer.")
+    STARTUP.mark("ready")
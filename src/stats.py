@@ -0,0 +1,122 @@
+import logging
+import threading
+from array import array
+
+log = logging.getLogger(__name__)
+
+# Precisión de los histogramas: 2**SUB_BUCKET_BITS cubos lineales por cada
+# potencia de dos (error relativo máximo de 1/64, como un HDR de 2 cifras)
+SUB_BUCKET_BITS = 6
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Valor máximo registrable en microsegundos (~67 s); lo que pase se acumula en el último cubo
+MAX_VALUE_US = (1 << 26) - 1
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Etapas del recorrido de un evento
+KERNEL_READ = "kernel_read"            # marca de tiempo del kernel -> lectura en el bucle
+READ_DISPATCH = "read_dispatch"        # lectura -> acción encolada
+DISPATCH_COMPLETE = "dispatch_complete"  # acción encolada -> acción terminada (o proceso lanzado)
+STAGES = (KERNEL_READ, READ_DISPATCH, DISPATCH_COMPLETE)
+
+
+def bucket_index(value):
+    """Cubo de un valor en microsegundos: lineal hasta 2*SUB_BUCKETS y logarítmico después."""
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return SUB_BUCKETS * shift + (value >> shift)
+
+
+def bucket_value(index):
+    """Valor representativo (punto medio) de un cubo."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    low = (index - SUB_BUCKETS * shift) << shift
+    return low + (1 << shift) // 2
+
+
+class LatencyHistogram:
+    """
+    Histograma de latencias en microsegundos con cubos logarítmicos de tamaño
+    fijo: registrar un valor cuesta lo mismo tenga el histograma 10 o 10
+    millones de muestras y no reserva memoria.
+    """
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * (bucket_index(MAX_VALUE_US) + 1)))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds):
+        value = int(seconds * 1000000)
+        if value < 0:
+            value = 0  # Relojes no monótonos: mejor 0 que un cubo inexistente
+        elif value > MAX_VALUE_US:
+            value = MAX_VALUE_US
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        target = max(int(self.count * p / 100 + 0.5), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def summary(self):
+        """Recuento, media, percentiles y máximo en microsegundos."""
+        summary = {"count": self.count, "mean": self.total // self.count if self.count else 0}
+        for p in PERCENTILES:
+            summary[f"p{p:g}"] = self.percentile(p)
+        summary["max"] = self.max
+        return summary
+
+
+class PipelineStats:
+    """
+    Latencias por etapa del camino evdev -> acción. Las dos primeras etapas
+    se registran en el hilo del bucle de eventos; la última en los hilos de
+    la ActionQueue, por eso cada histograma tiene su propio cerrojo.
+    """
+
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self._locks = {stage: threading.Lock() for stage in STAGES}
+        self._reported = 0
+
+    def record(self, stage, seconds):
+        with self._locks[stage]:
+            self.histograms[stage].record(seconds)
+
+    def summary(self):
+        result = {}
+        for stage in STAGES:
+            with self._locks[stage]:
+                result[stage] = self.histograms[stage].summary()
+        return result
+
+    def format_summary(self):
+        lines = []
+        for stage, summary in self.summary().items():
+            if not summary["count"]:
+                continue
+            lines.append(f"{stage:18s} n={summary['count']:<8d} p50={summary['p50']} µs  "
+                         f"p99={summary['p99']} µs  p99.9={summary['p99.9']} µs  max={summary['max']} µs")
+        return "\n".join(lines)
+
+    def report(self):
+        """Imprime el resumen si ha habido eventos desde el último informe."""
+        count = self.histograms[KERNEL_READ].count
+        if count == self._reported:
+            return
+        self._reported = count
+        log.info("[Stats] Latencias del recorrido de eventos:\n%s", self.format_summary())
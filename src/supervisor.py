@@ -0,0 +1,144 @@
+import collections
+import logging
+import os
+import select
+import signal
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Intervalo del sondeo con waitpid(WNOHANG) cuando no hay pidfd (Linux < 5.3)
+POLL_INTERVAL = 0.2
+
+
+class ChildSupervisor:
+    """
+    Lanza y vigila los procesos hijos de las acciones. Un hilo los recoge en
+    cuanto terminan (con pidfd si el kernel lo soporta y, si no, sondeando
+    con waitpid), así no se acumulan zombis. Limita el número de hijos vivos
+    y mata con SIGKILL a los que superan su tiempo máximo, si lo tienen.
+    """
+
+    def __init__(self, max_children=64):
+        self.max_children = max(int(max_children), 1)
+        # pid -> (pidfd o None, instante límite o None, descripción)
+        self.children = {}
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_w, False)
+        self._use_pidfd = hasattr(os, "pidfd_open")
+        self.running = True
+        self._thread = threading.Thread(target=self._reap_loop, name="ChildReaper", daemon=True)
+        self._thread.start()
+
+    def launch(self, argv, timeout=None):
+        """Lanza argv si no se ha alcanzado el límite. Devuelve el pid o None."""
+        with self._lock:
+            if len(self.children) >= self.max_children:
+                self.counters["rejected"] += 1
+                log.warning("[Supervisor] Demasiados procesos activos (%s), no se lanza %s",
+                            len(self.children), argv[0])
+                return None
+        pid = os.posix_spawnp(argv[0], argv, os.environ,
+                              setsigdef=(signal.SIGCHLD, signal.SIGINT, signal.SIGTERM))
+        self.track(pid, timeout, argv[0])
+        return pid
+
+    def track(self, pid, timeout=None, label=""):
+        pidfd = None
+        if self._use_pidfd:
+            try:
+                pidfd = os.pidfd_open(pid)
+            except OSError:
+                # Kernel sin pidfd_open: se pasa al sondeo
+                self._use_pidfd = False
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self.children[pid] = (pidfd, deadline, label)
+            self.counters["launched"] += 1
+        self._wake()
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b"x")
+        except BlockingIOError:
+            pass  # Ya hay un aviso pendiente
+
+    def _reap_loop(self):
+        poller = select.poll()
+        poller.register(self._wake_r, select.POLLIN)
+        registered = {}
+        while self.running:
+            with self._lock:
+                children = dict(self.children)
+            for pid, (pidfd, _deadline, _label) in children.items():
+                if pidfd is not None and pidfd not in registered:
+                    poller.register(pidfd, select.POLLIN)
+                    registered[pidfd] = pid
+
+            timeout = self._kill_expired(children)
+            if any(pidfd is None for pidfd, _d, _l in children.values()):
+                timeout = min(timeout, POLL_INTERVAL) if timeout is not None else POLL_INTERVAL
+
+            ready = poller.poll(None if timeout is None else timeout * 1000)
+            for fd, _event in ready:
+                if fd == self._wake_r:
+                    os.read(self._wake_r, 4096)
+                else:
+                    poller.unregister(fd)
+                    self._reap(registered.pop(fd))
+            # Hijos sin pidfd: se comprueba cada uno sin bloquear
+            for pid, (pidfd, _deadline, _label) in children.items():
+                if pidfd is None:
+                    self._reap(pid, os.WNOHANG)
+
+    def _kill_expired(self, children):
+        """Mata a los hijos que han superado su límite; devuelve la espera hasta el siguiente."""
+        now = time.monotonic()
+        next_deadline = None
+        for pid, (_pidfd, deadline, label) in children.items():
+            if deadline is None:
+                continue
+            if deadline <= now:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                    log.warning("[Supervisor] %s (pid %s) superó su tiempo máximo y se ha terminado", label, pid)
+                except ProcessLookupError:
+                    pass
+                with self._lock:
+                    if pid in self.children:
+                        self.counters["killed"] += 1
+                        pidfd = self.children[pid][0]
+                        self.children[pid] = (pidfd, None, label)
+            elif next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        return None if next_deadline is None else max(next_deadline - now, 0)
+
+    def _reap(self, pid, flags=0):
+        try:
+            waited, status = os.waitpid(pid, flags)
+        except ChildProcessError:
+            waited, status = pid, 0  # Ya lo recogió otro
+        if waited == 0:
+            return
+        with self._lock:
+            pidfd, _deadline, label = self.children.pop(pid, (None, None, ""))
+            self.counters["exited"] += 1
+            if os.waitstatus_to_exitcode(status) != 0:
+                self.counters["failed"] += 1
+        if pidfd is not None:
+            os.close(pidfd)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["live"] = len(self.children)
+        return stats
+
+    def stop(self):
+        """Deja de vigilar; los hijos que sigan vivos los heredará init."""
+        self.running = False
+        self._wake()
+        self._thread.join(1.0)
@@ -0,0 +1,170 @@
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+_connection = None
+_connection_lock = threading.Lock()
+
+
+class XConnection:
+    """
+    Conexión persistente con el servidor X compartida por todo lo que habla
+    con X (XTest, posición del cursor). python-xlib no es thread-safe, así
+    que cada petición se hace con el lock tomado.
+    """
+
+    def __init__(self, display_name=None):
+        from Xlib import display
+
+        self.display = display.Display(display_name)
+        self.root = self.display.screen().root
+        self.lock = threading.RLock()
+        # Última consulta del puntero y el (dispositivo, frame de evdev) en que se hizo
+        self._pointer_frame = None
+        self._pointer = None
+
+    def query_pointer(self, frame=None, device=None):
+        """
+        Posición (x, y) del puntero con XQueryPointer. Dentro de un mismo frame
+        de evdev del mismo dispositivo se reutiliza la respuesta anterior: los
+        números de frame de dos ratones no guardan relación entre sí.
+        """
+        with self.lock:
+            key = (device, frame)
+            if frame is not None and key == self._pointer_frame:
+                return self._pointer
+            reply = self.root.query_pointer()
+            self._pointer = (reply.root_x, reply.root_y)
+            self._pointer_frame = key
+            return self._pointer
+
+    def warp_pointer(self, x, y):
+        """Mueve el puntero a (x, y) con XWarpPointer."""
+        with self.lock:
+            self.root.warp_pointer(x, y)
+            self.display.flush()
+            self._pointer_frame = None
+
+    def close(self):
+        with self.lock:
+            self.display.close()
+
+
+def get_connection():
+    """Devuelve la conexión compartida, abriéndola la primera vez."""
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            _connection = XConnection()
+        return _connection
+
+
+def close_connection():
+    global _connection
+    with _connection_lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
+
+
+class ActiveWindowWatcher:
+    """
+    Avisa de los cambios de la ventana activa con las clases de su WM_CLASS.
+    Escucha PropertyNotify de _NET_ACTIVE_WINDOW en la ventana raíz por una
+    conexión propia (la compartida la usan los hilos de acciones y Xlib no
+    es thread-safe) cuyo descriptor atiende el bucle del EventEngine: no hay
+    sondeo ni hilo adicional y on_change se ejecuta en el hilo de eventos.
+    """
+
+    def __init__(self, engine, on_change, display_name=None):
+        self.engine = engine
+        self.on_change = on_change
+        self.display_name = display_name
+        self.connection = None
+        self.fd = None
+        self.active_atom = None
+        self.window_id = None
+
+    def start(self):
+        self.engine.call_soon(self._start)
+
+    def _start(self):
+        from Xlib import X
+
+        try:
+            self.connection = XConnection(self.display_name)
+        except Exception as e:
+            log.warning("[Profiles] Sin conexión con X, no se cambiará de perfil con el foco: %s", e)
+            return
+        display = self.connection.display
+        self.active_atom = display.intern_atom("_NET_ACTIVE_WINDOW")
+        self.connection.root.change_attributes(event_mask=X.PropertyChangeMask)
+        display.flush()
+        # Al cerrarse la conexión Xlib cierra el socket y fileno() deja de servir para quitar el lector
+        self.fd = display.fileno()
+        self.engine.loop.add_reader(self.fd, self._on_readable)
+        # Lo que llegó durante las consultas de _update ya no volverá a marcar el descriptor
+        self._on_readable(update=True)
+
+    def _on_readable(self, update=False):
+        from Xlib.error import ConnectionClosedError
+
+        try:
+            if update:
+                self._update()
+            # Las consultas de _update leen del socket y pueden dejar eventos en la cola
+            # de Xlib sin que el descriptor vuelva a estar listo: se repite hasta vaciarla
+            while self._drain_events():
+                self._update()
+        except (ConnectionClosedError, OSError) as e:
+            # El descriptor seguiría listo y el bucle volvería aquí en cada vuelta
+            log.warning("[Profiles] Se perdió la conexión con X, no se cambiará de perfil con el foco: %s", e)
+            self._close()
+
+    def _drain_events(self):
+        """Vacía la cola de eventos; devuelve True si ha cambiado _NET_ACTIVE_WINDOW."""
+        from Xlib import X
+
+        display = self.connection.display
+        changed = False
+        # Varios PropertyNotify seguidos solo provocan una consulta
+        while display.pending_events():
+            event = display.next_event()
+            if event.type == X.PropertyNotify and event.atom == self.active_atom:
+                changed = True
+        return changed
+
+    def _update(self):
+        from Xlib import X
+        from Xlib.error import XError
+
+        display = self.connection.display
+        try:
+            prop = self.connection.root.get_full_property(self.active_atom, X.AnyPropertyType)
+            window_id = prop.value[0] if prop and len(prop.value) else 0
+            if window_id == self.window_id:
+                return
+            self.window_id = window_id
+            wm_class = None
+            if window_id:
+                wm_class = display.create_resource_object("window", window_id).get_wm_class()
+        except XError:
+            # La ventana se cerró entre el aviso y la consulta
+            wm_class = None
+        self.on_change(tuple(wm_class or ()))
+
+    def stop(self):
+        try:
+            self.engine.call_soon(self._close)
+        except RuntimeError:
+            pass  # El bucle ya estaba cerrado
+
+    def _close(self):
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            self.engine.loop.remove_reader(self.fd)
+            try:
+                connection.close()
+            except Exception:
+                pass  # El servidor X ya había cerrado la conexión
@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from src.backend import MouseEventListener
+from src.dispatch import compile_dispatch
+from src.engine import EventEngine
+from tests.fakes import CountingExecutor, FakeConfig, FakeRegistry, FakeXInput, on_loop
+
+
+@pytest.fixture
+def engine():
+    """EventEngine con su bucle en marcha en un hilo propio."""
+    engine = EventEngine()
+    thread = threading.Thread(target=engine.run, name="EventEngine")
+    thread.start()
+    yield engine
+    engine.stop()
+    thread.join(2)
+
+
+@pytest.fixture
+def make_listener():
+    """Crea listeners con su hilo en marcha y los detiene al terminar la prueba."""
+    listeners = []
+
+    def make(*devices, xinput=None, cursor_freeze="grab"):
+        settings = {"cursor_freeze": cursor_freeze, "stats_interval_s": 0}
+        config = FakeConfig(compile_dispatch({}), settings)
+        listener = MouseEventListener(config, CountingExecutor(), registry=FakeRegistry(*devices),
+                                      xinput=xinput or FakeXInput())
+        listener.start()
+        listeners.append(listener)
+        on_loop(listener, lambda: None)
+        return listener
+
+    yield make
+    for listener in listeners:
+        listener.stop()
+        listener.join(2)
@@ -0,0 +1,318 @@
+"""
+Sustitutos del hardware y de X para ejecutar MouseEventListener sin ratón:
+dispositivo evdev, registro de dispositivos, xinput y backend de salida.
+"""
+import asyncio
+import os
+import socket
+import threading
+import time
+
+from evdev import ecodes
+
+
+def on_loop(listener, func, *args):
+    """Ejecuta func en el hilo del bucle y espera a que termine, junto con lo que haya encolado."""
+    done = threading.Event()
+    result = []
+
+    def call():
+        try:
+            result.append(func(*args))
+        finally:
+            # Una vuelta más para que se ejecute lo que func programó con call_soon
+            listener.engine.call_soon(done.set)
+
+    listener.engine.call_soon(call)
+    assert done.wait(2)
+    return result[0] if result else None
+
+
+def wait_for(condition, timeout=2.0):
+    """Espera a que condition() se cumpla; devuelve False si se agota el tiempo."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class FakeInputDevice:
+    """
+    Nodo evdev simulado. Con events, el bucle de lectura los entrega como si
+    llegaran del kernel y marca finished al terminar; sin ellos los eventos
+    se inyectan llamando directamente a MouseDevice.handle_event. Con hold
+    la lectura sigue esperando tras los eventos, como un ratón conectado; con
+    error termina lanzando esa excepción, como un ratón desconectado.
+    """
+
+    def __init__(self, path="/dev/input/event99", name="Logitech MX Master 3S (simulado)", events=(), hold=False,
+                 error=None):
+        self.path = path
+        self.name = name
+        self.events = events
+        self.hold = hold
+        self.error = error
+        self.finished = threading.Event()
+        self.closed = False
+        self.grabbed = False
+
+    def capabilities(self):
+        return {ecodes.EV_KEY: [], ecodes.EV_REL: [ecodes.REL_X, ecodes.REL_Y, ecodes.REL_HWHEEL]}
+
+    async def async_read_loop(self):
+        for event in self.events:
+            yield event
+        self.finished.set()
+        if self.error is not None:
+            raise self.error
+        if self.hold:
+            await asyncio.Event().wait()
+
+    def grab(self):
+        self.grabbed = True
+
+    def ungrab(self):
+        self.grabbed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClone:
+    """Copia uinput simulada: guarda los frames reenviados."""
+
+    def __init__(self):
+        self.frames = []
+
+    def emit(self, events):
+        self.frames.append([(e.type, e.code, e.value) for e in events])
+
+    def close(self):
+        pass
+
+
+class FakeRegistry:
+    """Registro de dispositivos en memoria; add/remove simulan el hotplug."""
+
+    def __init__(self, *devices):
+        self.devices = {device.path: device for device in devices}
+
+    def list_paths(self):
+        return list(self.devices)
+
+    def open(self, path):
+        try:
+            return self.devices[path]
+        except KeyError:
+            raise FileNotFoundError(path)
+
+    def clone(self, device):
+        return FakeClone()
+
+    def add(self, device):
+        self.devices[device.path] = device
+
+    def remove(self, path):
+        self.devices.pop(path, None)
+
+
+class FakeXInput:
+    """
+    xinput simulado; guarda en threads los hilos desde los que se llama y en
+    button_map el último mapa de botones aplicado.
+    missing: número de find_id que no encuentran el dispositivo, como
+    mientras el servidor X aún no lo ha dado de alta.
+    """
+
+    def __init__(self, missing=0):
+        self.calls = 0
+        self.missing = missing
+        self.threads = set()
+        self.button_map = list(range(1, 21))
+
+    def find_id(self, name, path=None):
+        self.calls += 1
+        self.threads.add(threading.current_thread())
+        if self.missing:
+            self.missing -= 1
+            return None
+        return 12
+
+    def master_pointer_id(self):
+        return 2
+
+    def get_button_map(self, xinput_id):
+        self.calls += 1
+        self.threads.add(threading.current_thread())
+        return list(range(1, 21))
+
+    def set_button_map(self, xinput_id, new_map):
+        self.calls += 1
+        self.threads.add(threading.current_thread())
+        self.button_map = list(new_map)
+
+    def float_device(self, xinput_id):
+        self.calls += 1
+
+    def reattach(self, xinput_id, master_pointer_id):
+        self.calls += 1
+
+
+class CountingOutput:
+    name = "counting"
+    hi_res_scroll = False
+
+    def __init__(self):
+        self.calls = 0
+        self.steps = 0
+
+    def key(self, combo, repeat=1):
+        self.calls += 1
+        self.steps += repeat
+
+    def click(self, button, repeat=1):
+        self.calls += 1
+        self.steps += repeat
+
+    def close(self):
+        pass
+
+
+class CountingExecutor:
+    """ActionExecutor que solo cuenta las acciones, sin inyectar teclas ni lanzar procesos."""
+
+    def __init__(self, output=None):
+        self.output = output or CountingOutput()
+        self.executed = 0
+
+    def execute(self, action):
+        self.executed += 1
+
+
+class FakePointer:
+    """Sustituye las consultas a X del listener (XQueryPointer/XWarpPointer)."""
+
+    def __init__(self, listener):
+        self.queries = 0
+        self.warps = 0
+        listener.get_cursor_position = self.get_cursor_position
+        listener.set_cursor_position = self.set_cursor_position
+
+    def get_cursor_position(self, frame=None, device=None):
+        self.queries += 1
+        return (640, 400)
+
+    def set_cursor_position(self, x, y):
+        self.warps += 1
+
+
+class FakeConfig:
+    """Lo mínimo de ConfigManager que necesita el listener."""
+
+    def __init__(self, dispatch, settings=None, profiles=None):
+        self.dispatch = dispatch
+        self.settings = settings or {}
+        self.profiles = profiles or {}
+
+    def get_setting(self, name):
+        return self.settings.get(name)
+
+    def dispatch_for_window(self, wm_classes):
+        for wm_class in wm_classes:
+            if wm_class.lower() in self.profiles:
+                return self.profiles[wm_class.lower()]
+        return self.dispatch
+
+    def add_listener(self, callback):
+        pass
+
+
+class FakeHidppMouse:
+    """
+    Emulador de un ratón HID++ 2.0: responde por un socketpair SEQPACKET (que
+    conserva los límites de cada informe, como hidraw) a la característica
+    raíz, la batería unificada (o la antigua 0x1000), el DPI y SmartShift.
+    """
+    FEATURES = {0x1004: 1, 0x2201: 2, 0x2111: 3}
+    # Modelos anteriores: batería 0x1000 en lugar de 0x1004
+    LEGACY_FEATURES = {0x1000: 1, 0x2201: 2, 0x2111: 3}
+
+    def __init__(self, device_index=0xFF, features=None):
+        self.device_index = device_index
+        self.features = features or self.FEATURES
+        self.feature_ids = {index: feature for feature, index in self.features.items()}
+        self.client, self.server = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.battery = 80
+        self.charging = False
+        self.dpi = 1000
+        self.smartshift = [2, 10, 50]
+        self.requests = 0
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def opener(self, path):
+        # HidppDevice cierra el descriptor que recibe; se le da una copia
+        fd = os.dup(self.client.fileno())
+        os.set_blocking(fd, False)
+        return fd
+
+    def _serve(self):
+        while True:
+            try:
+                report = self.server.recv(64)
+            except OSError:
+                return
+            if not report:
+                return
+            self.requests += 1
+            reply = self.answer(report[2], report[3] >> 4, report[4:])
+            if reply is None:
+                # Error HID++ 2.0: índice 0xFF y la cabecera de la petición
+                self._send(bytes([0xFF, report[2], report[3], 7]))
+            else:
+                self._send(report[2:4] + bytes(reply))
+
+    def answer(self, index, function, params):
+        if index == 0 and function == 0:
+            return [self.features.get((params[0] << 8) | params[1], 0), 0, 0]
+        feature = self.feature_ids.get(index)
+        if feature == 0x1004 and function == 1:
+            return [self.battery, 4, 1 if self.charging else 0, 0]
+        if feature == 0x1000 and function == 0:
+            return [self.battery, 0, 1 if self.charging else 0]
+        if feature == 0x2201 and function == 2:
+            return [params[0], self.dpi >> 8, self.dpi & 0xFF, 0x03, 0xE8]
+        if feature == 0x2201 and function == 3:
+            self.dpi = (params[1] << 8) | params[2]
+            return [params[0], params[1], params[2]]
+        if feature == 0x2111 and function == 1:
+            return self.smartshift
+        if feature == 0x2111 and function == 2:
+            for i, value in enumerate(params[:3]):
+                if value:
+                    self.smartshift[i] = value
+            return self.smartshift
+        return None
+
+    def notify_battery(self, percentage, charging=False):
+        """Notificación espontánea (sw_id 0) de la característica de batería."""
+        self.battery = percentage
+        self.charging = charging
+        if 0x1004 in self.features:
+            self._send(bytes([self.features[0x1004], 0x00, percentage, 4, 1 if charging else 0, 0]))
+        else:
+            self._send(bytes([self.features[0x1000], 0x00, percentage, 0, 1 if charging else 0]))
+
+    def _send(self, payload):
+        self.server.send((bytes([0x11, self.device_index]) + payload).ljust(20, b"\x00"))
+
+    def close(self):
+        """Desconecta el ratón: HidppDevice lee el fin de archivo, como al desaparecer el hidraw."""
+        try:
+            # Despierta el recv del hilo servidor; sin esto el otro extremo no ve el cierre
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # Ya estaba cerrado
+        self.server.close()
+        self.client.close()
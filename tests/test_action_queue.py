@@ -0,0 +1,148 @@
+import threading
+
+import pytest
+
+from src.action_queue import BLOCK, COALESCE, DROP_OLDEST, ActionQueue
+from tests.fakes import wait_for
+
+
+class Recorder:
+    """Función de trabajo que guarda sus argumentos; la primera llamada puede quedarse esperando."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def block(self):
+        self.started.set()
+        assert self.release.wait(2)
+
+    def __call__(self, *args):
+        self.calls.append(args)
+
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def make(maxsize, policy):
+        queue = ActionQueue(maxsize=maxsize, policy=policy, workers=1)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.stop()
+
+
+def busy(queue, kind="output"):
+    """Ocupa el único hilo con un trabajo que espera a recorder.release."""
+    recorder = Recorder()
+    queue.submit(kind, recorder.block)
+    assert recorder.started.wait(2)
+    return recorder
+
+
+def test_drop_oldest_discards_first_pending(make_queue):
+    queue = make_queue(2, DROP_OLDEST)
+    recorder = busy(queue)
+    for i in range(3):
+        assert queue.submit("output", recorder, i)
+    assert queue.depth() == 2
+
+    recorder.release.set()
+    assert queue.join(2)
+    assert recorder.calls == [(1,), (2,)]
+    stats = queue.stats()
+    assert stats["dropped"] == 1
+    assert stats["dropped.output"] == 1
+    assert stats["max_depth"] == 2
+    assert stats["depth"] == 0
+
+
+def test_coalesce_sums_repeat_counts(make_queue):
+    queue = make_queue(1, COALESCE)
+    recorder = busy(queue)
+    assert queue.submit("output", recorder, 7, 3, merge=True)
+    assert queue.submit("output", recorder, 7, 2, merge=True)
+    assert queue.submit("output", recorder, 7, 1, merge=True)
+
+    recorder.release.set()
+    assert queue.join(2)
+    # Ningún paso de la rueda se pierde
+    assert recorder.calls == [(7, 6)]
+    stats = queue.stats()
+    assert stats["coalesced"] == 2
+    assert "dropped" not in stats
+
+
+def test_coalesce_does_not_merge_different_or_plain_jobs(make_queue):
+    queue = make_queue(1, COALESCE)
+    recorder = busy(queue)
+    assert queue.submit("output", recorder, 7, 3, merge=True)
+    # Otro botón: no se puede sumar, se descarta el más antiguo
+    assert queue.submit("output", recorder, 6, 3, merge=True)
+    # Sin merge un trabajo idéntico tampoco se fusiona
+    assert queue.submit("output", recorder, 6, 3)
+
+    recorder.release.set()
+    assert queue.join(2)
+    assert recorder.calls == [(6, 3)]
+    stats = queue.stats()
+    assert stats["dropped"] == 2
+    assert "coalesced" not in stats
+
+
+def test_full_of_kept_jobs_rejects_new_one(make_queue):
+    queue = make_queue(2, DROP_OLDEST)
+    recorder = busy(queue, "cursor")
+    assert queue.submit("cursor", recorder, "float")
+    assert queue.submit("cursor", recorder, "reattach")
+    assert not queue.submit("output", recorder, "click")
+    assert queue.depth() == 2
+
+    recorder.release.set()
+    assert queue.join(2)
+    assert recorder.calls == [("float",), ("reattach",)]
+    stats = queue.stats()
+    assert stats["dropped"] == 1
+    assert stats["dropped.output"] == 1
+    assert stats["max_depth"] == 2
+
+
+def test_block_waits_for_room(make_queue):
+    queue = make_queue(1, BLOCK)
+    recorder = busy(queue)
+    assert queue.submit("output", recorder, 1)
+    results = []
+    submitter = threading.Thread(target=lambda: results.append(queue.submit("output", recorder, 2)))
+    submitter.start()
+    submitter.join(0.1)
+    assert submitter.is_alive()
+    assert queue.depth() == 1
+
+    recorder.release.set()
+    submitter.join(2)
+    assert results == [True]
+    assert queue.join(2)
+    assert recorder.calls == [(1,), (2,)]
+    stats = queue.stats()
+    assert "dropped" not in stats
+    assert stats["executed"] == 3
+
+
+def test_stop_releases_blocked_submit(make_queue):
+    queue = make_queue(1, BLOCK)
+    recorder = busy(queue)
+    queue.submit("output", recorder, 1)
+    results = []
+    submitter = threading.Thread(target=lambda: results.append(queue.submit("output", recorder, 2)))
+    submitter.start()
+    assert wait_for(lambda: queue.stats()["submitted"] == 3)
+
+    recorder.release.set()
+    queue.stop()
+    submitter.join(2)
+    assert not submitter.is_alive()
+    assert len(results) == 1
@@ -0,0 +1,214 @@
+import sys
+import threading
+import types
+
+import pytest
+
+from src import battery
+from src.battery import BatteryManager, SysfsBattery, create_upower_monitor
+
+MOUSE_PATH = "/org/freedesktop/UPower/devices/mouse_hidpp_battery_0"
+
+
+def make_supply(root, name, **attributes):
+    supply = root / name
+    supply.mkdir()
+    for attribute, value in attributes.items():
+        (supply / attribute).write_text(f"{value}\n")
+    return supply
+
+
+@pytest.fixture
+def power_supply(tmp_path):
+    make_supply(tmp_path, "BAT0", scope="System", capacity=40)
+    make_supply(tmp_path, "hidpp_battery_1", scope="Device", model_name="K380 Keyboard", capacity=10)
+    make_supply(tmp_path, "hidpp_battery_0", scope="Device", model_name="MX Master 3S", capacity=75)
+    return tmp_path
+
+
+def test_sysfs_prefers_the_mx_master(power_supply):
+    sysfs = SysfsBattery(str(power_supply))
+    assert sysfs.find() == str(power_supply / "hidpp_battery_0")
+    assert sysfs.read() == 75
+
+
+def test_sysfs_capacity_level_fallback(tmp_path):
+    make_supply(tmp_path, "hidpp_battery_0", scope="Device", model_name="MX Master 3S", capacity_level="Low")
+    assert SysfsBattery(str(tmp_path)).read() == 20
+
+
+def test_sysfs_ignores_system_batteries(tmp_path):
+    make_supply(tmp_path, "BAT0", scope="System", capacity=40)
+    assert SysfsBattery(str(tmp_path)).read() is None
+    assert SysfsBattery(str(tmp_path / "missing")).read() is None
+
+
+def test_publishes_only_on_change():
+    published = []
+    manager = BatteryManager(published.append, use_dbus=False)
+    for percentage in (80, 80, 80.4, 79, 79.0):
+        manager.publish(percentage)
+    assert published == [80, 79]
+    assert manager.get_battery_percentage() == 79
+
+
+def test_hidpp_takes_priority():
+    published = []
+    manager = BatteryManager(published.append, use_dbus=False)
+    manager.publish(90)
+    manager.publish_hidpp(55)
+    # UPower y sysfs pueden estar leyendo otro dispositivo
+    manager.publish(90)
+    manager.publish_hidpp(54)
+    assert published == [90, 55, 54]
+
+
+def test_upower_counts_again_after_hidpp_is_lost():
+    published = []
+    manager = BatteryManager(published.append, use_dbus=False)
+    manager.publish_hidpp(55)
+    manager.hidpp_lost()
+    manager.publish(50)
+    assert published == [55, 50]
+
+
+def start_and_wait(manager, published):
+    changed = threading.Event()
+    manager.on_change = lambda percentage: (published.append(percentage), changed.set())
+    manager.start()
+    assert changed.wait(2)
+    manager.stop()
+
+
+def test_polls_sysfs_without_dbus(power_supply):
+    published = []
+    start_and_wait(BatteryManager(None, use_dbus=False, sysfs=SysfsBattery(str(power_supply))), published)
+    assert published == [75]
+
+
+def test_falls_back_to_sysfs_when_upower_fails(power_supply, monkeypatch):
+    def no_bus(publish):
+        raise RuntimeError("no hay conexión con el bus del sistema")
+
+    monkeypatch.setattr(battery, "create_upower_monitor", no_bus)
+    published = []
+    manager = BatteryManager(None, sysfs=SysfsBattery(str(power_supply)))
+    start_and_wait(manager, published)
+    assert manager.upower is None
+    assert published == [75]
+
+
+class FakeUPower:
+    """Servicio UPower en memoria: dispositivos, porcentajes y señales conectadas."""
+
+    def __init__(self):
+        self.percentages = {"/org/freedesktop/UPower/devices/line_power_AC": 0, MOUSE_PATH: 64}
+        self.slots = {}
+
+    def emit(self, path, signal, *arguments):
+        message = types.SimpleNamespace(arguments=lambda: list(arguments))
+        self.slots[(path, signal)](message)
+
+
+@pytest.fixture
+def fake_qtdbus(monkeypatch):
+    """Sustituye PyQt5.QtCore y PyQt5.QtDBus por lo mínimo que usa create_upower_monitor."""
+    upower = FakeUPower()
+
+    class QDBusMessage:
+        ErrorMessage = 3
+        ReplyMessage = 2
+
+    class Reply:
+        def __init__(self, arguments=None, error=None):
+            self._arguments = arguments
+            self._error = error
+
+        def type(self):
+            return QDBusMessage.ErrorMessage if self._error else QDBusMessage.ReplyMessage
+
+        def errorMessage(self):
+            return self._error
+
+        def arguments(self):
+            return self._arguments
+
+    class QDBusConnection:
+        @staticmethod
+        def systemBus():
+            return QDBusConnection()
+
+        def isConnected(self):
+            return True
+
+        def connect(self, service, path, interface, name, slot):
+            upower.slots[(path, name)] = slot
+            return True
+
+        def disconnect(self, service, path, interface, name, slot):
+            upower.slots.pop((path, name), None)
+            return True
+
+    class QDBusInterface:
+        def __init__(self, service, path, interface, bus):
+            self.path = path
+
+        def call(self, method, *args):
+            if method == "EnumerateDevices":
+                return Reply([list(upower.percentages)])
+            if method == "Get" and args == (battery.UPOWER_DEVICE_INTERFACE, "Percentage"):
+                return Reply([float(upower.percentages[self.path])])
+            return Reply(error=f"método desconocido {method}")
+
+    qtcore = types.ModuleType("PyQt5.QtCore")
+    qtcore.QObject = object
+    qtcore.pyqtSlot = lambda *signature: (lambda func: func)
+    qtdbus = types.ModuleType("PyQt5.QtDBus")
+    qtdbus.QDBusConnection = QDBusConnection
+    qtdbus.QDBusInterface = QDBusInterface
+    qtdbus.QDBusMessage = QDBusMessage
+    pyqt5 = types.ModuleType("PyQt5")
+    pyqt5.QtCore = qtcore
+    pyqt5.QtDBus = qtdbus
+    monkeypatch.setitem(sys.modules, "PyQt5", pyqt5)
+    monkeypatch.setitem(sys.modules, "PyQt5.QtCore", qtcore)
+    monkeypatch.setitem(sys.modules, "PyQt5.QtDBus", qtdbus)
+    return upower
+
+
+def test_upower_publishes_initial_and_changed_percentage(fake_qtdbus):
+    published = []
+    monitor = create_upower_monitor(published.append)
+    assert monitor.device_path == MOUSE_PATH
+    assert published == [64.0]
+
+    fake_qtdbus.emit(MOUSE_PATH, "PropertiesChanged", battery.UPOWER_DEVICE_INTERFACE, {"Percentage": 63.0})
+    # Otros cambios del dispositivo no son de la batería
+    fake_qtdbus.emit(MOUSE_PATH, "PropertiesChanged", battery.UPOWER_DEVICE_INTERFACE, {"State": 2})
+    assert published == [64.0, 63.0]
+
+
+def test_upower_follows_the_mouse_across_sleep(fake_qtdbus):
+    published = []
+    monitor = create_upower_monitor(published.append)
+    upower_path = battery.UPOWER_PATH
+
+    del fake_qtdbus.percentages[MOUSE_PATH]
+    fake_qtdbus.emit(upower_path, "DeviceRemoved", MOUSE_PATH)
+    assert monitor.device_path is None
+    assert (MOUSE_PATH, "PropertiesChanged") not in fake_qtdbus.slots
+
+    fake_qtdbus.percentages[MOUSE_PATH] = 61
+    fake_qtdbus.emit(upower_path, "DeviceAdded", MOUSE_PATH)
+    assert monitor.device_path == MOUSE_PATH
+    assert published == [64.0, 61.0]
+
+
+def test_battery_manager_uses_upower_when_available(fake_qtdbus):
+    published = []
+    manager = BatteryManager(published.append)
+    manager.start()
+    assert manager.upower is not None
+    assert manager._thread is None
+    assert published == [64]
+    manager.stop()
@@ -0,0 +1,263 @@
+import json
+import logging
+import os
+import threading
+
+import pytest
+
+from src import config_manager, config_watcher
+from src.config_manager import ConfigManager, validate_config, write_atomic
+from src.config_watcher import ConfigWatcher
+from src.dispatch import DEFAULT_WHEEL, compile_dispatch, validate_actions
+from tests.fakes import wait_for
+
+ACTIONS = {
+    "Button 1": {"action": "Copy", "gestures_enabled": True, "gesture_left": "Back"},
+    "Button 2": "Undo",
+    "Button 5": {"inverted": False, "sensitivity": 150, "function": "Volume Control"},
+    "Settings": {"stats_interval_s": 60},
+}
+
+
+@pytest.fixture
+def actions_file(tmp_path, monkeypatch):
+    path = tmp_path / "actions.json"
+    path.write_text(json.dumps(ACTIONS))
+    monkeypatch.setattr(config_manager, "ACTIONS_FILE", str(path))
+    return path
+
+
+@pytest.fixture
+def manager(actions_file):
+    manager = ConfigManager()
+    manager.flush()
+    yield manager
+    manager.flush()
+
+
+def edit(path, change):
+    actions = json.loads(path.read_text())
+    change(actions)
+    path.write_text(json.dumps(actions))
+
+
+def test_valid_config_has_no_errors():
+    assert validate_config(ACTIONS) == []
+
+
+@pytest.mark.parametrize("button5", [
+    {"sensitivity": "150"},
+    {"sensitivity": True},
+    {"sensitivity": -10},
+    {"inverted": "false"},
+    {"function": "Teleport"},
+    [],
+])
+def test_invalid_wheel_is_reported(button5):
+    errors = validate_actions({"Button 5": button5})
+    assert len(errors) == 1
+    assert errors[0].startswith("Button 5")
+
+
+def test_invalid_buttons_and_profiles_are_reported():
+    errors = validate_actions({
+        "Button 1": {"action": 3, "gestures_enabled": "yes", "gesture_up": None},
+        "Button 2": ["Copy"],
+        "Profiles": {
+            "Firefox": {"wm_class": 42, "Button 5": {"sensitivity": "alta"}},
+            "Roto": "Copy",
+        },
+    })
+    assert len(errors) == 7
+
+
+@pytest.mark.parametrize("settings", [
+    {"stats_interval_s": "300"},
+    {"output_backend": 1},
+    {"action_concurrency": {"spawn": "2"}},
+    {"max_children": -1},
+    [],
+])
+def test_invalid_settings_are_reported(settings):
+    assert validate_config({"Settings": settings})
+
+
+def test_compile_dispatch_ignores_wrong_wheel_types():
+    wheel = compile_dispatch({"Button 5": {"sensitivity": "150", "inverted": "no", "function": None}}).wheel
+    assert wheel == DEFAULT_WHEEL
+
+
+def test_reload_applies_valid_edit(manager, actions_file):
+    published = []
+    manager.add_listener(published.append)
+    edit(actions_file, lambda actions: actions["Button 5"].update(sensitivity=80))
+
+    assert manager.reload()
+    assert manager.dispatch.wheel.sensitivity == 80
+    assert published == [manager.dispatch]
+
+
+def test_reload_rejects_wrong_types_and_keeps_previous(manager, actions_file, caplog):
+    dispatch = manager.dispatch
+    actions = manager.actions
+    published = []
+    manager.add_listener(published.append)
+    edit(actions_file, lambda actions: actions["Button 5"].update(sensitivity="150"))
+
+    with caplog.at_level(logging.ERROR, logger="src.config_manager"):
+        assert not manager.reload()
+    assert manager.dispatch is dispatch
+    assert manager.actions is actions
+    assert not published
+    assert "Button 5.sensitivity" in caplog.text
+
+
+def test_invalid_setting_falls_back_to_default(manager, actions_file):
+    edit(actions_file, lambda actions: actions["Settings"].update(stats_interval_s="60"))
+    reloaded = ConfigManager()
+    reloaded.flush()
+    assert reloaded.get_setting("stats_interval_s") == config_manager.DEFAULT_SETTINGS["stats_interval_s"]
+
+
+def test_write_atomic_replaces_content(tmp_path):
+    path = tmp_path / "actions.json"
+    path.write_text("viejo")
+    path.chmod(0o640)
+    assert write_atomic(str(path), "nuevo")
+    assert path.read_text() == "nuevo"
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ["actions.json"]
+
+
+def test_write_atomic_keeps_symlink(tmp_path):
+    dotfiles = tmp_path / "dotfiles"
+    dotfiles.mkdir()
+    target = dotfiles / "actions.json"
+    target.write_text("viejo")
+    link = tmp_path / "actions.json"
+    link.symlink_to(target)
+
+    assert write_atomic(str(link), "nuevo")
+    assert link.is_symlink()
+    assert target.read_text() == "nuevo"
+    assert sorted(os.listdir(dotfiles)) == ["actions.json"]
+
+
+def test_concurrent_writers_do_not_collide(tmp_path):
+    path = tmp_path / "actions.json"
+    contents = [json.dumps({"writer": i, "padding": "x" * 100000}) for i in range(8)]
+    results = []
+    threads = [threading.Thread(target=lambda data=data: results.append(write_atomic(str(path), data)))
+               for data in contents]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [True] * len(contents)
+    assert path.read_text() in contents
+    assert os.listdir(tmp_path) == ["actions.json"]
+
+
+def test_write_atomic_failure_leaves_original(tmp_path, monkeypatch):
+    path = tmp_path / "actions.json"
+    path.write_text("viejo")
+
+    def fail(src, dst):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "replace", fail)
+    assert not write_atomic(str(path), "nuevo")
+    assert path.read_text() == "viejo"
+    assert os.listdir(tmp_path) == ["actions.json"]
+
+
+def test_failed_flush_keeps_data_pending(manager, actions_file, monkeypatch):
+    saved = manager._saved_data
+    write = config_manager.write_atomic
+    monkeypatch.setattr(config_manager, "write_atomic", lambda path, data: False)
+    manager.set_sensitivity(120)
+    manager.flush()
+    # Lo no escrito no cuenta como propio: un cambio externo se seguiría recargando
+    assert manager._saved_data == saved
+    assert json.loads(actions_file.read_text())["Button 5"]["sensitivity"] == 150
+
+    monkeypatch.setattr(config_manager, "write_atomic", write)
+    manager.flush()
+    assert json.loads(actions_file.read_text())["Button 5"]["sensitivity"] == 120
+    assert manager._saved_data == actions_file.read_text()
+
+
+def test_burst_of_edits_writes_once(manager, actions_file, monkeypatch):
+    # Con un retardo largo toda la ráfaga cae dentro de SAVE_DELAY aunque la máquina vaya lenta
+    monkeypatch.setattr(config_manager, "SAVE_DELAY", 10)
+    writes = []
+    write = config_manager.write_atomic
+
+    def counting_write(path, data):
+        writes.append(data)
+        return write(path, data)
+
+    monkeypatch.setattr(config_manager, "write_atomic", counting_write)
+    command = "notify-send hola"
+    for i in range(1, len(command) + 1):
+        manager.set_action("Button 2", f"Command: {command[:i]}")
+    for value in range(50, 201):
+        manager.set_sensitivity(value)
+    assert not writes
+
+    manager.flush()
+    assert len(writes) == 1
+    saved = json.loads(actions_file.read_text())
+    assert saved == json.loads(writes[0])
+    assert saved["Button 2"] == f"Command: {command}"
+    assert saved["Button 5"]["sensitivity"] == 200
+
+
+def test_own_write_is_not_reloaded_during_fsync(manager, actions_file, monkeypatch):
+    write = config_manager.write_atomic
+    reloads = []
+
+    def slow_write(path, data):
+        written = write(path, data)
+        # El watcher lee el archivo mientras flush() sigue sincronizando a disco
+        watcher = threading.Thread(target=lambda: reloads.append(manager.reload()))
+        watcher.start()
+        watcher.join(0.5)
+        return written
+
+    monkeypatch.setattr(config_manager, "write_atomic", slow_write)
+    manager.set_sensitivity(120)
+    manager.flush()
+    assert reloads == [False]
+
+    # Un guardado posterior de la GUI no se pierde por esa lectura
+    monkeypatch.setattr(config_manager, "write_atomic", write)
+    manager.set_sensitivity(130)
+    assert not manager.reload()
+    manager.flush()
+    assert json.loads(actions_file.read_text())["Button 5"]["sensitivity"] == 130
+
+
+def test_watcher_follows_symlinked_file(tmp_path, monkeypatch):
+    dotfiles = tmp_path / "dotfiles"
+    dotfiles.mkdir()
+    target = dotfiles / "actions.json"
+    target.write_text(json.dumps(ACTIONS))
+    link = tmp_path / "config" / "actions.json"
+    link.parent.mkdir()
+    link.symlink_to(target)
+    monkeypatch.setattr(config_manager, "ACTIONS_FILE", str(link))
+    monkeypatch.setattr(config_watcher, "SETTLE_DELAY", 0.01)
+    manager = ConfigManager()
+    manager.flush()
+
+    watcher = ConfigWatcher(manager, str(link))
+    if watcher.inotify is None:
+        pytest.skip("inotify no disponible")
+    watcher.start()
+    try:
+        edit(target, lambda actions: actions["Button 5"].update(sensitivity=80))
+        assert wait_for(lambda: manager.dispatch.wheel.sensitivity == 80)
+    finally:
+        watcher.stop()
+        watcher.join(2)
@@ -0,0 +1,42 @@
+import errno
+import threading
+
+from evdev import InputEvent, ecodes
+
+from tests.fakes import FakeInputDevice
+
+
+def events(count):
+    return [InputEvent(0, 0, ecodes.EV_REL, ecodes.REL_HWHEEL, i) for i in range(count)]
+
+
+def test_handler_exception_does_not_stop_reading(engine, caplog):
+    device = FakeInputDevice(events=events(5))
+    handled = []
+    errors = []
+
+    def handler(event):
+        handled.append(event.value)
+        if event.value == 1:
+            raise TypeError("valor no válido")
+
+    engine.add_device(device, handler, lambda device, error: errors.append(error))
+    assert device.finished.wait(2)
+    assert handled == [0, 1, 2, 3, 4]
+    assert not errors
+    assert "valor no válido" in caplog.text
+
+
+def test_read_error_goes_to_on_error(engine):
+    error = OSError(errno.ENODEV, "No such device")
+    device = FakeInputDevice(events=events(2), error=error)
+    reported = threading.Event()
+    received = []
+
+    def on_error(failed, exc):
+        received.append((failed, exc))
+        reported.set()
+
+    engine.add_device(device, lambda event: None, on_error)
+    assert reported.wait(2)
+    assert received == [(device, error)]
@@ -0,0 +1,60 @@
+from evdev import InputEvent, ecodes
+
+from src.dispatch import BUTTON1_SCANCODE
+from tests.fakes import FakeInputDevice, FakeXInput, on_loop
+
+PATH = "/dev/input/event99"
+
+
+def frame(*events):
+    return [InputEvent(0, 0, kind, code, value) for kind, code, value in events] + [
+        InputEvent(0, 0, ecodes.EV_SYN, ecodes.SYN_REPORT, 0)]
+
+
+def replay(listener, device, events):
+    """
+    Entrega events al MouseDevice y devuelve lo que X recibe de Button 1:
+    del nodo real solo si no está capturado y el mapa de xinput no lo anula,
+    y además lo que se reenvía por la copia uinput.
+    """
+    mouse = listener.devices[PATH]
+    button1 = listener.BUTTON_XINPUT_MAP["Button 1"]
+    seen = []
+    for event in events:
+        # El kernel entrega el evento a X antes de que el listener lo procese
+        if not device.grabbed and (event.type, event.code) == (ecodes.EV_KEY, BUTTON1_SCANCODE):
+            if listener.xinput.button_map[button1 - 1]:
+                seen.append(event.value)
+        on_loop(listener, mouse.handle_event, event)
+    for emitted in mouse.clone.frames:
+        seen += [value for kind, code, value in emitted if (kind, code) == (ecodes.EV_KEY, BUTTON1_SCANCODE)]
+    return seen
+
+
+def gesture():
+    return (frame((ecodes.EV_KEY, BUTTON1_SCANCODE, 1))
+            + frame((ecodes.EV_REL, ecodes.REL_X, 200), (ecodes.EV_KEY, ecodes.BTN_LEFT, 1))
+            + frame((ecodes.EV_REL, ecodes.REL_Y, 40), (ecodes.EV_KEY, ecodes.BTN_LEFT, 0))
+            + frame((ecodes.EV_KEY, BUTTON1_SCANCODE, 0)))
+
+
+def test_grab_keeps_button1_balanced_for_x(make_listener):
+    device = FakeInputDevice(PATH, hold=True)
+    listener = make_listener(device, xinput=FakeXInput())
+    assert listener.action_queue.join(2)
+
+    seen = replay(listener, device, gesture())
+    assert seen.count(1) == seen.count(0)
+    assert not device.grabbed
+
+    # Lo que no forma parte del gesto sí se reenvía mientras dura la captura
+    clone = listener.devices[PATH].clone
+    assert [(ecodes.EV_KEY, ecodes.BTN_LEFT, 1), (ecodes.EV_SYN, ecodes.SYN_REPORT, 0)] in clone.frames
+    assert [(ecodes.EV_KEY, ecodes.BTN_LEFT, 0), (ecodes.EV_SYN, ecodes.SYN_REPORT, 0)] in clone.frames
+
+
+def test_xinput_mode_leaves_button1_to_x(make_listener):
+    device = FakeInputDevice(PATH, hold=True)
+    listener = make_listener(device, xinput=FakeXInput(), cursor_freeze="xinput")
+    assert listener.action_queue.join(2)
+    assert "Button 1" not in listener.devices[PATH].xinput_disabled
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+
+import pytest
+
+from src import hidpp
+from src.hidpp import (FEATURE_ADJUSTABLE_DPI, FEATURE_SMART_SHIFT, FEATURE_UNIFIED_BATTERY, BatteryStatus, HidppDevice,
+                       HidppError, HidppMonitor)
+from tests.fakes import FakeHidppMouse, wait_for
+
+PATH = "/dev/hidraw9"
+
+
+@pytest.fixture
+def mouse():
+    mouse = FakeHidppMouse()
+    yield mouse
+    mouse.close()
+
+
+@pytest.fixture
+def legacy_mouse():
+    mouse = FakeHidppMouse(features=FakeHidppMouse.LEGACY_FEATURES)
+    yield mouse
+    mouse.close()
+
+
+def run(mouse, coro_func):
+    """Ejecuta coro_func(device) con un HidppDevice conectado al emulador."""
+    async def main():
+        device = HidppDevice(asyncio.get_running_loop(), PATH, mouse.device_index, mouse.opener)
+        device.open()
+        try:
+            return await coro_func(device)
+        finally:
+            device.close()
+
+    return asyncio.run(main())
+
+
+def test_feature_index_is_cached(mouse):
+    async def lookup(device):
+        first = await device.feature_index(FEATURE_ADJUSTABLE_DPI)
+        requests = mouse.requests
+        second = await device.feature_index(FEATURE_ADJUSTABLE_DPI)
+        return first, second, mouse.requests - requests
+
+    assert run(mouse, lookup) == (2, 2, 0)
+
+
+def test_unsupported_feature_is_asked_once(mouse):
+    async def check(device):
+        supported = [await device.supports(FEATURE_SMART_SHIFT) for _ in range(3)]
+        return supported, mouse.requests
+
+    assert run(mouse, check) == ([False, False, False], 1)
+
+
+def test_unified_battery(mouse):
+    mouse.battery = 65
+    assert run(mouse, HidppDevice.battery) == BatteryStatus(65, "discharging")
+    mouse.charging = True
+    assert run(mouse, HidppDevice.battery) == BatteryStatus(65, "charging")
+
+
+def test_legacy_battery(legacy_mouse):
+    legacy_mouse.battery = 40
+
+    async def check(device):
+        return await device.supports(FEATURE_UNIFIED_BATTERY), await device.battery()
+
+    assert run(legacy_mouse, check) == (False, BatteryStatus(40, "discharging"))
+
+
+@pytest.mark.parametrize("features", [FakeHidppMouse.FEATURES, FakeHidppMouse.LEGACY_FEATURES])
+def test_battery_notifications(features):
+    mouse = FakeHidppMouse(features=features)
+    received = []
+
+    async def subscribe(device):
+        notified = asyncio.Event()
+        await device.subscribe_battery(lambda status: (received.append(status), notified.set()))
+        mouse.notify_battery(30, charging=True)
+        await asyncio.wait_for(notified.wait(), 1)
+
+    try:
+        run(mouse, subscribe)
+    finally:
+        mouse.close()
+    assert received == [BatteryStatus(30, "charging")]
+
+
+def test_error_reply_raises(mouse):
+    async def call(device):
+        with pytest.raises(HidppError) as error:
+            await device.call(FEATURE_ADJUSTABLE_DPI, 9)
+        # La petición fallida no deja nada pendiente y la conexión sigue sirviendo
+        assert not device._pending
+        return error.value.code, await device.get_dpi()
+
+    assert run(mouse, call) == (7, 1000)
+
+
+def test_hidpp10_error_reply_raises():
+    async def check():
+        device = HidppDevice(asyncio.get_running_loop(), PATH)
+        future = asyncio.get_running_loop().create_future()
+        device._pending[(2, 1, 3)] = future
+        # Informe corto con sub_id 0x8F: índice, función y sw_id de la petición y el código de error
+        device.handle_report(bytes([hidpp.REPORT_SHORT, hidpp.DIRECT_DEVICE_INDEX, 0x8F, 2, 0x13, 9, 0]))
+        with pytest.raises(HidppError) as error:
+            await future
+        return error.value.code
+
+    assert asyncio.run(check()) == hidpp.ERROR_UNSUPPORTED
+
+
+def test_reports_for_other_devices_are_ignored():
+    async def check():
+        device = HidppDevice(asyncio.get_running_loop(), PATH, device_index=1)
+        future = asyncio.get_running_loop().create_future()
+        device._pending[(2, 1, 3)] = future
+        device.handle_report(bytes([hidpp.REPORT_LONG, 2, 2, 0x13, 1, 2, 3]).ljust(20, b"\x00"))
+        return future.done()
+
+    assert asyncio.run(check()) is False
+
+
+def test_dpi_round_trip(mouse):
+    async def change(device):
+        await device.set_dpi(1600)
+        return await device.get_dpi()
+
+    assert run(mouse, change) == 1600
+    assert mouse.dpi == 1600
+
+
+def test_monitor_reconnects(engine, monkeypatch):
+    monkeypatch.setattr(hidpp, "RECONNECT_INTERVAL", 0.05)
+    mice = [FakeHidppMouse()]
+    mice[0].battery = 80
+    lookups = []
+
+    def finder():
+        # La primera búsqueda no encuentra el ratón, como si estuviera dormido
+        lookups.append(None)
+        return (PATH, mice[-1].device_index) if len(lookups) > 1 else None
+
+    published = []
+    changed = threading.Condition()
+
+    def on_battery(percentage):
+        with changed:
+            published.append(percentage)
+            changed.notify_all()
+
+    lost = []
+    monitor = HidppMonitor(engine, on_battery, dpi=1600, finder=finder, opener=lambda path: mice[-1].opener(path),
+                           on_lost=lambda: lost.append(len(published)))
+    monitor.start()
+    try:
+        with changed:
+            assert changed.wait_for(lambda: published == [80], 2)
+        assert wait_for(lambda: monitor.device is not None)
+        assert mice[0].dpi == 1600
+        assert monitor.run(HidppDevice.get_dpi) == 1600
+        # Buscar el ratón sin encontrarlo no es perder la conexión
+        assert not lost
+
+        # Se desconecta y vuelve otro ratón
+        mice.append(FakeHidppMouse())
+        mice[1].battery = 55
+        mice[0].close()
+        with changed:
+            assert changed.wait_for(lambda: published == [80, 55], 2)
+        assert wait_for(lambda: mice[1].dpi == 1600)
+        assert len(lookups) == 3
+        # La batería de HID++ deja de tener prioridad antes de que vuelva el ratón
+        assert lost == [1]
+    finally:
+        monitor.stop()
+        for mouse in mice:
+            mouse.close()
+
+
+def test_monitor_without_mouse_keeps_retrying(engine, monkeypatch):
+    monkeypatch.setattr(hidpp, "RECONNECT_INTERVAL", 0.01)
+    lookups = []
+    monitor = HidppMonitor(engine, lambda percentage: None, finder=lambda: lookups.append(None))
+    monitor.start()
+    try:
+        assert wait_for(lambda: len(lookups) >= 3)
+        with pytest.raises(ConnectionError):
+            monitor.run(HidppDevice.get_dpi)
+    finally:
+        monitor.stop()
+
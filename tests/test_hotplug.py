@@ -0,0 +1,105 @@
+import errno
+
+from src.output import CLONE_SUFFIX
+from tests.fakes import FakeInputDevice, FakeXInput, on_loop, wait_for
+
+PATH = "/dev/input/event99"
+
+
+def test_device_present_at_start_gets_reader(make_listener):
+    device = FakeInputDevice(PATH, hold=True)
+    listener = make_listener(device)
+    assert list(listener.devices) == [PATH]
+    task = listener.engine._device_tasks[PATH]
+    assert not task.done()
+
+
+def test_remove_device_closes_ungrabs_and_cancels_reader(make_listener):
+    device = FakeInputDevice(PATH, hold=True)
+    listener = make_listener(device)
+    mouse = listener.devices[PATH]
+    assert on_loop(listener, mouse.grab)
+    assert device.grabbed
+    task = listener.engine._device_tasks[PATH]
+
+    listener.registry.remove(PATH)
+    on_loop(listener, listener.remove_device, PATH)
+
+    assert PATH not in listener.devices
+    assert device.closed
+    assert not device.grabbed
+    assert PATH not in listener.engine._device_tasks
+    assert wait_for(task.done) and task.cancelled()
+
+
+def test_readd_device_creates_new_mouse_and_reader(make_listener):
+    device = FakeInputDevice(PATH, hold=True)
+    listener = make_listener(device)
+    old_mouse = listener.devices[PATH]
+    old_task = listener.engine._device_tasks[PATH]
+    listener.registry.remove(PATH)
+    on_loop(listener, listener.remove_device, PATH)
+
+    new_device = FakeInputDevice(PATH, hold=True)
+    listener.registry.add(new_device)
+    on_loop(listener, listener.add_device, PATH)
+
+    mouse = listener.devices[PATH]
+    assert mouse is not old_mouse
+    assert mouse.device is new_device
+    assert not new_device.closed
+    task = listener.engine._device_tasks[PATH]
+    assert task is not old_task
+    assert not task.done()
+    assert old_task.cancelled()
+
+    # Un aviso repetido del mismo nodo no crea un segundo lector
+    on_loop(listener, listener.add_device, PATH)
+    assert listener.devices[PATH] is mouse
+    assert listener.engine._device_tasks[PATH] is task
+
+
+def test_read_error_removes_device(make_listener):
+    device = FakeInputDevice(PATH, error=OSError(errno.ENODEV, "No such device"))
+    listener = make_listener(device)
+    assert wait_for(lambda: PATH not in listener.devices)
+    assert device.closed
+    assert PATH not in listener.engine._device_tasks
+
+
+def test_other_devices_are_ignored_until_removed(make_listener):
+    keyboard = FakeInputDevice(PATH, name="AT Translated Set 2 keyboard", hold=True)
+    listener = make_listener(keyboard)
+    assert not listener.devices
+    assert PATH in listener.ignored_paths
+    assert keyboard.closed
+    assert PATH not in listener.engine._device_tasks
+
+    on_loop(listener, listener.remove_device, PATH)
+    assert PATH not in listener.ignored_paths
+
+
+def test_uinput_clone_is_not_adopted(make_listener):
+    device = FakeInputDevice(PATH, hold=True)
+    listener = make_listener(device)
+    # La copia uinput del modo grab aparece como un nodo evdev más
+    clone = FakeInputDevice("/dev/input/event100", name=device.name + CLONE_SUFFIX, hold=True)
+    listener.registry.add(clone)
+    on_loop(listener, listener.add_device, clone.path)
+
+    assert list(listener.devices) == [PATH]
+    assert clone.path in listener.ignored_paths
+    assert clone.closed
+    assert clone.path not in listener.engine._device_tasks
+
+
+def test_xinput_setup_runs_off_the_event_loop(make_listener):
+    # Los dos primeros find_id fallan, como si el servidor X aún no conociera el ratón
+    xinput = FakeXInput(missing=2)
+    listener = make_listener(FakeInputDevice(PATH, hold=True), xinput=xinput)
+    mouse = listener.devices[PATH]
+    assert wait_for(lambda: mouse.xinput_id == 12)
+    assert listener.action_queue.join(2)
+    assert mouse.original_button_map
+    assert xinput.threads
+    assert listener.engine.thread not in xinput.threads
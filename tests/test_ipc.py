@@ -0,0 +1,28 @@
+from src import ipc
+from src.battery import BatteryManager
+from src.daemon import control_handlers
+from src.stats import STAGES
+from tests.fakes import FakeInputDevice, wait_for
+
+
+def test_stats_over_the_control_socket(make_listener, tmp_path):
+    listener = make_listener(FakeInputDevice(hold=True))
+    battery = BatteryManager(lambda percentage: None, use_dbus=False)
+    battery.publish_hidpp(70)
+    path = str(tmp_path / "mxmouse.sock")
+    server = ipc.IpcServer(listener.engine, control_handlers(
+        listener.config_manager, None, listener, listener.action_executor, battery), path)
+    server.start()
+    try:
+        assert wait_for(lambda: ipc.request("status", path) is not None)
+        status = ipc.request("status", path)
+        assert [device["path"] for device in status["devices"]] == list(listener.devices)
+        assert status["battery"] == 70
+
+        stats = ipc.request("stats", path)
+        assert set(stats) == {"actions", "children", "latency_us"}
+        assert set(stats["latency_us"]) == set(STAGES)
+        assert ipc.request("battery", path) == 70
+    finally:
+        server.stop()
+    assert ipc.request("status", path) is None
@@ -0,0 +1,129 @@
+import collections
+from types import SimpleNamespace
+
+from Xlib import X
+
+from src.dispatch import compile_dispatch
+from src.xconn import ActiveWindowWatcher
+from tests.fakes import FakeInputDevice, FakeXInput, on_loop, wait_for
+
+ACTIVE_ATOM = 300
+
+
+class FakeDisplay:
+    """
+    Conexión con X simulada. Cada consulta de la ventana activa puede
+    cambiarla (switches) y dejar el PropertyNotify en la cola de Xlib, como
+    cuando llega durante la respuesta a otra petición.
+    """
+
+    def __init__(self, active=0, switches=()):
+        self.active = active
+        self.switches = list(switches)
+        self.events = collections.deque()
+        self.queries = 0
+
+    def notify(self, window_id):
+        self.active = window_id
+        self.events.append(SimpleNamespace(type=X.PropertyNotify, atom=ACTIVE_ATOM))
+
+    def pending_events(self):
+        return len(self.events)
+
+    def next_event(self):
+        return self.events.popleft()
+
+    def create_resource_object(self, kind, window_id):
+        return SimpleNamespace(get_wm_class=lambda: (f"app{window_id}", f"App{window_id}"))
+
+
+class FakeRoot:
+    def __init__(self, display):
+        self.display = display
+
+    def get_full_property(self, atom, type):
+        display = self.display
+        display.queries += 1
+        value = display.active
+        if display.switches:
+            display.notify(display.switches.pop(0))
+        return SimpleNamespace(value=[value])
+
+
+def make_watcher(display):
+    changes = []
+    watcher = ActiveWindowWatcher(None, changes.append)
+    watcher.connection = SimpleNamespace(display=display, root=FakeRoot(display))
+    watcher.active_atom = ACTIVE_ATOM
+    return watcher, changes
+
+
+def test_events_queued_during_update_are_processed():
+    display = FakeDisplay(switches=[2])
+    watcher, changes = make_watcher(display)
+    display.notify(1)
+
+    watcher._on_readable()
+
+    # El cambio a la ventana 2 llegó durante la consulta de la 1 y no volverá a marcar el descriptor
+    assert changes == [("app1", "App1"), ("app2", "App2")]
+    assert not display.events
+
+
+def test_closed_connection_stops_watching(caplog):
+    from Xlib.error import ConnectionClosedError
+
+    display = FakeDisplay()
+    watcher, changes = make_watcher(display)
+    removed = []
+    closed = []
+    watcher.engine = SimpleNamespace(loop=SimpleNamespace(remove_reader=removed.append))
+    watcher.fd = 9
+    watcher.connection.close = lambda: closed.append(True)
+
+    def closed_connection():
+        raise ConnectionClosedError("server")
+
+    display.pending_events = closed_connection
+    watcher._on_readable()
+    # Una segunda llamada ya no encuentra conexión: el fallo se registra una sola vez
+    watcher._close()
+
+    assert removed == [9]
+    assert closed == [True]
+    assert watcher.connection is None
+    assert not changes
+    assert caplog.text.count("Se perdió la conexión con X") == 1
+
+
+def test_repeated_notifications_query_once():
+    display = FakeDisplay()
+    watcher, changes = make_watcher(display)
+    for _ in range(3):
+        display.notify(7)
+
+    watcher._on_readable()
+
+    assert display.queries == 1
+    assert changes == [("app7", "App7")]
+
+
+def test_focus_change_runs_xinput_off_the_event_loop(make_listener):
+    xinput = FakeXInput()
+    listener = make_listener(FakeInputDevice(hold=True), xinput=xinput)
+    mouse = next(iter(listener.devices.values()))
+    assert wait_for(lambda: mouse.xinput_id is not None)
+    assert listener.action_queue.join(2)
+    xinput.threads.clear()
+    calls = xinput.calls
+
+    # Button 2 con una acción propia se desactiva en xinput
+    firefox = compile_dispatch({"Button 2": "Copy"})
+    listener.config_manager.profiles = {"firefox": firefox}
+    on_loop(listener, listener.on_focus_changed, ("Navigator", "Firefox"))
+
+    assert listener.dispatch is firefox
+    assert listener.action_queue.join(2)
+    assert xinput.calls == calls + 1
+    assert mouse.xinput_disabled == ("Button 1", "Button 2")
+    assert listener.engine.thread not in xinput.threads
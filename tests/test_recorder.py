@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from evdev import InputEvent, ecodes
+
+from src import output, recorder
+from src.dispatch import compile_dispatch
+from src.recorder import EventRecorder, ReplayDevice, read_events, read_header, run_replay
+from tests.fakes import CountingOutput, FakeConfig
+
+NAME = "Logitech MX Master 3S"
+
+
+def record(path, events, name=NAME):
+    rec = EventRecorder(str(path))
+    handled = []
+    handle = rec.wrap(handled.append, name)
+    for event in events:
+        handle(event)
+    rec.close()
+    assert handled == list(events)
+
+
+def wheel(sec, usec, value):
+    return InputEvent(sec, usec, ecodes.EV_REL, ecodes.REL_HWHEEL, value)
+
+
+def replay(path, fast=False):
+    device = ReplayDevice(str(path), fast)
+
+    async def collect():
+        return [event async for event in device.async_read_loop()]
+
+    events = asyncio.run(collect())
+    assert device.finished.is_set()
+    return events
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "events.mxev"
+    events = [wheel(100, 1000 * i, i) for i in range(10)]
+    record(path, events)
+    assert read_header(str(path)) == NAME
+    assert [(e.sec, e.usec, e.type, e.code, e.value) for e in read_events(str(path))] == \
+        [(e.sec, e.usec, e.type, e.code, e.value) for e in events]
+
+
+def test_new_recording_replaces_previous(tmp_path):
+    path = tmp_path / "events.mxev"
+    record(path, [wheel(100, 0, 1), wheel(100, 8000, 2)])
+    record(path, [wheel(5000, 0, 3)])
+    assert [e.value for e in read_events(str(path))] == [3]
+
+
+def test_other_files_are_not_overwritten(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("no es una grabación")
+    with pytest.raises(ValueError):
+        EventRecorder(str(path))
+    assert path.read_text() == "no es una grabación"
+
+
+def test_replay_keeps_short_gaps_and_clamps_long_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder, "MAX_REPLAY_GAP", 0.05)
+    path = tmp_path / "events.mxev"
+    # Pausa de una hora y salto hacia atrás del reloj entre los eventos 2-3 y 3-4
+    record(path, [wheel(100, 0, 1), wheel(100, 20000, 2), wheel(3700, 20000, 3), wheel(3699, 0, 4)])
+
+    times = [e.timestamp() for e in replay(path)]
+
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert gaps[0] == pytest.approx(0.02, abs=0.005)
+    assert gaps[1] == pytest.approx(0.05, abs=0.005)
+    assert gaps[2] == pytest.approx(0.0, abs=0.005)
+
+
+def test_fast_replay_ignores_gaps(tmp_path):
+    path = tmp_path / "events.mxev"
+    record(path, [wheel(100, 0, 1), wheel(3700, 0, 2)])
+    events = replay(path, fast=True)
+    assert [e.value for e in events] == [1, 2]
+    assert events[1].timestamp() - events[0].timestamp() < 0.5
+
+
+@pytest.fixture
+def replay_config(monkeypatch):
+    monkeypatch.setattr(output, "create_output_backend", lambda name, launcher: CountingOutput())
+    monkeypatch.setattr(recorder, "ADOPT_TIMEOUT", 0.5)
+    return FakeConfig(compile_dispatch({"Button 5": {"function": "Volume Control"}}),
+                      {"cursor_freeze": "xinput", "stats_interval_s": 0})
+
+
+def test_run_replay_plays_the_recording(tmp_path, replay_config):
+    path = tmp_path / "events.mxev"
+    record(path, [wheel(100, 0, 1), InputEvent(100, 0, ecodes.EV_SYN, ecodes.SYN_REPORT, 0)])
+    assert run_replay(replay_config, None, str(path), fast=True) == 0
+
+
+def test_run_replay_fails_when_the_mouse_is_not_adopted(tmp_path, replay_config, caplog):
+    path = tmp_path / "events.mxev"
+    # Sin "MX Master" en el nombre el listener no lee nunca el dispositivo
+    record(path, [wheel(100, 0, 1)], name="Generic USB Mouse")
+    assert run_replay(replay_config, None, str(path), fast=True) == 1
+    assert "no ha adoptado" in caplog.text
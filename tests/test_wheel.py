@@ -0,0 +1,119 @@
+from evdev import InputEvent, ecodes
+
+from src.backend import HiResAccumulator, WheelAccumulator
+from tests.fakes import FakeInputDevice, on_loop
+
+DETENT = HiResAccumulator.UNITS_PER_DETENT
+
+
+def test_partial_steps_carry_over_until_a_detent():
+    acc = HiResAccumulator()
+    for _ in range(3):
+        acc.add(30, 100)
+        assert acc.take_detents() == 0
+    acc.add(30, 100)
+    assert acc.take_detents() == 1
+    assert acc.residual == 0
+
+
+def test_residual_is_kept_after_a_detent():
+    acc = HiResAccumulator()
+    acc.add(150, 100)
+    assert acc.take_detents() == 1
+    acc.add(90, 100)
+    assert acc.take_detents() == 1
+    assert acc.residual == 0
+
+
+def test_negative_values_truncate_towards_zero():
+    acc = HiResAccumulator()
+    acc.add(-15, 100)
+    # -15 // 120 sería -1: un giro mínimo a la izquierda no debe producir un detent
+    assert acc.take_detents() == 0
+    acc.add(-105, 100)
+    assert acc.take_detents() == -1
+
+
+def test_sign_flip_cancels_partial_steps():
+    acc = HiResAccumulator()
+    acc.add(100, 100)
+    acc.add(-100, 100)
+    assert acc.take_detents() == 0
+    acc.add(-60, 100)
+    assert acc.take_detents() == 0
+    acc.add(-60, 100)
+    assert acc.take_detents() == -1
+
+
+def test_sensitivity_scales_without_rounding_drift():
+    acc = HiResAccumulator()
+    # 150 %: dos muescas producen tres detents exactos
+    acc.add(DETENT, 150)
+    assert acc.take_detents() == 1
+    acc.add(DETENT, 150)
+    assert acc.take_detents() == 2
+    assert acc.residual == 0
+
+    # 50 %: hacen falta dos muescas para un detent
+    acc.add(DETENT, 50)
+    assert acc.take_detents() == 0
+    acc.add(DETENT, 50)
+    assert acc.take_detents() == 1
+
+
+def test_take_units_keeps_fractional_units():
+    acc = HiResAccumulator()
+    acc.add(1, 150)
+    assert acc.take_units() == 1
+    acc.add(1, 150)
+    assert acc.take_units() == 2
+    assert acc.residual == 0
+
+
+def test_wheel_accumulator_sums_until_taken():
+    acc = WheelAccumulator()
+    assert not acc.due(0.0)
+    acc.add(1, 1.0)
+    acc.add(2, 1.0)
+    acc.add(240, 1.0, hi_res=True)
+    assert acc.due(1.0)
+    assert acc.take() == (3, 240)
+    assert acc.take() == (0, 0)
+    assert acc.started is None
+
+
+def test_wheel_accumulator_window():
+    acc = WheelAccumulator(window=0.02)
+    acc.add(1, 10.0)
+    assert not acc.due(10.01)
+    acc.add(1, 10.015)
+    assert acc.due(10.03)
+    assert acc.take() == (2, 0)
+
+
+def frame(*values):
+    events = [InputEvent(0, 0, ecodes.EV_REL, code, value) for code, value in values]
+    return events + [InputEvent(0, 0, ecodes.EV_SYN, ecodes.SYN_REPORT, 0)]
+
+
+def feed(listener, events):
+    mouse = next(iter(listener.devices.values()))
+    on_loop(listener, lambda: [mouse.handle_event(event) for event in events])
+    assert listener.action_queue.join(2)
+    return listener.action_executor.output
+
+
+def test_hi_res_frame_is_not_counted_twice(make_listener):
+    listener = make_listener(FakeInputDevice(hold=True))
+    output = feed(listener, frame((ecodes.REL_HWHEEL, 1), (ecodes.REL_HWHEEL_HI_RES, DETENT)))
+    assert (output.calls, output.steps) == (1, 1)
+
+    # Con alta resolución ya vista, un REL_HWHEEL suelto no vuelve a desplazar
+    output = feed(listener, frame((ecodes.REL_HWHEEL, 1)))
+    assert (output.calls, output.steps) == (1, 1)
+
+
+def test_low_res_only_device_scrolls(make_listener):
+    listener = make_listener(FakeInputDevice(hold=True))
+    output = feed(listener, frame((ecodes.REL_HWHEEL, 1)) + frame((ecodes.REL_HWHEEL, -1)))
+    assert (output.calls, output.steps) == (2, 2)
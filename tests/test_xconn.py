@@ -0,0 +1,49 @@
+import threading
+from types import SimpleNamespace
+
+from src.xconn import XConnection
+
+
+class FakeRoot:
+    """Ventana raíz simulada: cuenta las consultas y mueve el puntero en cada una."""
+
+    def __init__(self):
+        self.queries = 0
+
+    def query_pointer(self):
+        self.queries += 1
+        return SimpleNamespace(root_x=self.queries * 10, root_y=0)
+
+    def warp_pointer(self, x, y):
+        pass
+
+
+def connection():
+    conn = XConnection.__new__(XConnection)
+    conn.display = SimpleNamespace(flush=lambda: None)
+    conn.root = FakeRoot()
+    conn.lock = threading.RLock()
+    conn._pointer_frame = None
+    conn._pointer = None
+    return conn
+
+
+def test_pointer_is_cached_per_device_and_frame():
+    conn = connection()
+    first = conn.query_pointer(5, "/dev/input/event3")
+    assert conn.query_pointer(5, "/dev/input/event3") == first
+    assert conn.root.queries == 1
+
+    # El frame 5 de otro ratón no tiene nada que ver con el del primero
+    assert conn.query_pointer(5, "/dev/input/event4") != first
+    assert conn.root.queries == 2
+
+
+def test_pointer_cache_is_cleared_by_warp_and_skipped_without_frame():
+    conn = connection()
+    conn.query_pointer(1, "/dev/input/event3")
+    conn.warp_pointer(0, 0)
+    conn.query_pointer(1, "/dev/input/event3")
+    conn.query_pointer()
+    conn.query_pointer()
+    assert conn.root.queries == 4